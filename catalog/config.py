@@ -22,6 +22,7 @@ class BaseConfig(object):
         'comments',
         'datasets',
         'stories',
+        'debug',
         'api',  # Keep api module as last one for module injection
     ]
 
@@ -44,6 +45,94 @@ class BaseConfig(object):
         # },
     }
 
+    # Response cache of read endpoints: 'memory' (bypassed with several
+    # SERVER_WORKERS), 'redis' or 'null'
+    RESPONSE_CACHE_TYPE = getenv('RESPONSE_CACHE_TYPE', default='memory')
+    RESPONSE_CACHE_TIMEOUT = getenv('RESPONSE_CACHE_TIMEOUT', type=int, default=60)
+    RESPONSE_CACHE_MAX_ENTRIES = getenv('RESPONSE_CACHE_MAX_ENTRIES', type=int, default=1024)
+    # Tag versions kept by the 'memory' backend, 4 per entry by default
+    RESPONSE_CACHE_MAX_VERSIONS = getenv('RESPONSE_CACHE_MAX_VERSIONS', type=int)
+    RESPONSE_CACHE_REDIS_URL = getenv('RESPONSE_CACHE_REDIS_URL', default='redis://localhost:6379/0')
+
+    # Validated OAuth2 bearer tokens cache, entries never outlive tokens:
+    # 'memory' (bypassed with several SERVER_WORKERS), 'redis' or 'null'
+    OAUTH2_TOKEN_CACHE_TYPE = getenv('OAUTH2_TOKEN_CACHE_TYPE', default='memory')
+    OAUTH2_TOKEN_CACHE_REDIS_URL = getenv('OAUTH2_TOKEN_CACHE_REDIS_URL', default='redis://localhost:6379/2')
+    OAUTH2_TOKEN_CACHE_MAX_ENTRIES = getenv('OAUTH2_TOKEN_CACHE_MAX_ENTRIES', type=int, default=1024)
+    OAUTH2_TOKEN_CACHE_TIMEOUT = getenv('OAUTH2_TOKEN_CACHE_TIMEOUT', type=int, default=300)
+
+    # bcrypt cost of password hashes (changing it rehashes passwords on login)
+    # and the number of hashes computed concurrently
+    PASSWORD_HASH_ROUNDS = getenv('PASSWORD_HASH_ROUNDS', type=int, default=12)
+    PASSWORD_HASH_WORKERS = getenv('PASSWORD_HASH_WORKERS', type=int, default=4)
+
+    # Expired OAuth2 tokens and grants cleanup, the in-process sweeper runs
+    # every OAUTH2_GC_INTERVAL seconds (0 disables it)
+    OAUTH2_GC_RETENTION_DAYS = getenv('OAUTH2_GC_RETENTION_DAYS', type=int, default=14)
+    OAUTH2_GC_CHUNK_SIZE = getenv('OAUTH2_GC_CHUNK_SIZE', type=int, default=1000)
+    OAUTH2_GC_INTERVAL = getenv('OAUTH2_GC_INTERVAL', type=int, default=0)
+
+    # Dataset and story star counters are written behind and flushed every
+    # STAR_COUNTER_FLUSH_INTERVAL seconds (0 updates them with every star)
+    STAR_COUNTER_FLUSH_INTERVAL = getenv('STAR_COUNTER_FLUSH_INTERVAL', type=float, default=0)
+
+    # Top and trending datasets, see ``catalog.modules.datasets.leaderboard``,
+    # refreshed in the background every LEADERBOARD_REFRESH_INTERVAL seconds
+    # (0 leaves it to the ``app.datasets.refresh_leaderboards`` Invoke task)
+    LEADERBOARD_SIZE = getenv('LEADERBOARD_SIZE', type=int, default=100)
+    LEADERBOARD_REFRESH_INTERVAL = getenv('LEADERBOARD_REFRESH_INTERVAL', type=int, default=600)
+    TRENDING_HALF_LIFE_DAYS = getenv('TRENDING_HALF_LIFE_DAYS', type=float, default=3)
+    TRENDING_WINDOW_DAYS = getenv('TRENDING_WINDOW_DAYS', type=int, default=7)
+
+    # Rate limits of write endpoints: 'memory' or 'redis' counters, and
+    # overrides of endpoint limits, e.g. {'comments': '5/minute'}
+    RATE_LIMIT_ENABLED = getenv('RATE_LIMIT_ENABLED', type=bool, default=True)
+    RATE_LIMIT_TYPE = getenv('RATE_LIMIT_TYPE', default='memory')
+    RATE_LIMIT_REDIS_URL = getenv('RATE_LIMIT_REDIS_URL', default='redis://localhost:6379/1')
+    RATE_LIMITS = getenv('RATE_LIMITS', type=dict, default={})
+
+    # Opt-in request profiler, see ``catalog.extensions.profiling``: the
+    # slowest PROFILING_TOP endpoints over their last PROFILING_WINDOW requests
+    PROFILING_ENABLED = getenv('PROFILING_ENABLED', type=bool, default=False)
+    PROFILING_WINDOW = getenv('PROFILING_WINDOW', type=int, default=100)
+    PROFILING_TOP = getenv('PROFILING_TOP', type=int, default=10)
+
+    # Prometheus text format metrics, see ``catalog.extensions.metrics``
+    METRICS_ENABLED = getenv('METRICS_ENABLED', type=bool, default=True)
+    METRICS_PATH = getenv('METRICS_PATH', default='/metrics')
+    # Metrics of pre-forked workers are merged through files of this
+    # directory, a temporary one of the server by default
+    METRICS_MULTIPROCESS_DIR = getenv('METRICS_MULTIPROCESS_DIR')
+
+    # Database connection pool of every process: at least one connection per
+    # SERVER_THREADS thread, recycled after SQLALCHEMY_POOL_RECYCLE seconds
+    # (below the server idle timeout, e.g. MySQL wait_timeout). Unset values
+    # keep SQLAlchemy defaults, SQLite databases do not accept pool sizes
+    SQLALCHEMY_ENGINE_OPTIONS = dict(
+        (option, value) for option, value in (
+            ('pool_size', getenv('SQLALCHEMY_POOL_SIZE', type=int)),
+            ('max_overflow', getenv('SQLALCHEMY_MAX_OVERFLOW', type=int)),
+            ('pool_recycle', getenv('SQLALCHEMY_POOL_RECYCLE', type=int)),
+            ('pool_timeout', getenv('SQLALCHEMY_POOL_TIMEOUT', type=int)),
+            ('pool_pre_ping', getenv('SQLALCHEMY_POOL_PRE_PING', type=bool)),
+        ) if value is not None
+    )
+
+    # Production server (``invoke app.run.serve``), see
+    # ``catalog.extensions.server``: SERVER_WORKERS pre-forked processes of
+    # SERVER_THREADS threads, workers are restarted after SERVER_MAX_REQUESTS
+    # requests (0 never restarts them)
+    SERVER_BIND = getenv('SERVER_BIND', default='0.0.0.0:4444')
+    SERVER_WORKERS = getenv('SERVER_WORKERS', type=int, default=2 * (os.cpu_count() or 1) + 1)
+    SERVER_THREADS = getenv('SERVER_THREADS', type=int, default=4)
+    SERVER_PRELOAD = getenv('SERVER_PRELOAD', type=bool, default=True)
+    SERVER_TIMEOUT = getenv('SERVER_TIMEOUT', type=int, default=30)
+    SERVER_GRACEFUL_TIMEOUT = getenv('SERVER_GRACEFUL_TIMEOUT', type=int, default=30)
+    SERVER_KEEPALIVE = getenv('SERVER_KEEPALIVE', type=int, default=5)
+    SERVER_MAX_REQUESTS = getenv('SERVER_MAX_REQUESTS', type=int, default=0)
+    SERVER_PIDFILE = getenv('SERVER_PIDFILE')
+    SERVER_ACCESS_LOG = getenv('SERVER_ACCESS_LOG')
+
     # TODO: consider if these are relevant for this project
     SQLALCHEMY_TRACK_MODIFICATIONS = True
     CSRF_ENABLED = True
@@ -67,3 +156,7 @@ class TestingConfig(BaseConfig):
     TESTING = True
     # Use in-memory SQLite database for testing
     SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    # The minimal bcrypt cost keeps tests fast
+    PASSWORD_HASH_ROUNDS = 4
+    # Tests of the limits enable the rate limiter on their own
+    RATE_LIMIT_ENABLED = False
@@ -6,7 +6,12 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy_utils import force_auto_coercion, force_instant_defaults
 
 from . import api
-from .auth import OAuth2Provider
+from .auth import OAuth2Provider, PasswordHasher
+from .cache import ResponseCache
+from .metrics import Metrics, pool_gauges, ratio_gauge, stats_counter
+from .profiling import Profiler
+from .ratelimit import RateLimiter
+from .server import Server
 
 cross_origin_resource_sharing = CORS()
 
@@ -19,6 +24,17 @@ login_manager = LoginManager()
 marshmallow = Marshmallow()
 
 oauth2 = OAuth2Provider()
+password_hasher = PasswordHasher()
+
+response_cache = ResponseCache()
+
+rate_limiter = RateLimiter()
+
+profiler = Profiler()
+
+metrics = Metrics()
+
+server = Server()
 
 
 class AlembicDatabaseMigrationConfig(object):
@@ -33,15 +49,49 @@ class AlembicDatabaseMigrationConfig(object):
         self.configure_args = kwargs
 
 
+def collect_metrics():
+    """
+    Metrics of the extensions, computed when they are scraped.
+    """
+    from .flask_restplus import compiler
+
+    token_cache = dict(oauth2.token_cache.stats)
+    cache = dict(response_cache.stats)
+    return pool_gauges(db.engine.pool) + [
+        stats_counter('catalog_oauth2_token_cache_events_total', "Bearer token cache lookups and invalidations",
+                      token_cache, 'event'),
+        ratio_gauge('catalog_oauth2_token_cache_hit_ratio', "Bearer token cache hit ratio",
+                    token_cache['hits'], token_cache['misses']),
+        stats_counter('catalog_response_cache_events_total', "Response cache lookups and invalidations",
+                      cache, 'event'),
+        ratio_gauge('catalog_response_cache_hit_ratio', "Response cache hit ratio", cache['hits'], cache['misses']),
+        stats_counter('catalog_password_checks_total', "Password verifications by outcome",
+                      password_hasher.stats, 'result'),
+        stats_counter('catalog_rate_limit_checks_total', "Rate limited requests by outcome",
+                      rate_limiter.stats, 'result'),
+        stats_counter('catalog_schema_compiler_events_total', "Compiled response schemas and fallbacks",
+                      compiler.stats, 'event'),
+    ]
+
+
 def init_app(app, **kwargs):
     """
     Application extensions initialization.
     """
     cross_origin_resource_sharing.init_app(app)
     db.init_app(app)
+    server.init_app(app)
     login_manager.init_app(app)
     marshmallow.init_app(app)
     api.init_app(app)
     oauth2.init_app(app, **kwargs)
+    password_hasher.init_app(app)
+    # Threads of the hasher pool do not survive forks
+    server.after_fork(lambda: password_hasher.configure(workers=password_hasher.workers))
+    response_cache.init_app(app)
+    rate_limiter.init_app(app)
+    profiler.init_app(app)
+    metrics.init_app(app)
+    metrics.register_collector('extensions', collect_metrics)
 
     app.extensions['migrate'] = AlembicDatabaseMigrationConfig(db, compare_type=True)
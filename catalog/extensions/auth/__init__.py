@@ -5,3 +5,4 @@ Auth extension
 """
 
 from .oauth2 import OAuth2Provider
+from .passwords import PasswordHasher
@@ -9,13 +9,21 @@ More details are available here:
 * http://flask-oauthlib.readthedocs.org/en/latest/oauth2.html
 * http://lepture.com/en/2013/create-oauth-server
 """
+import threading
+from datetime import datetime
 from http import HTTPStatus
 
 from flask_oauthlib import provider
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
+from catalog.extensions.cache import MemoryBackend, NullBackend, RedisBackend
 from catalog.extensions.flask_restplus.errors import abort
 
-__all__ = ['OAuth2Provider']
+__all__ = ['OAuth2Provider', 'BearerTokenCache']
+
+# Expiration times of cached tokens are JSON serializable for shared backends
+EXPIRES_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
 
 
 def api_invalid_response(req):
@@ -26,6 +34,73 @@ def api_invalid_response(req):
     abort(code=HTTPStatus.UNAUTHORIZED.value)
 
 
+class BearerTokenCache(object):
+    """
+    Cache of validated bearer tokens keyed by access token, so protected
+    requests do not look tokens up in the database. An entry lives for
+    ``timeout`` seconds or until the token expires, whichever comes first.
+
+    The default backend is a bounded in-process LRU, which is bypassed when
+    several server workers run: a token revoked by one of them would stay
+    valid in the others. A ``RedisBackend`` is shared by all the workers.
+    """
+
+    SESSION_INFO_KEY = 'oauth2_token_cache_invalidated_tokens'
+
+    def __init__(self, max_entries=1024, timeout=300, backend=None):
+        self.timeout = timeout
+        self.backend = backend if backend is not None else MemoryBackend(max_entries=max_entries)
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    @property
+    def enabled(self):
+        if not isinstance(self.backend, MemoryBackend):
+            return True
+        # Avoid circular dependency
+        from catalog.extensions import server
+        return server.workers <= 1
+
+    def get(self, access_token):
+        """
+        Returns:
+            token_info (dict) - the values passed to ``set`` or None.
+        """
+        token_info = self.backend.get(access_token) if self.enabled else None
+        self._count('misses' if token_info is None else 'hits')
+        if token_info is None:
+            return None
+        return dict(token_info, expires=datetime.strptime(token_info['expires'], EXPIRES_FORMAT))
+
+    def set(self, access_token, expires, **token_info):
+        timeout = min(self.timeout, (expires - datetime.utcnow()).total_seconds())
+        if timeout > 0 and self.enabled:
+            self.backend.set(access_token, dict(token_info, expires=expires.strftime(EXPIRES_FORMAT)), timeout)
+
+    def invalidate(self, access_token):
+        self.backend.delete(access_token)
+        self._count('invalidations')
+
+    def invalidate_on_commit(self, session, access_token):
+        """
+        Invalidate ``access_token`` once the current transaction of ``session``
+        commits, so a concurrent request cannot cache the token again from
+        the database before its change is committed. Outside a transaction
+        it is invalidated right away.
+        """
+        if session is None or session.transaction is None:
+            self.invalidate(access_token)
+        else:
+            session.info.setdefault(self.SESSION_INFO_KEY, set()).add(access_token)
+
+    def clear(self):
+        self.backend.clear()
+
+
 class OAuth2Provider(provider.OAuth2Provider):
     """
     A helper class which connects OAuth2RequestValidator with OAuth2Provider.
@@ -34,10 +109,36 @@ class OAuth2Provider(provider.OAuth2Provider):
     def __init__(self, *args, **kwargs):
         super(OAuth2Provider, self).__init__(*args, **kwargs)
         self.invalid_response(api_invalid_response)
+        self.token_cache = BearerTokenCache()
 
     def init_app(self, app, **kwargs):
         super(OAuth2Provider, self).init_app(app)
+        cache_type = app.config.get('OAUTH2_TOKEN_CACHE_TYPE', 'memory')
+        if cache_type == 'memory':
+            backend = MemoryBackend(max_entries=app.config.get('OAUTH2_TOKEN_CACHE_MAX_ENTRIES', 1024))
+        elif cache_type == 'redis':
+            backend = RedisBackend.from_url(
+                app.config['OAUTH2_TOKEN_CACHE_REDIS_URL'], prefix='catalog:oauth2-token-cache:'
+            )
+        elif cache_type == 'null':
+            backend = NullBackend()
+        else:
+            raise ValueError("Unknown OAUTH2_TOKEN_CACHE_TYPE: %s" % cache_type)
+        self.token_cache = BearerTokenCache(
+            timeout=app.config.get('OAUTH2_TOKEN_CACHE_TIMEOUT', 300),
+            backend=backend,
+        )
+        if not event.contains(Session, 'after_commit', self._after_commit):
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
         # Set user-defined oauth2 validator
         validator = kwargs.pop('oauth_validator', None)
         if validator:
             self._validator = validator()
+
+    def _after_commit(self, session):
+        for access_token in session.info.pop(BearerTokenCache.SESSION_INFO_KEY, None) or ():
+            self.token_cache.invalidate(access_token)
+
+    def _after_rollback(self, session):
+        session.info.pop(BearerTokenCache.SESSION_INFO_KEY, None)
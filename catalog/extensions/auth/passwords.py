@@ -0,0 +1,110 @@
+# encoding: utf-8
+"""
+Password hashing service.
+
+bcrypt is deliberately slow, so verification is bounded: at most
+``PASSWORD_HASH_WORKERS`` hashes are computed at once, in a dedicated thread
+pool, and the rest of the login requests queue up instead of pinning every
+worker thread with CPU-bound work. bcrypt releases the GIL, so the pool
+hashes in parallel while request threads keep serving other requests.
+
+The cost is configured with ``PASSWORD_HASH_ROUNDS`` (bcrypt log rounds).
+Hashes with any other cost are recomputed on the next successful login.
+"""
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+from sqlalchemy_utils.types import PasswordType
+
+__all__ = ['PasswordHasher']
+
+
+class PasswordHasher(object):
+    """
+    Hashes and verifies passwords in a bounded thread pool.
+    """
+
+    SCHEMES = ('bcrypt',)
+
+    def __init__(self, rounds=12, workers=4):
+        self.context = CryptContext()
+        self.stats = {'verified': 0, 'rejected': 0, 'rehashed': 0}
+        self._stats_lock = threading.Lock()
+        self._executor = None
+        self.configure(rounds=rounds, workers=workers)
+
+    def init_app(self, app):
+        self.configure(
+            rounds=app.config.get('PASSWORD_HASH_ROUNDS', 12),
+            workers=app.config.get('PASSWORD_HASH_WORKERS', 4),
+        )
+
+    def configure(self, rounds=None, workers=None):
+        """
+        Change the cost of new hashes and/or the size of the thread pool.
+        """
+        if rounds is not None:
+            self.rounds = rounds
+            self.context.load(self.context_config())
+        if workers is not None:
+            self.workers = workers
+            executor_options = {'max_workers': workers}
+            if sys.version_info >= (3, 6):
+                executor_options['thread_name_prefix'] = 'password-hasher'
+            executor, self._executor = self._executor, ThreadPoolExecutor(**executor_options)
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def context_config(self):
+        """
+        passlib ``CryptContext`` options of the configured cost. Both bounds
+        are pinned, so hashes with a different cost need an update.
+        """
+        return dict(
+            schemes=self.SCHEMES,
+            bcrypt__default_rounds=self.rounds,
+            bcrypt__min_rounds=self.rounds,
+            bcrypt__max_rounds=self.rounds,
+        )
+
+    def column_type(self, **kwargs):
+        """
+        A ``PasswordType`` column type hashing with this hasher's context, so
+        stored hashes always get the configured cost.
+        """
+        column_type = PasswordType(schemes=self.SCHEMES, **kwargs)
+        column_type.context = self.context
+        return column_type
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def hash(self, secret):
+        """
+        Returns:
+            hash (str) - a hash of ``secret`` with the configured cost.
+        """
+        return self._executor.submit(self.context.hash, secret).result()
+
+    def verify_and_update(self, secret, password_hash):
+        """
+        Verify ``secret`` against ``password_hash``.
+
+        Returns:
+            (valid, new_hash) - ``new_hash`` is not None if the password is
+            valid, but ``password_hash`` has to be replaced by it.
+        """
+        if password_hash is None:
+            return False, None
+        if isinstance(password_hash, bytes):
+            password_hash = password_hash.decode('utf-8')
+        valid, new_hash = self._executor.submit(
+            self.context.verify_and_update, secret, password_hash
+        ).result()
+        self._count('verified' if valid else 'rejected')
+        if new_hash is not None:
+            self._count('rehashed')
+        return valid, new_hash
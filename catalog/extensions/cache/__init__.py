@@ -0,0 +1,320 @@
+# encoding: utf-8
+"""
+Response cache
+==============
+
+Caches serialized responses of read endpoints, see
+``Namespace.cached_response``.
+
+Entries are keyed by endpoint, URL and query arguments, OAuth2 scopes and
+the current versions of the entry tags. Writes invalidate a tag by bumping
+its version, so stale entries are never read again and just age out of the
+backend. Invalidations requested inside a database transaction are applied
+once it commits.
+
+Tags are either instance tags (``dataset:<id>``), bumped by ORM changes
+registered with ``ResponseCache.invalidate_on_change``, or table tags
+(``dataset``), bumped by every bulk ``Query.update``/``Query.delete`` of the
+table. An endpoint lists the instance tags and the table tags of the data
+it dumps.
+
+Backends (``RESPONSE_CACHE_TYPE`` config):
+
+* ``memory`` - in-process LRU with TTL (default). It is bypassed when
+  several server workers run, as invalidations would not reach the other
+  workers, which would serve stale responses until the entries expire;
+* ``redis`` - any client speaking the Redis protocol
+  (``RESPONSE_CACHE_REDIS_URL``), shared by all the workers;
+* ``null`` - caching is disabled.
+
+Tag versions are also the signal by which in-process caches of other
+modules notice changes made by other workers, see
+``ResponseCache.shared_version``.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+log = logging.getLogger(__name__)
+
+
+class NullBackend(object):
+    """
+    Backend which stores nothing.
+    """
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def get_versions(self, tags):
+        return [0] * len(tags)
+
+    def bump_version(self, tag):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryBackend(object):
+    """
+    In-process LRU cache with TTL.
+
+    Tag versions are kept in an LRU of their own. A version is a value of a
+    counter which only grows, and a tag which is not known (never bumped or
+    evicted) gets the counter value of the last eviction, so evicting a tag
+    makes it look changed rather than bringing back its stale entries.
+    """
+
+    def __init__(self, max_entries=1024, max_versions=None):
+        self.max_entries = max_entries
+        self.max_versions = max_versions or 4 * max_entries
+        self._entries = OrderedDict()
+        self._versions = OrderedDict()
+        self._last_version = 0
+        self._unknown_version = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (value, time.time() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_versions(self, tags):
+        with self._lock:
+            versions = []
+            for tag in tags:
+                version = self._versions.get(tag)
+                if version is None:
+                    version = self._unknown_version
+                else:
+                    self._versions.move_to_end(tag)
+                versions.append(version)
+            return versions
+
+    def bump_version(self, tag):
+        with self._lock:
+            self._last_version += 1
+            self._versions[tag] = self._last_version
+            self._versions.move_to_end(tag)
+            while len(self._versions) > self.max_versions:
+                self._versions.popitem(last=False)
+                self._unknown_version = self._last_version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._last_version += 1
+            self._unknown_version = self._last_version
+
+
+class RedisBackend(object):
+    """
+    Backend on top of a Redis protocol client, e.g. ``redis.StrictRedis``.
+    Only ``get``, ``set(..., ex=...)``, ``mget``, ``incr`` and ``delete`` are
+    used, so any server implementing them can stand in for Redis.
+    """
+
+    def __init__(self, client, prefix='catalog:response-cache:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        # Optional dependency, only required for this backend
+        import redis
+        return cls(redis.StrictRedis.from_url(url), **kwargs)
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return json.loads(value.decode('utf-8'))
+
+    def set(self, key, value, timeout):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(timeout))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def get_versions(self, tags):
+        if not tags:
+            return []
+        versions = self.client.mget([self.prefix + 'tag:' + tag for tag in tags])
+        return [int(version or 0) for version in versions]
+
+    def bump_version(self, tag):
+        self.client.incr(self.prefix + 'tag:' + tag)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class ResponseCache(object):
+    """
+    Response cache with tag-based invalidation and hit/miss statistics.
+    """
+
+    SESSION_INFO_KEY = 'response_cache_invalidated_tags'
+    CACHE_STATUS_HEADER = 'X-Cache'
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.timeout = 60
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cache_type = app.config.get('RESPONSE_CACHE_TYPE', 'memory')
+        self.timeout = app.config.get('RESPONSE_CACHE_TIMEOUT', 60)
+        if cache_type == 'memory':
+            self.backend = MemoryBackend(
+                max_entries=app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024),
+                max_versions=app.config.get('RESPONSE_CACHE_MAX_VERSIONS'),
+            )
+        elif cache_type == 'redis':
+            self.backend = RedisBackend.from_url(app.config['RESPONSE_CACHE_REDIS_URL'])
+        elif cache_type == 'null':
+            self.backend = NullBackend()
+        else:
+            raise ValueError("Unknown RESPONSE_CACHE_TYPE: %s" % cache_type)
+
+        if not event.contains(Session, 'after_commit', self._after_commit):
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            event.listen(Session, 'after_bulk_update', self._after_bulk_change)
+            event.listen(Session, 'after_bulk_delete', self._after_bulk_change)
+
+    @staticmethod
+    def tag(model, identity=None):
+        """
+        Cache tag of a model instance, e.g. ``dataset:<id>``, or of the whole
+        table if ``identity`` is omitted.
+        """
+        table_name = getattr(model, '__tablename__', model)
+        if identity is None:
+            return table_name
+        return '%s:%s' % (table_name, identity)
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    @property
+    def enabled(self):
+        if not isinstance(self.backend, MemoryBackend):
+            return True
+        # Avoid circular dependency
+        from catalog.extensions import server
+        return server.workers <= 1
+
+    def shared_version(self, tag):
+        """
+        Current version of ``tag`` as seen by all the server workers, or None
+        if the backend does not share versions (``null``, or ``memory`` with
+        several workers), so changes made by other workers go unnoticed.
+        """
+        if isinstance(self.backend, NullBackend) or not self.enabled:
+            return None
+        return self.backend.get_versions([tag])[0]
+
+    def make_key(self, endpoint, view_args, query_args, scopes, tags):
+        """
+        Cache key of a response. Bumping a version of any tag changes the key.
+        """
+        payload = json.dumps(
+            [
+                endpoint,
+                sorted((str(name), str(value)) for name, value in view_args.items()),
+                sorted(query_args),
+                sorted(scopes),
+                list(zip(tags, self.backend.get_versions(tags))),
+            ],
+            sort_keys=True
+        )
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        value = self.backend.get(key) if self.enabled else None
+        self._count('misses' if value is None else 'hits')
+        return value
+
+    def set(self, key, value, timeout=None):
+        if self.enabled:
+            self.backend.set(key, value, self.timeout if timeout is None else timeout)
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.bump_version(tag)
+            self._count('invalidations')
+
+    def invalidate_on_commit(self, session, *tags):
+        """
+        Invalidate tags once the current transaction of ``session`` commits,
+        so a concurrent read cannot cache the data which is being replaced.
+        Outside a transaction tags are invalidated right away.
+        """
+        if session is None or session.transaction is None:
+            self.invalidate(*tags)
+        else:
+            session.info.setdefault(self.SESSION_INFO_KEY, set()).update(tags)
+
+    def invalidate_on_change(self, model, tags):
+        """
+        Invalidate ``tags(instance)`` whenever an instance of ``model`` is
+        inserted, updated or deleted through the ORM. Bulk ``Query.update``
+        and ``Query.delete`` have to call ``invalidate_on_commit`` explicitly.
+        """
+
+        def listener(mapper, connection, target):
+            self.invalidate_on_commit(object_session(target), *tags(target))
+
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, listener)
+
+    def _after_bulk_change(self, context):
+        # Changed rows are unknown, so the whole table is invalidated
+        self.invalidate_on_commit(context.session, self.tag(context.mapper.class_))
+
+    def _after_commit(self, session):
+        tags = session.info.pop(self.SESSION_INFO_KEY, None)
+        if tags:
+            self.invalidate(*tags)
+
+    def _after_rollback(self, session):
+        session.info.pop(self.SESSION_INFO_KEY, None)
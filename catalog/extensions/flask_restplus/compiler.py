@@ -0,0 +1,271 @@
+# encoding: utf-8
+"""
+Schema compiler
+---------------
+
+``Schema.dump`` of marshmallow 2 runs the generic marshalling machinery for
+every field of every object: accessor lookups, ``missing`` checks, error
+stores and a ``Field.serialize`` call chain. Listings spend most of their CPU
+there.
+
+The compiler generates a plain Python function per schema class and set of
+dumped fields instead, e.g. for ``LicenseSchema``::
+
+    def dump(obj):
+        d = {}
+        v = obj.id
+        d['id'] = None if v is None else (v if v.__class__ is int else int(v))
+        v = obj.name
+        d['name'] = None if v is None else (v if v.__class__ is str else TEXT(v))
+        ...
+        return d
+
+Common fields (strings, numbers, booleans, ISO datetimes, nested schemas and
+``Method`` fields) are inlined, other fields call their own ``serialize``, so
+the output is the same as ``schema.dump(obj).data``. Fields whose type
+marshmallow infers from the first dumped object pass values through unless
+an inferred type would convert them. Schemas with dump processors, ``extra`` or
+``prefix`` are dumped by marshmallow, and so is an object whose compiled
+dump raises, e.g. with a value marshmallow reports as an error.
+"""
+import keyword
+import logging
+import threading
+from collections.abc import Mapping
+
+import marshmallow
+from marshmallow import fields, utils
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+from sqlalchemy import inspect as sqlalchemy_inspect
+
+log = logging.getLogger(__name__)
+
+missing = marshmallow.missing
+
+# Compiled factories by generated source, so a source is compiled once
+# however many schema instances share it
+_factories = {}
+_lock = threading.Lock()
+
+stats = {'compiled': 0, 'fallbacks': 0}
+
+_ISO_FORMATS = (None, 'iso', 'iso8601')
+
+# Inferred fields of these types dump values as they are
+_IDENTITY_TYPES = frozenset((bool, int, float, str))
+
+
+def _raise(value):
+    raise TypeError("%r cannot be dumped by a compiled schema." % type(value))
+
+
+_GLOBALS = {
+    'missing': missing,
+    'TEXT': utils.ensure_text_type,
+    'ISO': utils.isoformat,
+    'RAISE': _raise,
+}
+
+
+def _is_compilable(schema):
+    if not isinstance(schema, marshmallow.Schema):
+        return False
+    dump_processors = [
+        tag for tag, names in schema.__processors__.items() if names and tag[0] in (PRE_DUMP, POST_DUMP)
+    ]
+    return not (dump_processors or schema.extra or schema.prefix)
+
+
+def _mapped_attributes(schema):
+    """
+    Names of the attributes of the schema model which can be read directly.
+    """
+    model = getattr(schema.opts, 'model', None)
+    if model is None or type(schema).get_attribute is not marshmallow.Schema.get_attribute:
+        return frozenset()
+    return frozenset(
+        attribute.key for attribute in sqlalchemy_inspect(model).attrs
+        if attribute.key.isidentifier() and not keyword.iskeyword(attribute.key)
+    )
+
+
+class _Generator(object):
+    """
+    Source of a dump function of one schema and the objects it refers to.
+    """
+
+    def __init__(self, schema, compiling):
+        self.schema = schema
+        self.compiling = compiling
+        self.names = []
+        self.values = []
+        self.lines = []
+
+    def ref(self, prefix, value):
+        name = '%s%d' % (prefix, len(self.names))
+        self.names.append(name)
+        self.values.append(value)
+        return name
+
+    def emit(self, line, indent=2):
+        self.lines.append('    ' * indent + line)
+
+    def value_expression(self, field, name, field_ref):
+        """
+        Expression serializing ``v``, the value of a field which is not
+        ``missing``.
+        """
+        field_type = type(field)
+        if field_type is fields.String:
+            return "None if v is None else (v if v.__class__ is str else TEXT(v))"
+        if field_type is fields.Integer and not field.as_string:
+            return "None if v is None else (v if v.__class__ is int else int(v))"
+        if field_type is fields.Float and not field.as_string:
+            return "None if v is None else float(v)"
+        if field_type is fields.Boolean:
+            return "v if v is None or v is True or v is False else %s._serialize(v, %r, obj)" % (
+                field_ref, name
+            )
+        if field_type is fields.DateTime and field.dateformat in _ISO_FORMATS and not field.localtime:
+            return "None if v is None else ISO(v)"
+        if field_type is fields.Field:
+            # The type of the field is inferred from the first dumped value,
+            # values which any inferred type would convert are left to
+            # marshmallow
+            converted_ref = self.ref('T', frozenset(self.schema.TYPE_MAPPING) - _IDENTITY_TYPES)
+            return "RAISE(v) if v.__class__ in %s else v" % converted_ref
+        if field_type is fields.Nested and not isinstance(field.only, str):
+            nested_dump = compile_dump(field.schema, self.compiling)
+            if nested_dump is not None:
+                nested_ref = self.ref('N', nested_dump)
+                if field.schema.many or field.many:
+                    return "None if v is None else [%s(o) for o in v]" % nested_ref
+                return "None if v is None else %s(v)" % nested_ref
+        return "%s._serialize(v, %r, obj)" % (field_ref, name)
+
+    def field(self, name, field, mapped_attributes):
+        key = field.dump_to or name
+        field_ref = self.ref('F', field)
+        field_type = type(field)
+
+        if field_type is fields.Method:
+            if not field.serialize_method_name:
+                return
+            method = utils.callable_or_raise(getattr(field.parent, field.serialize_method_name, None))
+            method_ref = self.ref('M', method)
+            self.emit("try:")
+            self.emit("v = %s(obj)" % method_ref, indent=3)
+            self.emit("except AttributeError:")
+            self.emit("pass", indent=3)
+            self.emit("else:")
+            self.emit("if v is not missing:", indent=3)
+            self.emit("d[%r] = v" % key, indent=4)
+            return
+
+        overridden = (
+            field_type.serialize is not fields.Field.serialize
+            or field_type.get_value is not fields.Field.get_value
+            or not field._CHECK_ATTRIBUTE  # pylint: disable=protected-access
+        )
+        if overridden:
+            self.emit("v = %s.serialize(%r, obj, accessor=get)" % (field_ref, name))
+            self.emit("if v is not missing:")
+            self.emit("d[%r] = v" % key, indent=3)
+            return
+
+        attribute = field.attribute or name
+        expression = self.value_expression(field, name, field_ref)
+        if attribute in mapped_attributes:
+            self.emit("v = obj.%s" % attribute)
+            self.emit("d[%r] = %s" % (key, expression))
+            return
+
+        self.emit("v = get(%r, obj, missing)" % attribute)
+        self.emit("if v is not missing:")
+        self.emit("d[%r] = %s" % (key, expression), indent=3)
+        if field.default is not missing:
+            self.emit("else:")
+            default_ref = self.ref('D', field.default)
+            if callable(field.default):
+                self.emit("d[%r] = %s()" % (key, default_ref), indent=3)
+            else:
+                self.emit("d[%r] = %s" % (key, default_ref), indent=3)
+
+    def source(self):
+        get_ref = self.ref('G', self.schema.get_attribute)
+        dict_ref = self.ref('C', self.schema.dict_class)
+        mapped_attributes = _mapped_attributes(self.schema)
+        for name, field in self.schema.fields.items():
+            if not field.load_only:
+                self.field(name, field, mapped_attributes)
+
+        header = ["def factory(%s):" % ', '.join(self.names)]
+        header.append("    get = %s" % get_ref)
+        header.append("    def dump(obj):")
+        header.append("        d = %s" % ('{}' if self.schema.dict_class is dict else '%s()' % dict_ref))
+        return '\n'.join(header + self.lines + ["        return d", "    return dump"])
+
+
+def _factory(source):
+    factory = _factories.get(source)
+    if factory is None:
+        with _lock:
+            factory = _factories.get(source)
+            if factory is None:
+                namespace = dict(_GLOBALS)
+                exec(compile(source, '<compiled schema>', 'exec'), namespace)  # pylint: disable=exec-used
+                factory = _factories[source] = namespace['factory']
+                stats['compiled'] += 1
+    return factory
+
+
+def compile_dump(schema, compiling=None):
+    """
+    Returns:
+        dump (callable) - a function serializing one object the same way as
+        ``schema.dump(obj, many=False).data`` or ``None`` if the schema
+        cannot be compiled. It is cached on the schema instance.
+    """
+    compiled = schema.__dict__.get('_compiled_dump')
+    if compiled is not None:
+        return compiled or None
+
+    compiling = compiling or set()
+    if id(schema) in compiling:
+        # Recursive schemas are dumped by marshmallow below the first level
+        return None
+    if not _is_compilable(schema):
+        schema._compiled_dump = False
+        return None
+    compiling.add(id(schema))
+    try:
+        generator = _Generator(schema, compiling)
+        source = generator.source()
+    finally:
+        compiling.discard(id(schema))
+
+    compiled = _factory(source)(*generator.values)
+    schema._compiled_dump = compiled
+    return compiled
+
+
+def dump(schema, obj, many=None):
+    """
+    Serialize ``obj`` with a compiled ``schema``, same as
+    ``schema.dump(obj, many=many).data``.
+    """
+    many = schema.many if many is None else bool(many)
+    if many and utils.is_iterable_but_not_string(obj):
+        obj = list(obj)
+    items = obj if many else [obj]
+    function = compile_dump(schema)
+    # Compiled schemas read attributes, mappings are left to marshmallow
+    if function is not None and isinstance(items, list) and not any(isinstance(item, Mapping) for item in items):
+        try:
+            dumped = [function(item) for item in items]
+            return dumped if many else dumped[0]
+        except Exception:  # pylint: disable=broad-except
+            stats['fallbacks'] += 1
+            log.debug("Compiled %s dump has failed, falling back to marshmallow.",
+                      type(schema).__name__, exc_info=True)
+    return schema.dump(obj, many=many).data
@@ -3,8 +3,11 @@
 Extended Api Namespace implementation with an application-specific helpers
 --------------------------------------------------------------------------
 """
+import hashlib
+import json
 import logging
 from contextlib import contextmanager
+from datetime import datetime
 from functools import wraps
 from http import HTTPStatus
 
@@ -13,12 +16,15 @@ import flask_marshmallow
 import sqlalchemy
 from flask_restplus import Namespace as OriginalNamespace
 from flask_restplus.utils import merge
+from marshmallow import fields
 from webargs.flaskparser import FlaskParser
 from werkzeug import exceptions as http_exceptions
+from werkzeug.http import http_date, parse_date, quote_etag, unquote_etag
 
 from catalog.extensions.flask_restplus.errors import abort
+from . import compiler
 from .model import Model
-from .schema import DefaultHTTPErrorSchema
+from .schema import DefaultHTTPErrorSchema, ModelSchema
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +47,77 @@ class CustomWebargsParser(FlaskParser):
         abort(status_code, messages=error.messages)
 
 
+def _dump(model, response):
+    """
+    Serialize a response with the compiled ``model``, ``None`` items of a list
+    (e.g. not found objects of ``BatchGetParameters.batch_get``) stay
+    ``null`` instead of empty objects.
+    """
+    if getattr(model, 'many', False) and isinstance(response, list):
+        dumped = iter(compiler.dump(model, [obj for obj in response if obj is not None]))
+        return [None if obj is None else next(dumped) for obj in response]
+    return compiler.dump(model, response)
+
+
+def _payload_etag(data):
+    """
+    Strong ETag of a serialized payload.
+    """
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _last_modified(objects):
+    """
+    The latest ``updated`` (or ``created``) timestamp of model instances.
+    """
+    timestamps = [
+        getattr(obj, 'updated', None) or getattr(obj, 'created', None) for obj in objects
+    ]
+    timestamps = [timestamp for timestamp in timestamps if isinstance(timestamp, datetime)]
+    return max(timestamps) if timestamps else None
+
+
+def _dumps_relationships(model):
+    """
+    Whether a schema dumps related rows, whose changes do not move the
+    timestamps of the dumped object itself.
+    """
+    if isinstance(model, ModelSchema):
+        return bool(model.eager_loading_options())
+    return any(isinstance(field, fields.Nested) for field in getattr(model, 'fields', {}).values())
+
+
+def _validator_headers(etag=None, last_modified=None):
+    headers = {}
+    if etag is not None:
+        headers['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+
+def _is_not_modified(etag=None, last_modified=None):
+    """
+    Evaluates conditional GET headers of the current request. ``If-None-Match``
+    takes precedence over ``If-Modified-Since`` (RFC 7232).
+    """
+    request = flask.request
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.if_none_match:
+        return etag is not None and request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _not_modified_response(headers):
+    response = flask.Response(status=HTTPStatus.NOT_MODIFIED)
+    response.headers.extend(headers)
+    return response
+
+
 class Namespace(OriginalNamespace):
     """
     Having app-specific handlers here.
@@ -111,10 +188,15 @@ class Namespace(OriginalNamespace):
             if _locations is not None:
                 parameters.context['in'] = _locations
 
+            # Avoid circular dependency
+            from catalog.extensions import profiler
+
             return self.doc(params=parameters)(
                 self.response(code=HTTPStatus.UNPROCESSABLE_ENTITY)(
-                    self.WEBARGS_PARSER.use_args(parameters, locations=_locations)(
-                        func
+                    profiler.profiled('parse')(
+                        self.WEBARGS_PARSER.use_args(parameters, locations=_locations)(
+                            profiler.profiled('app')(func)
+                        )
                     )
                 )
             )
@@ -128,6 +210,14 @@ class Namespace(OriginalNamespace):
         It automatically documents HTTPError%(code)d responses with relevant
         schemas.
 
+        Successful GET responses get a strong ``ETag`` (a hash of the
+        serialized payload) header, and single objects a ``Last-Modified``
+        (their ``updated`` timestamp) header too. ``If-None-Match`` and
+        ``If-Modified-Since`` requests are answered with 304, the latter one
+        before the serialization. Lists and schemas dumping relationships have
+        no ``Last-Modified``: deleting an item or changing a nested row does
+        not change the timestamps of the remaining or parent ones.
+
         Arguments:
             model (flask_marshmallow.Schema) - it can be a class or an instance
                 of the class, which will be used for OpenAPI documentation
@@ -162,6 +252,10 @@ class Namespace(OriginalNamespace):
             This decorator handles responses to serialize the returned value
             with a given model.
             """
+            # Avoid circular dependency
+            from catalog.extensions import profiler
+
+            dump = profiler.profiled('serialize')(_dump)
 
             def dump_wrapper(*args, **kwargs):
                 response = func(*args, **kwargs)
@@ -177,9 +271,37 @@ class Namespace(OriginalNamespace):
                 else:
                     _code = code
 
-                if HTTPStatus(_code) is code:
-                    response = model.dump(response).data
-                return response, _code
+                if HTTPStatus(_code) is not code:
+                    return response, _code
+
+                if isinstance(response, sqlalchemy.orm.Query) \
+                        and isinstance(model, ModelSchema):
+                    # Preload everything the schema is going to touch
+                    # instead of lazy loading relationships row by row.
+                    response = response.options(*model.eager_loading_options())
+
+                conditional = code is HTTPStatus.OK and flask.request.method in ('GET', 'HEAD')
+                if not conditional:
+                    return dump(model, response), _code
+
+                if isinstance(response, sqlalchemy.orm.Query):
+                    response = response.all()
+                if isinstance(response, (list, tuple)) or _dumps_relationships(model):
+                    # Removed items do not move the latest timestamp of the
+                    # remaining ones, neither do changes of nested rows, so
+                    # these are validated by their payload only
+                    last_modified = None
+                else:
+                    last_modified = _last_modified([response])
+                if not flask.request.if_none_match and _is_not_modified(last_modified=last_modified):
+                    return _not_modified_response(_validator_headers(last_modified=last_modified))
+
+                response = dump(model, response)
+                etag = _payload_etag(response)
+                headers = _validator_headers(etag, last_modified)
+                if _is_not_modified(etag, last_modified):
+                    return _not_modified_response(headers)
+                return response, _code, headers
 
             return dump_wrapper
 
@@ -217,6 +339,73 @@ class Namespace(OriginalNamespace):
 
         return decorator
 
+    def cached_response(self, tags, timeout=None):
+        """
+        A decorator which caches serialized responses of a read endpoint, see
+        ``catalog.extensions.cache``. It has to be applied on top of
+        ``response`` decorator, so the serialized data is cached, and under
+        access restriction decorators, so they are always checked.
+
+        Arguments:
+            tags (func) - a function which should accept only one ``dict``
+                argument (all kwargs passed to the function), and must return
+                a list of cache tags the response depends on.
+            timeout (int) - time to live of entries in seconds, defaults to
+                ``RESPONSE_CACHE_TIMEOUT`` config.
+
+        Example:
+        >>> @namespace.cached_response(
+        ...     tags=lambda kwargs: [ResponseCache.tag(Team, kwargs['team_id'])]
+        ... )
+        ... @namespace.response(TeamSchema())
+        ... def get_team(team_id):
+        ...     return Team.query.get(team_id)
+        """
+
+        def decorator(func):
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                # Avoid circular dependency
+                from catalog.extensions import response_cache
+
+                request = flask.request
+                access_token = getattr(getattr(request, 'oauth', None), 'access_token', None)
+                key = response_cache.make_key(
+                    request.endpoint,
+                    request.view_args,
+                    request.args.items(multi=True),
+                    getattr(access_token, 'scopes', None) or (),
+                    list(tags(kwargs))
+                )
+                cached = response_cache.get(key)
+                if cached is not None:
+                    data, code, headers = cached
+                    headers = dict(headers, **{response_cache.CACHE_STATUS_HEADER: 'HIT'})
+                    # Conditional requests are answered without the payload
+                    if _is_not_modified(
+                            unquote_etag(headers['ETag'])[0] if 'ETag' in headers else None,
+                            parse_date(headers.get('Last-Modified'))
+                    ):
+                        return _not_modified_response(headers)
+                    return data, code, headers
+
+                flask.g.pop('pagination_headers', None)
+                response = func(*args, **kwargs)
+                if not isinstance(response, tuple) or HTTPStatus(response[1]) is not HTTPStatus.OK:
+                    return response
+                data, code = response[:2]
+                headers = dict(response[2]) if len(response) > 2 else {}
+                # Next page cursor of paginated responses
+                headers.update(flask.g.pop('pagination_headers', None) or {})
+                response_cache.set(key, [data, code, headers], timeout=timeout)
+                headers[response_cache.CACHE_STATUS_HEADER] = 'MISS'
+                return data, code, headers
+
+            return wrapper
+
+        return decorator
+
     def preflight_options_handler(self, func):
 
         @wraps(func)
@@ -305,7 +494,7 @@ class Namespace(OriginalNamespace):
                 func = func_or_class
 
             # Avoid circular dependency
-            from catalog.extensions import oauth2, permissions
+            from catalog.extensions import oauth2, permissions, profiler
 
             # Automatically apply `permissions.ActiveUserRolePermisson`
             # guard if none is yet applied.
@@ -327,7 +516,9 @@ class Namespace(OriginalNamespace):
 
             oauth_protection_decorator = oauth2.require_oauth(*_oauth_scopes)
             self._register_access_restriction_decorator(protected_func, oauth_protection_decorator)
-            oauth_protected_func = oauth_protection_decorator(protected_func)
+            oauth_protected_func = profiler.profiled('auth')(
+                oauth_protection_decorator(profiler.profiled('app')(protected_func))
+            )
 
             return self.doc(
                 security={
@@ -387,7 +578,7 @@ class Namespace(OriginalNamespace):
             A helper wrapper.
             """
             # Avoid circular dependency
-            from catalog.extensions import permissions
+            from catalog.extensions import permissions, profiler
 
             if getattr(permission, '_partial', False):
                 # We don't apply partial permissions, we only use them for
@@ -405,7 +596,9 @@ class Namespace(OriginalNamespace):
 
                         return wrapper
 
-                protected_func = _permission_decorator(func)
+                protected_func = profiler.profiled('auth')(
+                    _permission_decorator(profiler.profiled('app')(func))
+                )
                 self._register_access_restriction_decorator(protected_func, _permission_decorator)
 
             # Apply `_role_permission_applied` marker for Role Permissions,
@@ -431,6 +624,64 @@ class Namespace(OriginalNamespace):
 
         return decorator
 
+    def rate_limited(self, scope, limit, per_client=None):
+        """
+        A decorator which limits how often the current user, and the OAuth2
+        client of the request on behalf of all its users, may call an
+        endpoint, see ``catalog.extensions.ratelimit``. Requests over the
+        limit are answered with 429 and a ``Retry-After`` header.
+
+        It has to be applied under ``login_required`` decorator, so the user
+        is known. Anonymous requests are limited per remote address.
+
+        Arguments:
+            scope (str) - name of the limited endpoints; endpoints sharing a
+                scope share their limits, which can be overridden with
+                ``RATE_LIMITS`` config.
+            limit (str) - limit per user, e.g. ``"10/minute"``.
+            per_client (str) - limit per OAuth2 client.
+
+        Example:
+        >>> @namespace.login_required(oauth_scopes=['teams:write'])
+        ... @namespace.rate_limited('teams', '10/minute', per_client='100/minute')
+        ... def post_team():
+        ...     return Team()
+        """
+
+        def decorator(func):
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                # Avoid circular dependency
+                from flask_login import current_user
+                from catalog.extensions import rate_limiter
+
+                request = flask.request
+                access_token = getattr(getattr(request, 'oauth', None), 'access_token', None)
+                identities = {
+                    'user': current_user.id if current_user.is_authenticated else request.remote_addr,
+                    'client': getattr(access_token, 'client_id', None),
+                }
+                retry_after = rate_limiter.check(identities, scope, limit, client_limit=per_client)
+                if retry_after:
+                    @flask.after_this_request
+                    def add_retry_after_header(response):
+                        response.headers[rate_limiter.RETRY_AFTER_HEADER] = str(retry_after)
+                        return response
+
+                    abort(
+                        code=HTTPStatus.TOO_MANY_REQUESTS,
+                        message="Too many requests, retry in %d seconds." % retry_after
+                    )
+                return func(*args, **kwargs)
+
+            return self.response(
+                code=HTTPStatus.TOO_MANY_REQUESTS,
+                description="At most %s requests are allowed" % limit
+            )(wrapper)
+
+        return decorator
+
     def _register_access_restriction_decorator(self, func, decorator_to_register):
         """
         Helper function to register decorator to function to perform checks
@@ -1,9 +1,15 @@
 # encoding: utf-8
+import base64
+import json
 import logging
+from datetime import datetime
 
+import flask
 from flask_marshmallow import Schema, base_fields
-from marshmallow import validate, validates_schema, ValidationError, fields
+from marshmallow import validate, validates, validates_schema, ValidationError, fields
 from six import itervalues
+from sqlalchemy import and_, func, or_, select
+from webargs.fields import DelimitedList
 
 log = logging.getLogger(__name__)
 
@@ -211,8 +217,19 @@ class PatchJSONParameters(Parameters):
 class PaginationParameters(Parameters):
     """
     Helper Parameters class to reuse pagination.
+
+    Two modes are supported:
+
+    * ``offset``/``limit`` (default);
+    * keyset pagination on ``(created, id)``, enabled by passing ``cursor``
+      (an empty value starts from the first page). The cursor of the next
+      page is returned in the ``X-Next-Cursor`` response header, so deep
+      pages cost the same as the first one.
     """
 
+    NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+    CURSOR_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
     limit = base_fields.Integer(
         description="limit a number of items (allowed range is 1-100), default is 20.",
         missing=20,
@@ -222,4 +239,222 @@ class PaginationParameters(Parameters):
         description="a number of items to skip, default is 0.",
         missing=0,
         validate=validate.Range(min=0)
-    )
\ No newline at end of file
+    )
+    cursor = base_fields.String(
+        description=(
+            "an opaque cursor from the X-Next-Cursor header of a previous page, "
+            "pass an empty value to start cursor pagination (``offset`` is ignored)."
+        ),
+        required=False
+    )
+
+    @validates('cursor')
+    def validate_cursor(self, value):
+        if value:
+            self.decode_cursor(value)
+
+    @classmethod
+    def encode_cursor(cls, created, identity):
+        payload = json.dumps([created.strftime(cls.CURSOR_DATETIME_FORMAT), identity])
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @classmethod
+    def decode_cursor(cls, cursor):
+        """
+        Returns:
+            key (tuple): ``(created, id)`` of the last item of the previous page.
+        """
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            if not isinstance(payload, list) or len(payload) != 2:
+                raise ValueError("Cursor is not a (created, id) pair.")
+            created, identity = payload
+            # The identity ends up in the keyset query
+            if isinstance(identity, bool) or not isinstance(identity, (str, int)):
+                raise ValueError("Cursor id is neither a string nor an integer.")
+            return datetime.strptime(created, cls.CURSOR_DATETIME_FORMAT), identity
+        except (TypeError, ValueError, UnicodeError):
+            raise ValidationError("Invalid pagination cursor.")
+
+    @classmethod
+    def paginate(cls, query, args, model):
+        """
+        Applies pagination to a query according to the parsed parameters.
+
+        Args:
+            query (Query): a query of ``model`` instances.
+            args (dict): parameters parsed by this class.
+            model (type): a model with ``created`` and ``id`` columns which
+                are used as the cursor key.
+
+        Returns:
+            query (Query): a query of the requested page.
+
+        Example:
+        >>> @api.parameters(PaginationParameters())
+        ... def get(self, args):
+        ...     return PaginationParameters.paginate(Dataset.query, args, Dataset)
+        """
+        if 'cursor' not in args:
+            return query.offset(args['offset']).limit(args['limit'])
+
+        created_column, id_column = model.created, model.id
+        query = query.filter(created_column.isnot(None))
+        if args['cursor']:
+            created, identity = cls.decode_cursor(args['cursor'])
+            # Compare with the stored timestamp of the cursor row, since
+            # server-side defaults may not round-trip through a bound datetime
+            # (e.g. SQLite stores CURRENT_TIMESTAMP without microseconds). The
+            # decoded value is only a fallback for rows deleted meanwhile.
+            created = func.coalesce(
+                select([created_column]).where(id_column == identity).correlate(None).as_scalar(),
+                created
+            )
+            query = query.filter(
+                or_(
+                    created_column > created,
+                    and_(created_column == created, id_column > identity)
+                )
+            )
+        query = query.order_by(created_column, id_column).limit(args['limit'])
+
+        # Only the keys of the page are fetched here, it is a cheap index scan
+        # bounded by ``limit``.
+        keys = query.with_entities(created_column, id_column).all()
+        if len(keys) == args['limit']:
+            next_cursor = cls.encode_cursor(*keys[-1])
+            # ``Namespace.cached_response`` stores it along with the response
+            flask.g.pagination_headers = {cls.NEXT_CURSOR_HEADER: next_cursor}
+
+            @flask.after_this_request
+            def add_next_cursor_header(response):
+                response.headers[cls.NEXT_CURSOR_HEADER] = next_cursor
+                return response
+
+        return query
+
+
+class BatchGetParameters(Parameters):
+    """
+    Helper Parameters class to fetch many objects by their IDs at once, e.g.
+    ``?ids=a,b,c`` or ``{"ids": ["a", "b", "c"]}``.
+
+    All the objects are loaded with a single ``IN`` query and returned in the
+    order of ``ids``, with ``None`` (``null`` once serialized) in place of
+    the IDs which are not found.
+    """
+
+    MAX_IDS = 100
+
+    ids = DelimitedList(
+        base_fields.String(validate=validate.Length(min=1)),
+        description="comma-separated IDs (at most 100) of the objects to fetch.",
+        required=False,
+        validate=validate.Length(min=1, max=MAX_IDS)
+    )
+
+    @classmethod
+    def batch_get(cls, query, ids, model):
+        """
+        Args:
+            query (Query): a query of ``model`` instances, usually with eager
+                loading options of the response schema.
+            ids (list): IDs parsed by this class.
+            model (type): a model with an ``id`` column.
+
+        Returns:
+            objects (list): ``model`` instances in the order of ``ids``,
+            ``None`` for not found IDs.
+
+        Example:
+        >>> @api.parameters(BatchGetParameters())
+        ... def get(self, args):
+        ...     return BatchGetParameters.batch_get(Dataset.query, args['ids'], Dataset)
+        """
+        found = {
+            str(obj.id): obj for obj in query.filter(model.id.in_(set(ids)))
+        }
+        return [found.get(identity) for identity in ids]
+
+
+class FilterSortParameters(PaginationParameters):
+    """
+    Helper Parameters class for listings filtered and sorted on the server.
+
+    Subclasses declare a field per filter, named after a model column, and
+    list filters in ``FILTER_FIELDS`` and sortable columns in
+    ``SORT_FIELDS``. Filters compile to equality predicates, ``sort`` takes a
+    column name prefixed with ``-`` for descending order. Both are meant to
+    be backed by composite indexes of the model.
+
+    Example:
+    >>> class ListDatasetsParameters(FilterSortParameters):
+    ...     FILTER_FIELDS = ('category', )
+    ...     SORT_FIELDS = ('stars', )
+    ...     category = base_fields.String()
+    """
+
+    FILTER_FIELDS = ()
+    SORT_FIELDS = ()
+
+    sort = base_fields.String(
+        description="a column to sort by, prefixed with '-' for descending order.",
+        required=False
+    )
+
+    def __init__(self, **kwargs):
+        super(FilterSortParameters, self).__init__(**kwargs)
+        sort_choices = []
+        for field_name in self.SORT_FIELDS:
+            sort_choices.extend((field_name, '-%s' % field_name))
+        # Make a copy of `validators` as otherwise we will modify the behaviour
+        # of all `marshmallow.Schema`-based classes
+        self.fields['sort'].validators = \
+            self.fields['sort'].validators + [validate.OneOf(sort_choices)]
+
+    @validates_schema
+    def validate_sort(self, data):
+        if data.get('sort') and 'cursor' in data:
+            # The cursor key is ``(created, id)``, see ``PaginationParameters``
+            raise ValidationError("Cursor pagination does not support sort.")
+
+    @classmethod
+    def filter_and_sort(cls, query, args, model):
+        """
+        Applies filters and sorting to a query according to the parsed
+        parameters. Ties are broken by ``id`` in the same direction, so a
+        single index on ``(..., sort column)`` serves the whole ordering.
+        """
+        for field_name in cls.FILTER_FIELDS:
+            if args.get(field_name) is not None:
+                query = query.filter(getattr(model, field_name) == args[field_name])
+
+        sort = args.get('sort')
+        if sort:
+            column = getattr(model, sort.lstrip('-'))
+            if sort.startswith('-'):
+                query = query.order_by(column.desc(), model.id.desc())
+            else:
+                query = query.order_by(column, model.id)
+        return query
+
+    @classmethod
+    def paginate(cls, query, args, model):
+        query = cls.filter_and_sort(query, args, model)
+        return super(FilterSortParameters, cls).paginate(query, args, model)
+
+
+class SearchParameters(PaginationParameters):
+    """
+    Helper Parameters class for full-text search. Results are ordered by
+    relevance, so only ``offset``/``limit`` pagination is supported.
+    """
+
+    q = base_fields.String(
+        description="search terms, every term is matched as a prefix.",
+        required=True,
+        validate=validate.Length(min=1, max=256)
+    )
+
+    class Meta(PaginationParameters.Meta):
+        exclude = ('cursor',)
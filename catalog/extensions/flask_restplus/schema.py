@@ -1,4 +1,7 @@
 import flask_marshmallow
+from marshmallow import fields
+from sqlalchemy import inspect as sqlalchemy_inspect
+from sqlalchemy.orm import joinedload, selectinload
 
 
 class SchemaMixin(object):
@@ -8,9 +11,64 @@ class SchemaMixin(object):
         return self
 
 
+def _relationship_loader_options(schema, mapper, parent_option=None):
+    """
+    Walk the fields a schema is going to dump and yield loader options for
+    every relationship they touch.
+
+    Scalar (many-to-one) relationships are fetched with ``joinedload`` in the
+    same statement, collections are fetched with ``selectinload`` in one extra
+    statement per collection. ``Method`` fields can declare the relationships
+    they read via ``relationships`` metadata, e.g.
+    ``base_fields.Method(serialize='dump_details', relationships=('academic_story',))``.
+    """
+    for field_name, field in schema.fields.items():
+        if field.load_only:
+            continue
+
+        if isinstance(field, fields.Method):
+            attribute_names = field.metadata.get('relationships', ())
+        else:
+            attribute_names = (field.attribute or field_name,)
+
+        for attribute_name in attribute_names:
+            relationship = mapper.relationships.get(attribute_name)
+            if relationship is None or relationship.lazy == 'dynamic':
+                # Dynamic relationships return queries, so they cannot be
+                # batch-loaded.
+                continue
+
+            loader = selectinload if relationship.uselist else joinedload
+            if parent_option is not None:
+                loader = getattr(parent_option, loader.__name__)
+            option = loader(getattr(mapper.class_, attribute_name))
+            yield option
+
+            if isinstance(field, fields.Nested) and isinstance(field.schema, ModelSchema):
+                for nested_option in _relationship_loader_options(
+                        field.schema, relationship.mapper, parent_option=option
+                ):
+                    yield nested_option
+
+
 # Define ModelSchema when using sqlalchemy as orm
 class ModelSchema(SchemaMixin, flask_marshmallow.sqla.ModelSchema):
-    pass
+
+    def eager_loading_options(self):
+        """
+        SQLAlchemy loader options which preload all relationships dumped by
+        this schema (respecting ``only`` and ``exclude``), so serializing a
+        list of objects costs a constant number of queries instead of a
+        query per object.
+
+        Example:
+        >>> schema = DatasetSchema(many=True)
+        >>> Dataset.query.options(*schema.eager_loading_options())
+        """
+        if getattr(self, '_eager_loading_options', None) is None:
+            mapper = sqlalchemy_inspect(self.opts.model)
+            self._eager_loading_options = list(_relationship_loader_options(self, mapper))
+        return self._eager_loading_options
 
 
 class Schema(SchemaMixin, flask_marshmallow.Schema):
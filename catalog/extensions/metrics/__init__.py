@@ -0,0 +1,460 @@
+# encoding: utf-8
+"""
+Metrics
+=======
+
+A registry of counters, gauges and histograms exposed at ``METRICS_PATH``
+(``/metrics``) in the Prometheus text exposition format, so any Prometheus
+compatible scraper can collect them without a client library or an
+external service.
+
+Every request is counted by method, ``Namespace`` route and status, and its
+duration is observed by a histogram. Other metrics are either:
+
+* declared once and updated where things happen, e.g.::
+
+    DATASETS_CREATED = metrics.counter(
+        'catalog_datasets_created_total', "Datasets created", ('source',)
+    )
+    DATASETS_CREATED.inc(source='api')
+
+* or computed when they are scraped by collectors registered in
+  ``init_app`` of extensions and modules, e.g. from ``stats`` dicts::
+
+    metrics.register_collector('leaderboard', lambda: [
+        stats_counter('catalog_leaderboard_events_total', "...", leaderboard.stats, 'event')
+    ])
+
+A scrape is answered by one worker of a pre-forking server, so workers
+save their declared counters and histograms to a file of a shared directory
+(``METRICS_MULTIPROCESS_DIR`` or ``Server.directory``) from a background
+thread every ``SAVE_INTERVAL`` seconds, and the scraped one sums them up. Files of exited
+workers are kept, so counters never go down. Declared gauges and collected
+metrics describe a process, they get a ``pid`` label instead.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import flask
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request durations in seconds
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+# Route of requests which do not match any URL rule
+UNMATCHED_ROUTE = 'unmatched'
+
+# Seconds between saves of the metrics of a worker
+SAVE_INTERVAL = 1
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(int(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+        for name, value in labels
+    )
+
+
+class Metric(object):
+    """
+    A metric family: values of a metric by label values.
+    """
+
+    TYPE = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError("%s expects labels %s, got %s." % (self.name, self.labelnames, tuple(labels)))
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def copy(self, values, labelnames=None):
+        """
+        Returns:
+            metric (Metric) - of the same kind with other ``values`` by label
+            values and, optionally, other ``labelnames``.
+        """
+        metric = type(self)(self.name, self.documentation, self.labelnames if labelnames is None else labelnames)
+        metric._values.update(values)
+        return metric
+
+    def values(self):
+        """
+        Returns:
+            values (list) - ``(label values, value)`` pairs.
+        """
+        with self._lock:
+            return [(key, list(value) if isinstance(value, list) else value) for key, value in self._values.items()]
+
+    def samples(self):
+        """
+        Returns:
+            samples (list) - ``(name, labels, value)`` tuples, ``labels`` is
+            a sequence of ``(name, value)`` pairs.
+        """
+        return [(self.name, tuple(zip(self.labelnames, key)), value) for key, value in self.values()]
+
+    def header(self):
+        return [
+            '# HELP %s %s' % (self.name, self.documentation.replace('\\', r'\\').replace('\n', r'\n')),
+            '# TYPE %s %s' % (self.name, self.TYPE),
+        ]
+
+    def expose(self):
+        return [
+            '%s%s %s' % (name, _format_labels(labels), _format_value(value))
+            for name, labels, value in self.samples()
+        ]
+
+
+class Counter(Metric):
+    """
+    A value which only goes up.
+    """
+
+    TYPE = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters cannot be decreased.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value which goes up and down.
+    """
+
+    TYPE = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    """
+    Counts of observed values by buckets of upper bounds, with their sum.
+    """
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # Bucket counts, the +Inf one and the sum of values
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    def copy(self, values, labelnames=None):
+        metric = Histogram(
+            self.name, self.documentation, self.labelnames if labelnames is None else labelnames, self.buckets
+        )
+        metric._values.update(values)
+        return metric
+
+    def samples(self):
+        samples = []
+        for key, counts in self.values():
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append(('%s_bucket' % self.name, labels + (('le', _format_value(float(bound))),), cumulative))
+            samples.append(('%s_sum' % self.name, labels, counts[-1]))
+            samples.append(('%s_count' % self.name, labels, cumulative))
+        return samples
+
+
+def stats_counter(name, documentation, stats, label, **labels):
+    """
+    A counter of a ``stats`` dict, e.g. ``{'hits': 1, 'misses': 2}``, by
+    ``label`` values of its keys, other ``labels`` are the same for all of
+    them.
+    """
+    counter = Counter(name, documentation, tuple(labels) + (label,))
+    for key, value in sorted(dict(stats).items()):
+        counter.inc(value, **dict(labels, **{label: key}))
+    return counter
+
+
+def ratio_gauge(name, documentation, hits, misses):
+    """
+    A gauge of the ratio of ``hits``, ``NaN`` until there is any.
+    """
+    gauge = Gauge(name, documentation)
+    total = hits + misses
+    gauge.set(hits / float(total) if total else float('nan'))
+    return gauge
+
+
+def pool_gauges(pool):
+    """
+    Gauges of a SQLAlchemy connection pool, none for pools without a size,
+    e.g. the ``SingletonThreadPool`` of in-memory SQLite databases.
+    """
+    if not all(callable(getattr(pool, name, None)) for name in ('size', 'checkedin', 'checkedout', 'overflow')):
+        return []
+    gauges = []
+    for name, documentation, value in (
+            ('size', "Configured size of the database connection pool", pool.size()),
+            ('checked_in', "Idle connections of the database connection pool", pool.checkedin()),
+            ('checked_out', "Connections in use of the database connection pool", pool.checkedout()),
+            ('overflow', "Connections over the size of the database connection pool", pool.overflow()),
+    ):
+        gauge = Gauge('catalog_db_pool_%s' % name, documentation)
+        gauge.set(value)
+        gauges.append(gauge)
+    return gauges
+
+
+class Metrics(object):
+    """
+    Metrics registry and Flask extension exposing them.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.directory = None
+        self._changed = False
+        self._saver_pid = None
+        self._metrics = OrderedDict()
+        self._collectors = OrderedDict()
+        self._lock = threading.Lock()
+        self.requests = self.counter(
+            'catalog_http_requests_total', "HTTP requests by route and status", ('method', 'route', 'status')
+        )
+        self.request_duration = self.histogram(
+            'catalog_http_request_duration_seconds', "HTTP request durations by route", ('method', 'route')
+        )
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.directory = app.config.get('METRICS_MULTIPROCESS_DIR')
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', self.view)
+
+    def _register(self, metric):
+        with self._lock:
+            registered = self._metrics.setdefault(metric.name, metric)
+        if type(registered) is not type(metric) or registered.labelnames != metric.labelnames:
+            raise ValueError("Metric %s is already registered with other labels." % metric.name)
+        return registered
+
+    def counter(self, name, documentation, labelnames=()):
+        """
+        Returns:
+            counter (Counter) - registered with ``name``, it is created
+            unless it is already registered.
+        """
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets=buckets))
+
+    def register_collector(self, name, collector):
+        """
+        Register (or replace) a ``collector``, a callable returning metrics
+        computed when they are scraped.
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def _multiprocess_directory(self):
+        if self.directory is not None:
+            return self.directory
+        # Avoid circular dependency
+        from catalog.extensions import server
+        return server.directory
+
+    def save(self, directory):
+        """
+        Save declared counters and histograms of this process to a file of
+        ``directory``.
+        """
+        with self._lock:
+            metrics = [metric for metric in self._metrics.values() if not isinstance(metric, Gauge)]
+        path = os.path.join(directory, '%d.json' % os.getpid())
+        with open(path + '.tmp', 'w') as metrics_file:
+            json.dump({metric.name: metric.values() for metric in metrics}, metrics_file)
+        # Scrapes never read a partially written file
+        os.replace(path + '.tmp', path)
+
+    def _save_changes(self, directory):
+        while True:
+            time.sleep(SAVE_INTERVAL)
+            if self._changed:
+                self._changed = False
+                try:
+                    self.save(directory)
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("Metrics cannot be saved to %s.", directory)
+
+    def _mark_changed(self):
+        directory = self._multiprocess_directory()
+        if directory is None:
+            return
+        self._changed = True
+        # Threads do not survive forks, every worker starts its own saver
+        pid = os.getpid()
+        with self._lock:
+            if self._saver_pid == pid:
+                return
+            self._saver_pid = pid
+        saver = threading.Thread(target=self._save_changes, args=(directory,), name='metrics-saver')
+        saver.daemon = True
+        saver.start()
+
+    def _merge(self, directory):
+        """
+        Returns:
+            metrics (list) - declared counters and histograms summed up over
+            the saved files of all the processes.
+        """
+        values = {}
+        for file_name in os.listdir(directory):
+            if not file_name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, file_name)) as metrics_file:
+                    saved = json.load(metrics_file)
+            except (IOError, ValueError):
+                log.warning("Metrics file %s cannot be read.", file_name)
+                continue
+            for name, metric_values in saved.items():
+                totals = values.setdefault(name, OrderedDict())
+                for key, value in metric_values:
+                    key = tuple(key)
+                    if isinstance(value, list):
+                        total = totals.get(key) or [0] * len(value)
+                        totals[key] = [sum(pair) for pair in zip(total, value)]
+                    else:
+                        totals[key] = totals.get(key, 0) + value
+        with self._lock:
+            metrics = [metric for metric in self._metrics.values() if not isinstance(metric, Gauge)]
+        return [metric.copy(values.get(metric.name, {})) for metric in metrics]
+
+    def collect(self):
+        directory = self._multiprocess_directory() if self.enabled else None
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        if directory is not None:
+            self.save(directory)
+            process_metrics = [metric for metric in metrics if isinstance(metric, Gauge)]
+            metrics = self._merge(directory)
+        else:
+            process_metrics = metrics
+            metrics = []
+        for name, collector in collectors:
+            try:
+                process_metrics.extend(collector())
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Metrics collector %s has failed.", name)
+        if directory is not None:
+            pid = str(os.getpid())
+            process_metrics = [
+                metric.copy(
+                    [(key + (pid,), value) for key, value in metric.values()], metric.labelnames + ('pid',)
+                ) for metric in process_metrics
+            ]
+        return metrics + process_metrics
+
+    def expose(self):
+        """
+        Returns:
+            text (str) - all metrics in the Prometheus text format.
+        """
+        # Metrics of the same name, e.g. from several collectors, are
+        # samples of one family
+        families = OrderedDict()
+        for metric in self.collect():
+            families.setdefault(metric.name, []).append(metric)
+        lines = []
+        for family in families.values():
+            lines.extend(family[0].header())
+            for metric in family:
+                lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        return flask.Response(self.expose(), content_type=CONTENT_TYPE)
+
+    def _before_request(self):
+        flask.g._metrics_started = time.perf_counter()
+
+    def _record(self, status):
+        started = flask.g.pop('_metrics_started', None)
+        if started is None:
+            return
+        url_rule = flask.request.url_rule
+        route = url_rule.rule if url_rule is not None else UNMATCHED_ROUTE
+        method = flask.request.method
+        # Status codes may be ``HTTPStatus`` members
+        self.requests.inc(method=method, route=route, status=int(status))
+        self.request_duration.observe(time.perf_counter() - started, method=method, route=route)
+        self._mark_changed()
+
+    def _after_request(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _teardown_request(self, exception=None):
+        # Unhandled exceptions skip ``after_request``
+        if exception is not None:
+            self._record(500)
@@ -88,7 +88,7 @@ class PasswordRequiredRule(DenyAbortMixin, Rule):
         self._password = password
 
     def check(self):
-        return current_user.password == self._password
+        return current_user.verify_password(self._password)
 
 
 class AdminRoleRule(ActiveUserRoleRule):
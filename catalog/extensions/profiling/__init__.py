@@ -0,0 +1,243 @@
+# encoding: utf-8
+"""
+Request profiler
+================
+
+Opt-in (``PROFILING_ENABLED`` config) instrumentation of requests. Every
+request records:
+
+* its wall time;
+* the time spent in ``Namespace.login_required`` and
+  ``Namespace.permission_required`` (OAuth2 validation and permission
+  rules), in webargs parsing (``Namespace.parameters``) and in response
+  serialization (``Namespace.response``), the rest is the ``app`` time;
+* the number and the duration of its SQL statements, from engine events.
+
+Phase times are exclusive, e.g. a handler called by ``login_required`` does
+not count as authentication time, while SQL statements are timed on their
+own, whatever phase runs them.
+
+Every request is reported in a ``Server-Timing`` response header and a
+``catalog.profiling`` log line (a JSON object). Endpoints keep their last
+``PROFILING_WINDOW`` requests, the slowest ones are listed by
+``Profiler.report`` (``/api/v1/_debug/profile``).
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from functools import wraps
+
+import flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+APP_PHASE = 'app'
+PHASES = ('auth', 'parse', 'serialize', APP_PHASE)
+
+# Number of the slowest statements of a request reported in its log line
+SLOW_STATEMENTS = 3
+
+
+def _percentile(sorted_values, percent):
+    # Nearest rank
+    index = max(0, int(round(percent / 100.0 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+class RequestProfile(object):
+    """
+    Timings of one request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = defaultdict(float)
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = []
+        # Current phase and the time it has been resumed
+        self._stack = [(APP_PHASE, self.started)]
+
+    def enter(self, phase):
+        now = time.perf_counter()
+        current, resumed = self._stack[-1]
+        self.phases[current] += now - resumed
+        self._stack.append((phase, now))
+
+    def exit(self):
+        now = time.perf_counter()
+        phase, resumed = self._stack.pop()
+        self.phases[phase] += now - resumed
+        self._stack[-1] = (self._stack[-1][0], now)
+
+    def add_statement(self, statement, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        self.statements.append((duration, statement))
+        if len(self.statements) > SLOW_STATEMENTS:
+            self.statements.remove(min(self.statements))
+
+    def finish(self):
+        """
+        Returns:
+            total (float) - wall time of the request in seconds.
+        """
+        now = time.perf_counter()
+        current, resumed = self._stack[-1]
+        self.phases[current] += now - resumed
+        self._stack[-1] = (current, now)
+        return now - self.started
+
+
+class Profiler(object):
+    """
+    Request profiler with rolling per-endpoint statistics.
+    """
+
+    SERVER_TIMING_HEADER = 'Server-Timing'
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.window = 100
+        self.top = 10
+        self.stats = {'requests': 0}
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.window = app.config.get('PROFILING_WINDOW', 100)
+        self.top = app.config.get('PROFILING_TOP', 10)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def current(self):
+        """
+        Returns:
+            profile (RequestProfile) - of the current request or ``None``.
+        """
+        if not self.enabled or not flask.has_request_context():
+            return None
+        return getattr(flask.g, '_request_profile', None)
+
+    def profiled(self, phase):
+        """
+        A decorator which counts the time spent in a function, except in the
+        nested phases, as ``phase`` time.
+        """
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                profile = self.current()
+                if profile is None:
+                    return func(*args, **kwargs)
+                profile.enter(phase)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    profile.exit()
+
+            return wrapper
+
+        return decorator
+
+    def _before_request(self):
+        if self.enabled:
+            flask.g._request_profile = RequestProfile()
+
+    def _after_request(self, response):
+        profile = self.current()
+        if profile is None:
+            return response
+        del flask.g._request_profile
+        total = profile.finish()
+
+        timings = ['%s;dur=%.3f' % (phase, profile.phases[phase] * 1000) for phase in PHASES]
+        timings.append('sql;dur=%.3f;desc="%d queries"' % (profile.sql_time * 1000, profile.sql_count))
+        timings.append('total;dur=%.3f' % (total * 1000))
+        response.headers.add(self.SERVER_TIMING_HEADER, ', '.join(timings))
+
+        endpoint = None
+        if flask.request.url_rule is not None:
+            endpoint = '%s %s' % (flask.request.method, flask.request.url_rule.rule)
+            self._record(endpoint, total, profile)
+
+        log.info(json.dumps({
+            'endpoint': endpoint,
+            'path': flask.request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            'phases_ms': {phase: round(profile.phases[phase] * 1000, 3) for phase in PHASES},
+            'sql_count': profile.sql_count,
+            'sql_ms': round(profile.sql_time * 1000, 3),
+            'slowest_sql': [
+                {'ms': round(duration * 1000, 3), 'statement': statement[:200]}
+                for duration, statement in sorted(profile.statements, reverse=True)
+            ],
+        }, sort_keys=True))
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # pylint: disable=too-many-arguments,unused-argument
+        if self.current() is not None:
+            conn.info.setdefault('profiler_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # pylint: disable=too-many-arguments,unused-argument
+        started = conn.info.get('profiler_started')
+        profile = self.current()
+        if started and profile is not None:
+            profile.add_statement(statement, time.perf_counter() - started.pop())
+
+    def _record(self, endpoint, total, profile):
+        with self._lock:
+            self.stats['requests'] += 1
+            requests = self._endpoints.get(endpoint)
+            if requests is None or requests.maxlen != self.window:
+                requests = self._endpoints[endpoint] = deque(requests or (), maxlen=self.window)
+            requests.append((total, profile.sql_count, profile.sql_time, dict(profile.phases)))
+
+    def report(self, top=None):
+        """
+        Returns:
+            endpoints (list) - statistics of the ``top`` endpoints with the
+            slowest 95th percentile over their last requests, times are in
+            milliseconds.
+        """
+        with self._lock:
+            endpoints = {endpoint: list(requests) for endpoint, requests in self._endpoints.items()}
+
+        report = []
+        for endpoint, requests in endpoints.items():
+            count = len(requests)
+            totals = sorted(request[0] for request in requests)
+            report.append({
+                'endpoint': endpoint,
+                'count': count,
+                'mean_ms': sum(totals) / count * 1000,
+                'p50_ms': _percentile(totals, 50) * 1000,
+                'p95_ms': _percentile(totals, 95) * 1000,
+                'max_ms': totals[-1] * 1000,
+                'sql_count': sum(request[1] for request in requests) / float(count),
+                'sql_ms': sum(request[2] for request in requests) / count * 1000,
+                'phases_ms': {
+                    phase: sum(request[3].get(phase, 0) for request in requests) / count * 1000
+                    for phase in PHASES
+                },
+            })
+        report.sort(key=lambda item: item['p95_ms'], reverse=True)
+        return report[:self.top if top is None else top]
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
@@ -0,0 +1,240 @@
+# encoding: utf-8
+"""
+Rate limiter
+============
+
+Limits how often a user, and an OAuth2 client on behalf of all its users, may
+call write endpoints, see ``Namespace.rate_limited``. Requests over a limit
+are answered with ``429 Too Many Requests`` and a ``Retry-After`` header.
+
+Limits are sliding windows (``"10/minute"``), approximated by two fixed
+window counters: the count of the previous window is weighted by the part of
+it which still overlaps the sliding window. That is two counters per
+identity, whatever the limit, and an atomic increment per request.
+
+Limits of an endpoint scope can be overridden with the ``RATE_LIMITS``
+config (``{'comments': '5/minute', 'comments:client': '100/minute'}``) and
+the limiter is switched off with ``RATE_LIMIT_ENABLED``.
+
+Backends (``RATE_LIMIT_TYPE`` config):
+
+* ``memory`` - in-process counters, each worker counts on its own (default);
+* ``redis`` - any client speaking the Redis protocol
+  (``RATE_LIMIT_REDIS_URL``), shared by all the workers.
+"""
+import logging
+import math
+import re
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 60 * 60,
+    'day': 24 * 60 * 60,
+}
+
+
+def parse_limit(limit):
+    """
+    Parse ``"<count>/[<multiplier>]<period>"``, e.g. ``"10/minute"`` or
+    ``"100/15minute"``.
+
+    Returns:
+        (count, seconds) - number of requests allowed per sliding window.
+    """
+    match = re.match(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$', limit)
+    if match is None:
+        raise ValueError("Invalid rate limit: %r" % limit)
+    count, multiplier, period = match.groups()
+    return int(count), int(multiplier or 1) * PERIODS[period]
+
+
+class MemoryBackend(object):
+    """
+    In-process expiring counters.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._next_sweep = 0
+
+    def _sweep(self, now):
+        # Expired counters are dropped at most once a second
+        if now >= self._next_sweep:
+            self._counters = {
+                key: item for key, item in self._counters.items() if item[1] > now
+            }
+            self._next_sweep = now + 1
+
+    def get(self, key):
+        with self._lock:
+            item = self._counters.get(key)
+            if item is None or item[1] <= time.time():
+                return 0
+            return item[0]
+
+    def incr(self, key, amount, timeout):
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            value, expires = self._counters.get(key, (0, 0))
+            if expires <= now:
+                value, expires = 0, now + timeout
+            value += amount
+            self._counters[key] = (value, expires)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class RedisBackend(object):
+    """
+    Backend on top of a Redis protocol client, e.g. ``redis.StrictRedis``.
+    Only ``get``, ``incrby`` and ``expire`` are used.
+    """
+
+    def __init__(self, client, prefix='catalog:rate-limit:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        # Optional dependency, only required for this backend
+        import redis
+        return cls(redis.StrictRedis.from_url(url), **kwargs)
+
+    def get(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key, amount, timeout):
+        pipeline = self.client.pipeline()
+        pipeline.incrby(self.prefix + key, amount)
+        pipeline.expire(self.prefix + key, int(math.ceil(timeout)))
+        value, _ = pipeline.execute()
+        return value
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class RateLimiter(object):
+    """
+    Sliding window rate limiter with hit/reject statistics.
+    """
+
+    RETRY_AFTER_HEADER = 'Retry-After'
+
+    def __init__(self, app=None):
+        self.backend = MemoryBackend()
+        self.enabled = True
+        self.limits = {}
+        self.stats = {'hits': 0, 'rejected': 0}
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend_type = app.config.get('RATE_LIMIT_TYPE', 'memory')
+        if backend_type == 'memory':
+            self.backend = MemoryBackend()
+        elif backend_type == 'redis':
+            self.backend = RedisBackend.from_url(app.config['RATE_LIMIT_REDIS_URL'])
+        else:
+            raise ValueError("Unknown RATE_LIMIT_TYPE: %s" % backend_type)
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        self.limits = {
+            scope: parse_limit(limit) for scope, limit in app.config.get('RATE_LIMITS', {}).items()
+        }
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def limit_of(self, scope, default):
+        """
+        Returns:
+            (count, seconds) - the configured limit of ``scope`` or ``default``.
+        """
+        if scope in self.limits:
+            return self.limits[scope]
+        return parse_limit(default) if isinstance(default, str) else default
+
+    def _hit(self, key, limit, now):
+        """
+        Count a request of ``key`` against ``limit``, ``(count, seconds)``.
+        Rejected requests are not counted.
+
+        Returns:
+            (retry_after, counter) - ``retry_after`` is ``0`` if the request
+            is allowed, otherwise the number of seconds after which it would
+            be, ``counter`` is the incremented counter.
+        """
+        count, window = limit
+        current_window = int(now // window)
+        elapsed = (now - current_window * window) / window
+
+        previous = self.backend.get('%s:%d' % (key, current_window - 1))
+        counter = '%s:%d' % (key, current_window)
+        current = self.backend.incr(counter, 1, timeout=2 * window)
+        if previous * (1 - elapsed) + current <= count:
+            return 0, counter
+
+        self.backend.incr(counter, -1, timeout=2 * window)
+        recorded = current - 1
+        if previous and recorded < count:
+            # Wait until the previous window weighs little enough
+            retry_after = (1 - (count - recorded - 1) / previous - elapsed) * window
+        else:
+            # Wait for the next window, then for the current one to weigh
+            # little enough
+            retry_after = (1 - elapsed) * window
+            if recorded:
+                retry_after += max(0, 1 - (count - 1) / recorded) * window
+        # Rounding errors must not add a second
+        return max(1, int(math.ceil(retry_after - 1e-9))), None
+
+    def check(self, identities, scope, limit, client_limit=None, now=None):
+        """
+        Count a request against the limits of all ``identities``. A request
+        rejected by any limit is not counted by the others.
+
+        Arguments:
+            identities (dict) - ``{'user': 1, 'client': 'documentation'}``,
+                ``None`` values are skipped.
+            scope (str) - name of the limited endpoints, e.g. ``comments``.
+            limit (str) - default limit per user.
+            client_limit (str) - default limit per OAuth2 client.
+
+        Returns:
+            retry_after (int) - ``0`` if the request is allowed, otherwise
+            the number of seconds after which it would be.
+        """
+        if not self.enabled:
+            return 0
+        now = time.time() if now is None else now
+        limits = {
+            'user': self.limit_of(scope, limit),
+            'client': self.limit_of('%s:client' % scope, client_limit) if client_limit else None,
+        }
+        counters = []
+        for kind, identity in sorted(identities.items()):
+            if identity is None or limits.get(kind) is None:
+                continue
+            retry_after, counter = self._hit('%s:%s:%s' % (scope, kind, identity), limits[kind], now)
+            if retry_after:
+                for accepted_counter, window in counters:
+                    self.backend.incr(accepted_counter, -1, timeout=2 * window)
+                self._count('rejected')
+                return retry_after
+            counters.append((counter, limits[kind][1]))
+        self._count('hits')
+        return 0
@@ -0,0 +1,189 @@
+# encoding: utf-8
+"""
+Full-text search
+================
+
+An inverted index over text columns of a model, backed by the database:
+
+* SQLite: an external-content FTS5 table kept up to date by triggers and
+  ranked with BM25;
+* MySQL: a ``FULLTEXT`` index maintained by InnoDB and queried in boolean
+  mode;
+* other dialects fall back to ``LIKE`` matching without ranking.
+
+Since the index is maintained by the database itself, every write path
+(ORM flushes as well as bulk ``Query.update``) keeps it up to date. The
+SQLite index refers to rows by ``rowid``, which ``VACUUM`` may renumber, so
+compact the database with the ``app.db.vacuum`` task which rebuilds it.
+"""
+import logging
+import re
+
+from sqlalchemy import DDL, and_, desc, event, false, literal_column, or_, text
+from sqlalchemy.sql import column, table
+
+__all__ = ['FullTextIndex']
+
+log = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def create_statements(dialect_name, table_name, columns):
+    """
+    DDL statements which create the index over ``columns`` of a table on a
+    given dialect. Rows which already exist are indexed by
+    ``rebuild_statements``.
+    """
+    params = dict(
+        name='%s_fts' % table_name,
+        table=table_name,
+        columns=', '.join(columns),
+        new_values=', '.join('new.%s' % column for column in columns),
+        old_values=', '.join('old.%s' % column for column in columns),
+    )
+    if dialect_name == 'sqlite':
+        return [
+            "CREATE VIRTUAL TABLE {name} USING fts5("
+            "{columns}, content='{table}', content_rowid='rowid', prefix='2 3')".format(**params),
+            "CREATE TRIGGER {name}_ai AFTER INSERT ON {table} BEGIN "
+            "INSERT INTO {name}(rowid, {columns}) VALUES (new.rowid, {new_values}); "
+            "END".format(**params),
+            "CREATE TRIGGER {name}_ad AFTER DELETE ON {table} BEGIN "
+            "INSERT INTO {name}({name}, rowid, {columns}) "
+            "VALUES ('delete', old.rowid, {old_values}); "
+            "END".format(**params),
+            "CREATE TRIGGER {name}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+            "INSERT INTO {name}({name}, rowid, {columns}) "
+            "VALUES ('delete', old.rowid, {old_values}); "
+            "INSERT INTO {name}(rowid, {columns}) VALUES (new.rowid, {new_values}); "
+            "END".format(**params),
+        ]
+    if dialect_name == 'mysql':
+        return ["ALTER TABLE {table} ADD FULLTEXT INDEX {name} ({columns})".format(**params)]
+    return []
+
+
+def drop_statements(dialect_name, table_name):
+    """
+    DDL statements which drop the index of a table on a given dialect.
+    """
+    name = '%s_fts' % table_name
+    if dialect_name == 'sqlite':
+        # Triggers are dropped together with the content table
+        return ["DROP TABLE IF EXISTS %s" % name]
+    if dialect_name == 'mysql':
+        return ["ALTER TABLE %s DROP INDEX %s" % (table_name, name)]
+    return []
+
+
+def rebuild_statements(dialect_name, table_name):
+    """
+    Statements which rebuild the index of a table from its current rows on a
+    given dialect.
+
+    The SQLite index refers to rows by their implicit ``rowid``. Tables keyed
+    by a string primary key don't alias ``rowid`` to a column, so ``VACUUM``
+    may renumber their rows; the index has to be rebuilt afterwards (see the
+    ``app.db.vacuum`` task). InnoDB maintains ``FULLTEXT`` indexes itself.
+    """
+    if dialect_name == 'sqlite':
+        return ["INSERT INTO {name}({name}) VALUES ('rebuild')".format(name='%s_fts' % table_name)]
+    return []
+
+
+class FullTextIndex(object):
+    """
+    Full-text index over ``columns`` of a model table.
+
+    Example:
+    >>> search_index = FullTextIndex(Dataset, ('title', 'description'), weights=(10.0, 1.0))
+    >>> search_index.search(Dataset.query, 'world gdp')
+    """
+
+    #: All indexes declared by the models, so they can be rebuilt together.
+    registry = []
+
+    def __init__(self, model, columns, weights=None):
+        """
+        Args:
+            model (type) - a Flask-SQLAlchemy model class.
+            columns (tuple) - names of indexed text columns.
+            weights (tuple) - optional BM25 weights of the columns (SQLite
+                only), by default all columns weigh the same.
+        """
+        self.model = model
+        self.table = model.__table__
+        self.name = '%s_fts' % self.table.name
+        self.columns = tuple(columns)
+        self.weights = tuple(weights) if weights else (1.0,) * len(self.columns)
+        assert len(self.weights) == len(self.columns)
+        self.registry.append(self)
+
+        for dialect_name in ('sqlite', 'mysql'):
+            for statement in create_statements(dialect_name, self.table.name, self.columns):
+                event.listen(self.table, 'after_create', DDL(statement).execute_if(dialect=dialect_name))
+        for statement in drop_statements('sqlite', self.table.name):
+            event.listen(self.table, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
+
+    def rebuild(self, connection):
+        """
+        Rebuild the index from the current rows of the table.
+        """
+        for statement in rebuild_statements(connection.dialect.name, self.table.name):
+            connection.execute(text(statement))
+
+    @staticmethod
+    def tokenize(search_text):
+        return TOKEN_PATTERN.findall(search_text or '')
+
+    def search(self, query, search_text):
+        """
+        Filter a query of the indexed model by ``search_text`` and order it by
+        relevance. All terms must match, every term is matched as a prefix.
+
+        Returns:
+            query (Query) - so it can be paginated and eager loaded as usual.
+        """
+        terms = self.tokenize(search_text)
+        if not terms:
+            return query.filter(false())
+
+        dialect_name = query.session.get_bind(self.model.__mapper__).dialect.name
+        if dialect_name == 'sqlite':
+            return self._search_sqlite(query, terms)
+        if dialect_name == 'mysql':
+            return self._search_mysql(query, terms)
+
+        log.warning("Full-text search is not supported on %s, falling back to LIKE", dialect_name)
+        return self._search_like(query, terms)
+
+    def _search_sqlite(self, query, terms):
+        match = ' '.join('"%s"*' % term for term in terms)
+        fts_table = table(self.name, column('rowid'))
+        rank = 'bm25({name}, {weights})'.format(
+            name=self.name,
+            weights=', '.join('%r' % float(weight) for weight in self.weights)
+        )
+        return query \
+            .join(fts_table, fts_table.c.rowid == literal_column('%s.rowid' % self.table.name)) \
+            .filter(text('%s MATCH :fts_match' % self.name).bindparams(fts_match=match)) \
+            .order_by(text(rank))
+
+    def _search_mysql(self, query, terms):
+        match = text(
+            'MATCH ({columns}) AGAINST (:fts_match IN BOOLEAN MODE)'.format(
+                columns=', '.join('%s.%s' % (self.table.name, column) for column in self.columns)
+            )
+        ).bindparams(fts_match=' '.join('+%s*' % term for term in terms))
+        return query.filter(match).order_by(desc(match))
+
+    def _search_like(self, query, terms):
+        return query.filter(
+            and_(*(
+                or_(*(
+                    self.table.c[column].ilike('%%%s%%' % term) for column in self.columns
+                ))
+                for term in terms
+            ))
+        )
@@ -0,0 +1,160 @@
+# encoding: utf-8
+"""
+Production server
+=================
+
+``invoke app.run.serve`` serves the application with gunicorn instead of the
+Werkzeug development server: a master process pre-forks ``SERVER_WORKERS``
+worker processes of ``SERVER_THREADS`` threads each. With ``SERVER_PRELOAD``
+the master creates the application once, before forking, so workers share
+its memory copy-on-write and start instantly.
+
+Forked workers must not use what the master has opened:
+
+* a pooled database connection remembers the process which opened it and
+  another process discards it on checkout (SQLAlchemy's recipe for pools
+  and multiprocessing), so its socket is never shared or closed by a fork;
+* threads do not survive ``fork``, so extensions and modules register
+  ``Server.after_fork`` callbacks which restart their thread pools and
+  background threads in every worker.
+
+Workers do not share memory:
+
+* the in-memory response cache is disabled with several workers, as a
+  write would not invalidate the responses cached by the other ones,
+  unless ``RESPONSE_CACHE_TYPE`` is ``redis``. Name resolvers and
+  leaderboards of datasets notice the changes of other workers by the
+  shared response cache versions only, otherwise they don't cache names and
+  reload the boards on expiry;
+* in-memory rate limit counters are per worker, the ``redis`` backend
+  shares them;
+* the in-memory bearer token cache is disabled with several workers, as a
+  revoked token would stay valid in the other ones, unless
+  ``OAUTH2_TOKEN_CACHE_TYPE`` is ``redis``;
+* metrics of every worker are saved to ``Server.directory`` (or
+  ``METRICS_MULTIPROCESS_DIR``) and merged when they are scraped, see
+  ``catalog.extensions.metrics``.
+
+Graceful reloads (``invoke app.run.reload``) start a new master with the new
+code (``SIGUSR2``) and stop the old one (``SIGTERM``) once the new one runs,
+the old workers finish their requests within ``SERVER_GRACEFUL_TIMEOUT``.
+Threaded workers (``SERVER_THREADS`` above 1) may close connections they
+have accepted but not handled yet when they stop.
+``SIGHUP`` to the master replaces workers with the new configuration only,
+the code of preloaded applications is not reloaded.
+"""
+import logging
+import os
+import shutil
+import tempfile
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool
+
+log = logging.getLogger(__name__)
+
+# gunicorn settings by config names
+OPTIONS = {
+    'SERVER_BIND': 'bind',
+    'SERVER_WORKERS': 'workers',
+    'SERVER_THREADS': 'threads',
+    'SERVER_PRELOAD': 'preload_app',
+    'SERVER_TIMEOUT': 'timeout',
+    'SERVER_GRACEFUL_TIMEOUT': 'graceful_timeout',
+    'SERVER_KEEPALIVE': 'keepalive',
+    'SERVER_MAX_REQUESTS': 'max_requests',
+    'SERVER_PIDFILE': 'pidfile',
+    'SERVER_ACCESS_LOG': 'accesslog',
+}
+
+
+def _remember_pid(dbapi_connection, connection_record):
+    # pylint: disable=unused-argument
+    connection_record.info['pid'] = os.getpid()
+
+
+def _check_pid(dbapi_connection, connection_record, connection_proxy):
+    # pylint: disable=unused-argument
+    pid = os.getpid()
+    if connection_record.info.get('pid', pid) != pid:
+        # The connection belongs to the parent process, it is dropped without
+        # being closed and the pool opens another one
+        connection_record.connection = connection_proxy.connection = None
+        raise exc.DisconnectionError(
+            "Connection record belongs to pid %s, attempting to check out in pid %s"
+            % (connection_record.info['pid'], pid)
+        )
+
+
+class Server(object):
+    """
+    Settings and fork safety of pre-forking servers.
+    """
+
+    def __init__(self, app=None):
+        self._after_fork = []
+        # Worker processes and their shared temporary directory while serving
+        self.workers = 1
+        self.directory = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # pylint: disable=unused-argument
+        # Callbacks are registered by extensions and modules of the app
+        self._after_fork = []
+        if not event.contains(Pool, 'connect', _remember_pid):
+            event.listen(Pool, 'connect', _remember_pid)
+            event.listen(Pool, 'checkout', _check_pid)
+
+    def after_fork(self, callback):
+        """
+        Register a ``callback`` called in every forked worker, e.g. to restart
+        a background thread. It can be used as a decorator.
+        """
+        self._after_fork.append(callback)
+        return callback
+
+    def forked(self):
+        """
+        Run the ``after_fork`` callbacks, a failing callback does not prevent
+        the others.
+        """
+        for callback in self._after_fork:
+            try:
+                callback()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("After fork callback %r has failed.", callback)
+
+    def options(self, app, **overrides):
+        """
+        Returns:
+            options (dict) - gunicorn settings from ``SERVER_*`` config values
+            and non-``None`` ``overrides`` of them, e.g. ``workers=4``.
+        """
+        options = {
+            setting: app.config[name] for name, setting in OPTIONS.items() if app.config.get(name) is not None
+        }
+        options.update((setting, value) for setting, value in overrides.items() if value is not None)
+        if options.get('max_requests'):
+            # Workers do not restart all at once
+            options.setdefault('max_requests_jitter', max(1, options['max_requests'] // 10))
+        options['post_fork'] = lambda arbiter, worker: self.forked()
+        return options
+
+    def serve(self, load, options):
+        """
+        Serve the application returned by ``load`` with gunicorn until the
+        master process is stopped.
+        """
+        from .application import Application
+
+        self.workers = options.get('workers', 1)
+        self.directory = tempfile.mkdtemp(prefix='catalog-server-')
+        master_pid = os.getpid()
+        try:
+            Application(load, options).run()
+        finally:
+            # Exiting workers unwind this frame too
+            if os.getpid() == master_pid:
+                shutil.rmtree(self.directory, ignore_errors=True)
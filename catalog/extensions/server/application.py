@@ -0,0 +1,27 @@
+# encoding: utf-8
+"""
+gunicorn application
+--------------------
+"""
+from gunicorn.app.base import BaseApplication
+
+
+class Application(BaseApplication):
+    """
+    gunicorn application of a Flask application returned by ``load``, in the
+    master if it is preloaded, otherwise in every worker.
+    """
+
+    def __init__(self, load, options):
+        self._load = load
+        self.options = options
+        super(Application, self).__init__()
+
+    def load_config(self):
+        for setting, value in self.options.items():
+            if setting not in self.cfg.settings:
+                raise ValueError("Unknown gunicorn setting %s." % setting)
+            self.cfg.set(setting, value)
+
+    def load(self):
+        return self._load()
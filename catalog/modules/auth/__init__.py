@@ -11,9 +11,9 @@ from flask_login import current_user
 from flask_oauthlib import provider
 
 from catalog.extensions import db
-from catalog.extensions import login_manager, oauth2
+from catalog.extensions import login_manager, metrics, oauth2
 from catalog.extensions.api import current_api
-from catalog.modules.auth.models import OAuth2Client, OAuth2Grant, OAuth2Token
+from catalog.modules.auth.models import CachedOAuth2Token, OAuth2Client, OAuth2Grant, OAuth2Token
 from catalog.modules.users.models import User
 
 log = logging.getLogger(__name__)
@@ -32,7 +32,7 @@ class OAuth2RequestValidator(provider.OAuth2RequestValidator):
         super(OAuth2RequestValidator, self).__init__(
             usergetter=self._usergetter,
             clientgetter=self._client_class.find,
-            tokengetter=self._token_class.find,
+            tokengetter=self._tokengetter,
             grantgetter=self._grant_class.find,
             tokensetter=self._tokensetter,
             grantsetter=self._grantsetter,
@@ -41,11 +41,32 @@ class OAuth2RequestValidator(provider.OAuth2RequestValidator):
     def _usergetter(self, username, password, client, request):
         return User.find_with_password(username, password)
 
+    def _tokengetter(self, access_token=None, refresh_token=None):
+        """
+        Bearer tokens of API requests are served from ``oauth2.token_cache``
+        once validated, which saves the token and client queries per request.
+        """
+        if access_token:
+            token_info = oauth2.token_cache.get(access_token)
+            if token_info is not None:
+                return CachedOAuth2Token(access_token=access_token, **token_info)
+
+        token = self._token_class.find(access_token=access_token, refresh_token=refresh_token)
+        if token is not None and access_token:
+            token.cache()
+        return token
+
     def _tokensetter(self, token, request, *args, **kwargs):
         # TODO: review expiration time
         expires_in = token['expires_in']
         expires = datetime.utcnow() + timedelta(seconds=expires_in)
 
+        if request.grant_type == 'refresh_token':
+            # The refreshed token is going to be replaced on clients
+            refreshed_token = self._token_class.find(refresh_token=request.refresh_token)
+            if refreshed_token is not None:
+                oauth2.token_cache.invalidate(refreshed_token.access_token)
+
         try:
             with db.session.begin():
                 token_instance = self._token_class(
@@ -115,3 +136,12 @@ def init_app(app, **kwargs):
     # Mount authentication routes
     app.register_blueprint(views.auth_blueprint)
     current_api.add_namespace(resources.api)
+
+    from .cleanup import collect_metrics
+    metrics.register_collector('oauth2_gc', collect_metrics)
+
+    # Purge expired tokens and grants in the background if configured
+    interval = app.config.get('OAUTH2_GC_INTERVAL', 0)
+    if interval > 0 and not app.testing:
+        from .cleanup import ExpiredTokensSweeper
+        ExpiredTokensSweeper(app, interval).start()
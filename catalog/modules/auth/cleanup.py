@@ -0,0 +1,134 @@
+# encoding: utf-8
+"""
+Expired OAuth2 tokens and grants cleanup
+========================================
+
+Tokens and grants are only ever inserted, so expired rows are purged in
+small batches: every batch is a short transaction deleting at most
+``OAUTH2_GC_CHUNK_SIZE`` rows by primary key, which keeps row locks short
+and lets concurrent logins interleave.
+
+Rows are kept for ``OAUTH2_GC_RETENTION_DAYS`` after they expire, since a
+refresh token stays usable after its access token has expired.
+
+The purge is run by the ``app.auth.purge_expired_tokens`` Invoke task or,
+if ``OAUTH2_GC_INTERVAL`` is set, by an in-process background thread.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from catalog.extensions import db
+from catalog.extensions.metrics import Counter, stats_counter
+
+log = logging.getLogger(__name__)
+
+stats = {'runs': 0, 'reclaimed': {}}
+_stats_lock = threading.Lock()
+
+
+def purge_expired(model, retention=timedelta(0), chunk_size=1000):
+    """
+    Delete rows of ``model`` which expired more than ``retention`` ago.
+
+    Args:
+        model (type) - ``OAuth2Token`` or ``OAuth2Grant``.
+        retention (timedelta) - how long expired rows are kept.
+        chunk_size (int) - maximum number of rows deleted per transaction.
+
+    Returns:
+        reclaimed (int) - number of deleted rows.
+    """
+    threshold = datetime.utcnow() - retention
+    reclaimed = 0
+    while True:
+        with db.session.begin():
+            ids = [
+                row_id for row_id, in db.session.query(model.id)
+                .filter(model.expires < threshold)
+                .order_by(model.expires)
+                .limit(chunk_size)
+            ]
+            if ids:
+                model.query \
+                    .filter(model.id.in_(ids)) \
+                    .delete(synchronize_session=False)
+        reclaimed += len(ids)
+        if len(ids) < chunk_size:
+            break
+
+    with _stats_lock:
+        table_stats = stats['reclaimed']
+        table_stats[model.__tablename__] = table_stats.get(model.__tablename__, 0) + reclaimed
+    if reclaimed:
+        log.info("Purged %d expired rows of %s", reclaimed, model.__tablename__)
+    return reclaimed
+
+
+def purge_expired_tokens(retention=None, chunk_size=None):
+    """
+    Purge expired OAuth2 tokens and grants. Defaults are taken from
+    ``OAUTH2_GC_RETENTION_DAYS`` and ``OAUTH2_GC_CHUNK_SIZE`` configs.
+
+    Returns:
+        reclaimed (dict) - number of deleted rows per table.
+    """
+    from flask import current_app
+    from .models import OAuth2Grant, OAuth2Token
+
+    if retention is None:
+        retention = timedelta(days=current_app.config['OAUTH2_GC_RETENTION_DAYS'])
+    if chunk_size is None:
+        chunk_size = current_app.config['OAUTH2_GC_CHUNK_SIZE']
+
+    reclaimed = {
+        model.__tablename__: purge_expired(model, retention=retention, chunk_size=chunk_size)
+        for model in (OAuth2Token, OAuth2Grant)
+    }
+    with _stats_lock:
+        stats['runs'] += 1
+    return reclaimed
+
+
+def collect_metrics():
+    """
+    Metrics of the cleanup runs and purged rows by table.
+    """
+    with _stats_lock:
+        runs = stats['runs']
+        reclaimed = dict(stats['reclaimed'])
+    runs_counter = Counter('catalog_oauth2_gc_runs_total', "Expired OAuth2 tokens and grants cleanup runs")
+    runs_counter.inc(runs)
+    return [
+        runs_counter,
+        stats_counter('catalog_oauth2_gc_reclaimed_total', "Purged expired OAuth2 rows by table", reclaimed, 'table'),
+    ]
+
+
+class ExpiredTokensSweeper(threading.Thread):
+    """
+    Daemon thread purging expired tokens and grants every ``interval``
+    seconds within the application context.
+    """
+
+    def __init__(self, app, interval):
+        super(ExpiredTokensSweeper, self).__init__(name='oauth2-gc')
+        self.daemon = True
+        self.app = app
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            started = time.time()
+            try:
+                with self.app.app_context():
+                    reclaimed = purge_expired_tokens()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Expired OAuth2 tokens purge has failed.")
+            else:
+                log.debug("Expired OAuth2 tokens purge took %.3fs: %s", time.time() - started, reclaimed)
+
+    def stop(self):
+        self._stopped.set()
@@ -11,9 +11,12 @@ More details are available here:
 """
 import enum
 
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
 from sqlalchemy_utils.types import ScalarListType
+from werkzeug.local import LocalProxy
 
-from catalog.extensions import db
+from catalog.extensions import db, oauth2
 
 
 class OAuth2Client(db.Model):
@@ -74,7 +77,8 @@ class OAuth2Grant(db.Model):
     code = db.Column(db.String(length=255), index=True, nullable=False)
 
     redirect_uri = db.Column(db.String(length=255), nullable=False)
-    expires = db.Column(db.DateTime, nullable=False)
+    # Indexed for the expired grants cleanup
+    expires = db.Column(db.DateTime, index=True, nullable=False)
 
     scopes = db.Column(ScalarListType(separator=' '), nullable=False)
 
@@ -115,7 +119,8 @@ class OAuth2Token(db.Model):
 
     access_token = db.Column(db.String(length=255), unique=True, nullable=False)
     refresh_token = db.Column(db.String(length=255), unique=True, nullable=True)
-    expires = db.Column(db.DateTime, nullable=False)
+    # Indexed for the expired tokens cleanup
+    expires = db.Column(db.DateTime, index=True, nullable=False)
     scopes = db.Column(ScalarListType(separator=' '), nullable=False)
 
     @classmethod
@@ -128,3 +133,48 @@ class OAuth2Token(db.Model):
     def delete(self):
         with db.session.begin():
             db.session.delete(self)
+
+    def cache(self):
+        """
+        Store the validated token in ``oauth2.token_cache``.
+        """
+        oauth2.token_cache.set(
+            self.access_token,
+            self.expires,
+            user_id=self.user_id,
+            client_id=self.client_id,
+            scopes=list(self.scopes),
+        )
+
+
+@event.listens_for(OAuth2Token, 'after_update')
+@event.listens_for(OAuth2Token, 'after_delete')
+def _invalidate_cached_token(mapper, connection, token):
+    # Flushed changes are not visible to other requests until they commit
+    oauth2.token_cache.invalidate_on_commit(object_session(token), token.access_token)
+
+
+class CachedOAuth2Token(object):
+    """
+    A validated bearer token restored from ``oauth2.token_cache``. It quacks
+    like ``OAuth2Token`` for ``OAuth2RequestValidator``: the user is loaded
+    by primary key, the client only on the first access.
+    """
+
+    def __init__(self, access_token, user_id, client_id, scopes, expires):
+        self.access_token = access_token
+        self.user_id = user_id
+        self.client_id = client_id
+        self.scopes = scopes
+        self.expires = expires
+        self.client = LocalProxy(lambda: OAuth2Client.find(client_id))
+
+    @property
+    def user(self):
+        from catalog.modules.users.models import User
+        return User.query.get(self.user_id)
+
+    def delete(self):
+        token = OAuth2Token.find(access_token=self.access_token)
+        if token is not None:
+            token.delete()
@@ -3,10 +3,11 @@
 import uuid
 from enum import IntEnum
 
+from sqlalchemy.orm import joinedload
 from sqlalchemy.sql import func
 
 from catalog.exception import ObjectDoesNotExist
-from catalog.extensions import db
+from catalog.extensions import db, metrics, response_cache
 
 
 class CommentType(IntEnum):
@@ -19,6 +20,10 @@ class Comment(db.Model):
     Database of user comments on datasets and stories
     """
     __tablename__ = 'comment'
+    __table_args__ = (
+        # Comments of a dataset or story, keyset pagination key
+        db.Index('ix_comment_target_created', 'target_type', 'target_id', 'created', 'id'),
+    )
 
     id = db.Column(db.String(128), primary_key=True, nullable=False)
     comment = db.Column(db.Text, nullable=False)
@@ -30,6 +35,14 @@ class Comment(db.Model):
     created = db.Column(db.DateTime(), default=func.now())
     updated = db.Column(db.DateTime(), onupdate=func.now())
 
+    def target_cache_tag(self):
+        """
+        Cache tag of the commented dataset or story.
+        """
+        if self.target_type == CommentType.DATASET_COMMENT:
+            return response_cache.tag('dataset', self.target_id)
+        return response_cache.tag('story', self.target_id)
+
     @classmethod
     def comment_id(cls):
         return uuid.uuid4().hex
@@ -75,8 +88,25 @@ class Comment(db.Model):
             params.update(target_type=int(target_type))
         return cls.get(**params)
 
+    @classmethod
+    def query_target_comments(cls, target_id, target_type):
+        """
+        DAO: comments of a target with their authors loaded in the same
+        query, to be paginated with ``PaginationParameters.paginate``.
+        :return: a query of comments
+        """
+        return cls.query \
+            .options(joinedload(cls.user)) \
+            .filter_by(target_id=target_id, target_type=int(target_type))
+
     @classmethod
     def delete_target_all_comments(cls, target_id, target_type=None):
         comments = cls.get_target_comments(target_id, target_type)
         for comment in comments:
             db.session.delete(comment)
+
+
+response_cache.invalidate_on_change(Comment, lambda comment: [comment.target_cache_tag()])
+
+# Counted once comments are committed, by the commented ``dataset`` or ``story``
+COMMENTS_CREATED = metrics.counter('catalog_comments_created_total', "Comments posted", ('target',))
@@ -1,8 +1,12 @@
+from flask_marshmallow import base_fields
+
 from catalog.extensions.flask_restplus import ModelSchema
 from catalog.modules.comments.models import Comment
 
 
 class CommentSchema(ModelSchema):
+    user = base_fields.Nested('UserSchema', only=('id', 'username'))
+
     class Meta(ModelSchema.Meta):
         model = Comment
         dump_only = (
@@ -13,6 +17,7 @@ class CommentSchema(ModelSchema):
             Comment.user_id.key,
             Comment.target_id.key,
             Comment.target_type.key,
+            Comment.user.key,
         )
         fields = (
                      Comment.comment.key,
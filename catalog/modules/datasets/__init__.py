@@ -4,7 +4,9 @@ Dataset module
 ============
 """
 
+from catalog.extensions import metrics
 from catalog.extensions.api import current_api
+from catalog.extensions.metrics import stats_counter
 
 
 def init_app(app, **kwargs):
@@ -15,11 +17,19 @@ def init_app(app, **kwargs):
     current_api.add_oauth_scope('datasets:write', "Provide write access to dataset details")
 
     # Touch underlying modules
-    from .resources import dataset, license, organization, publisher, reference, source
+    from .resources import dataset, keyword, license, organization, publisher, reference, source
 
     current_api.add_namespace(dataset.api)
+    current_api.add_namespace(keyword.api)
     current_api.add_namespace(license.api)
     current_api.add_namespace(organization.api)
     current_api.add_namespace(publisher.api)
     current_api.add_namespace(reference.api)
     current_api.add_namespace(source.api)
+
+    from .leaderboard import leaderboard
+    leaderboard.init_app(app)
+    metrics.register_collector('leaderboard', lambda: [
+        stats_counter('catalog_leaderboard_events_total', "Leaderboard refreshes and loads",
+                      leaderboard.stats, 'event')
+    ])
@@ -0,0 +1,176 @@
+# encoding: utf-8
+"""
+Catalog export
+--------------
+
+Streams all the datasets as flat records (missing values are omitted), so a
+snapshot of any size is written with flat memory:
+
+* datasets are fetched with ``yield_per`` (a server-side cursor where the
+  database supports it) in the order of the keyset pagination index;
+* license, organization and publisher are joined and flattened into dotted
+  fields (``license.name``, ``organization.email``, ...);
+* keywords, sources and references are loaded with one query each per batch
+  of datasets.
+
+Formats:
+
+* ``ndjson`` - a JSON object per line, keywords, sources and references are
+  lists;
+* ``csv`` - a header row and a row per dataset, list values are separated by
+  ``;`` (escaped by ``\\`` within values, see ``importer.join_list``) and
+  sources and references are split into dotted columns (``sources.title``,
+  ``sources.url``, ...).
+
+Both formats can be loaded back with ``catalog.modules.datasets.importer``.
+"""
+import csv
+import io
+import itertools
+import json
+from collections import defaultdict
+
+from sqlalchemy.orm import joinedload
+
+from .importer import (
+    DatasetImportSchema, LicenseImportSchema, OrganizationImportSchema, PublisherImportSchema,
+    ReferenceImportSchema, SourceImportSchema, join_list
+)
+from .models import Dataset, DatasetKeyword, Reference, Source
+
+FORMATS = ('ndjson', 'csv')
+
+MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+DATASET_FIELDS = ('id', 'created', 'updated', 'stars') + DatasetImportSchema.COLUMNS
+RELATED_FIELDS = (
+    ('license', tuple(LicenseImportSchema().fields)),
+    ('organization', tuple(OrganizationImportSchema().fields)),
+    ('publisher', tuple(PublisherImportSchema().fields)),
+)
+SOURCE_FIELDS = tuple(SourceImportSchema().fields)
+REFERENCE_FIELDS = tuple(ReferenceImportSchema().fields)
+
+CSV_COLUMNS = DATASET_FIELDS + ('keywords',) + tuple(
+    '%s.%s' % (relationship, field) for relationship, fields in RELATED_FIELDS for field in fields
+) + tuple(
+    'sources.%s' % field for field in SOURCE_FIELDS
+) + tuple(
+    'references.%s' % field for field in REFERENCE_FIELDS
+)
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _fields_of(instance, fields, prefix=''):
+    # Missing values are omitted
+    values = {}
+    for field in fields:
+        value = getattr(instance, field, None)
+        if value is not None:
+            values[prefix + field] = value.isoformat() if hasattr(value, 'isoformat') else value
+    return values
+
+
+def _group_by_dataset(query, fields):
+    grouped = defaultdict(list)
+    for instance in query:
+        grouped[instance.dataset_id].append(_fields_of(instance, fields))
+    return grouped
+
+
+def iter_records(query=None, batch_size=1000):
+    """
+    Yield flat records of datasets of ``query`` (all the existing datasets
+    by default).
+    """
+    if query is None:
+        query = Dataset.query.filter_by(deleted=False)
+    query = query \
+        .options(
+            joinedload(Dataset.license),
+            joinedload(Dataset.organization),
+            joinedload(Dataset.publisher),
+        ) \
+        .order_by(Dataset.created, Dataset.id) \
+        .yield_per(batch_size)
+
+    for batch in _batches(query, batch_size):
+        ids = [dataset.id for dataset in batch]
+        keywords = defaultdict(list)
+        for dataset_id, keyword in DatasetKeyword.query \
+                .with_entities(DatasetKeyword.dataset_id, DatasetKeyword.keyword) \
+                .filter(DatasetKeyword.dataset_id.in_(ids)) \
+                .order_by(DatasetKeyword.dataset_id, DatasetKeyword.position):
+            keywords[dataset_id].append(keyword)
+        sources = _group_by_dataset(
+            Source.query.filter(Source.dataset_id.in_(ids)).order_by(Source.created, Source.id),
+            SOURCE_FIELDS
+        )
+        references = _group_by_dataset(
+            Reference.query.filter(Reference.dataset_id.in_(ids)).order_by(Reference.created, Reference.id),
+            REFERENCE_FIELDS
+        )
+
+        for dataset in batch:
+            record = _fields_of(dataset, DATASET_FIELDS)
+            for relationship, fields in RELATED_FIELDS:
+                record.update(_fields_of(getattr(dataset, relationship), fields, prefix=relationship + '.'))
+            record['keywords'] = keywords.get(dataset.id, [])
+            record['sources'] = sources.get(dataset.id, [])
+            record['references'] = references.get(dataset.id, [])
+            yield record
+
+
+def write_ndjson(records):
+    """
+    Yield lines of NDJSON.
+    """
+    for record in records:
+        yield json.dumps(record, sort_keys=True) + '\n'
+
+
+def write_csv(records, rows_per_chunk=100):
+    """
+    Yield chunks of CSV text.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for rows in _batches(records, rows_per_chunk):
+        for record in rows:
+            row = dict(record, keywords=join_list(record['keywords']))
+            for relationship, fields in (('sources', SOURCE_FIELDS), ('references', REFERENCE_FIELDS)):
+                for field in fields:
+                    row['%s.%s' % (relationship, field)] = join_list(
+                        item.get(field) for item in record[relationship]
+                    )
+            writer.writerow([row.get(column) for column in CSV_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+WRITERS = {
+    'ndjson': write_ndjson,
+    'csv': write_csv,
+}
+
+
+def export(export_format, query=None, batch_size=1000):
+    """
+    Yield chunks of text of the datasets in ``export_format``.
+    """
+    return WRITERS[export_format](iter_records(query, batch_size=batch_size))
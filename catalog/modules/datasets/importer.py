@@ -0,0 +1,618 @@
+# encoding: utf-8
+"""
+Bulk dataset import
+-------------------
+
+Dataset records are read from YAML, JSON or CSV streams one at a time, so a
+file is never loaded into memory as a whole, and stored in chunks:
+
+* every chunk is a single transaction of a few ``bulk_insert_mappings``
+  statements (datasets, keywords, sources, references);
+* licenses, organizations and publishers are referred to by name and
+  resolved for a whole chunk at once, see ``NameResolver``;
+* invalid records (and malformed lines of newline-delimited JSON) are
+  reported with their row numbers and skipped, and a chunk rejected by the
+  database is retried row by row, so a bad record never aborts the whole
+  load.
+
+Supported inputs:
+
+* ``yaml`` - a stream of documents, each one is a record, a list of records
+  or a ``datasets`` list of records (see ``tasks/app/data/datasets.yml``);
+* ``json`` - an array of records, a ``{"datasets": [...]}`` object or
+  newline-delimited records, a record per line;
+* ``csv`` - a record per row, keywords are separated by ``;`` (``;`` and
+  ``\\`` within a keyword are escaped by ``\\``, see ``split_list``).
+
+``license``/``organization``/``publisher`` fields hold either names or
+nested records. JSON and CSV records can be flat as well (see
+``catalog.modules.datasets.exporter``): dotted fields (e.g. ``license.url``)
+hold details, and ``sources.*``/``references.*`` fields hold lists of item
+fields, separated by ``;`` in CSV as well.
+"""
+import csv
+import json
+import logging
+import re
+
+import yaml
+from flask_marshmallow import Schema, base_fields
+from marshmallow import ValidationError, pre_load, validate, validates
+from sqlalchemy.exc import SQLAlchemyError
+
+from catalog.exception import CatalogException
+from catalog.extensions import db, response_cache
+from .models import Dataset, DatasetKeyword, License, Organization, Publisher, Reference, Source
+from .models.dataset import DATASETS_CREATED
+
+log = logging.getLogger(__name__)
+
+FORMATS = ('yaml', 'json', 'csv')
+
+FORMAT_EXTENSIONS = {
+    '.yml': 'yaml',
+    '.yaml': 'yaml',
+    '.json': 'json',
+    '.jsonl': 'json',
+    '.ndjson': 'json',
+    '.csv': 'csv',
+}
+
+
+class MalformedInput(CatalogException):
+    """
+    The input cannot be parsed any further.
+    """
+
+
+class MalformedRecord(object):
+    """
+    A record which cannot be parsed, unlike the rest of the input.
+    """
+
+    def __init__(self, message):
+        self.message = message
+
+
+def _from_name(data):
+    # A plain string refers to an instance by name
+    if isinstance(data, str):
+        return {'name': data}
+    return data
+
+
+class LicenseImportSchema(Schema):
+    name = base_fields.String(required=True, load_from='title', validate=validate.Length(max=64))
+    url = base_fields.String(load_from='web')
+    type = base_fields.String()
+
+    @pre_load
+    def from_name(self, data):
+        return _from_name(data)
+
+
+class OrganizationImportSchema(Schema):
+    name = base_fields.String(required=True, validate=validate.Length(max=128))
+    email = base_fields.String()
+    web = base_fields.String()
+    country = base_fields.String()
+
+    @pre_load
+    def from_name(self, data):
+        return _from_name(data)
+
+
+class PublisherImportSchema(Schema):
+    name = base_fields.String(required=True, validate=validate.Length(max=128))
+    department = base_fields.String()
+    web = base_fields.String()
+    email = base_fields.String()
+    role = base_fields.String()
+
+    @pre_load
+    def from_name(self, data):
+        return _from_name(data)
+
+
+class SourceImportSchema(Schema):
+    title = base_fields.String(required=True, validate=validate.Length(max=256))
+    url = base_fields.String(required=True, load_from='access_url')
+    snapshot = base_fields.String()
+    email = base_fields.String()
+    description = base_fields.String()
+    format = base_fields.String(missing='')
+    media_type = base_fields.String(missing='')
+    schema = base_fields.String()
+
+
+class ReferenceImportSchema(Schema):
+    title = base_fields.String(required=True, load_from='name', validate=validate.Length(max=128))
+    url = base_fields.String(required=True, load_from='reference')
+    snapshot = base_fields.String()
+
+
+class DatasetImportSchema(Schema):
+    """
+    A dataset record of an import file.
+    """
+    name = base_fields.String(required=True, validate=validate.Length(max=128))
+    title = base_fields.String(required=True, validate=validate.Length(max=256))
+    description = base_fields.String(required=True)
+    homepage = base_fields.String(required=True)
+    version = base_fields.String()
+    keywords = base_fields.List(base_fields.String(), missing=list)
+    image = base_fields.String()
+    temporal = base_fields.String()
+    spatial = base_fields.String()
+    access_level = base_fields.String(required=True)
+    copyrights = base_fields.String()
+    accrual_periodicity = base_fields.String()
+    specification = base_fields.String()
+    data_quality = base_fields.Boolean(missing=False)
+    data_dictionary = base_fields.String()
+    category = base_fields.String(required=True)
+    issued_time = base_fields.String()
+    language = base_fields.String()
+
+    license = base_fields.Nested(LicenseImportSchema, load_from='license_name')
+    organization = base_fields.Nested(OrganizationImportSchema, load_from='organization_name')
+    publisher = base_fields.Nested(PublisherImportSchema, load_from='publisher_name')
+    sources = base_fields.Nested(SourceImportSchema, many=True, missing=list)
+    references = base_fields.Nested(ReferenceImportSchema, many=True, missing=list)
+
+    @validates('keywords')
+    def validate_keywords(self, value):
+        try:
+            DatasetKeyword.normalize(value)
+        except ValueError as exception:
+            raise ValidationError(str(exception))
+
+    COLUMNS = (
+        'name', 'title', 'description', 'homepage', 'version', 'image', 'temporal', 'spatial',
+        'access_level', 'copyrights', 'accrual_periodicity', 'specification', 'data_quality',
+        'data_dictionary', 'category', 'issued_time', 'language',
+    )
+
+
+def detect_format(filename=None, content_type=None):
+    """
+    Guess an import format from a file name or a MIME type.
+    :return: one of ``FORMATS`` or None
+    """
+    if filename:
+        for extension, import_format in FORMAT_EXTENSIONS.items():
+            if filename.lower().endswith(extension):
+                return import_format
+    if content_type:
+        content_type = content_type.split(';')[0].strip().lower()
+        for import_format in FORMATS:
+            if content_type.endswith(import_format) or content_type.endswith('x-' + import_format):
+                return import_format
+        if content_type in ('application/x-ndjson', 'application/jsonl'):
+            return 'json'
+    return None
+
+
+LIST_SEPARATOR = ';'
+
+
+def join_list(values):
+    """
+    Join values into a CSV cell, ``;`` and ``\\`` within values are escaped
+    by ``\\``.
+    """
+    return LIST_SEPARATOR.join(
+        '' if value is None else str(value).replace('\\', '\\\\').replace(LIST_SEPARATOR, '\\' + LIST_SEPARATOR)
+        for value in values
+    )
+
+
+def split_list(value):
+    """
+    Split a CSV cell written by ``join_list``. Other backslashes are kept
+    as they are, e.g. in hand-written cells.
+    """
+    items, item = [], []
+    characters = iter(value)
+    for character in characters:
+        if character == '\\':
+            escaped = next(characters, '')
+            if escaped not in ('\\', LIST_SEPARATOR):
+                item.append(character)
+            item.append(escaped)
+        elif character == LIST_SEPARATOR:
+            items.append(''.join(item))
+            item = []
+        else:
+            item.append(character)
+    items.append(''.join(item))
+    return items
+
+
+def expand_record(record):
+    """
+    Nest dotted fields of a flat record, e.g. ``license.url``. Values of
+    ``sources.*`` and ``references.*`` fields are lists of the respective
+    fields of every item (a string is a single item).
+    """
+    if not isinstance(record, dict):
+        return record
+    expanded = {key: value for key, value in record.items() if '.' not in key}
+    for key, value in record.items():
+        if '.' not in key or value is None:
+            continue
+        name, attribute = key.split('.', 1)
+        if name in ('sources', 'references'):
+            if isinstance(value, str):
+                value = [value]
+            items = expanded.setdefault(name, [])
+            items.extend({} for _ in range(len(value) - len(items)))
+            for item, item_value in zip(items, value):
+                if item_value:
+                    item[attribute] = item_value
+        else:
+            nested = expanded.get(name)
+            if not isinstance(nested, dict):
+                nested = expanded[name] = _from_name(nested) or {}
+            nested[attribute] = value
+    return expanded
+
+
+def _load_items(loader):
+    """
+    Construct the items of the sequence starting at the current event one at
+    a time.
+    """
+    loader.get_event()
+    while not loader.check_event(yaml.SequenceEndEvent):
+        yield loader.construct_document(loader.compose_node(None, None))
+    loader.get_event()
+
+
+def _load_records(loader):
+    """
+    Yield records of the document starting at the current event: the items
+    of a ``datasets`` sequence or of a top level sequence, or the document
+    itself.
+    """
+    if loader.check_event(yaml.SequenceStartEvent):
+        for record in _load_items(loader):
+            yield record
+    elif loader.check_event(yaml.MappingStartEvent):
+        loader.get_event()
+        document, streamed = {}, False
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = loader.construct_document(loader.compose_node(None, None))
+            if key == 'datasets' and loader.check_event(yaml.SequenceStartEvent):
+                for record in _load_items(loader):
+                    yield record
+                streamed = True
+            else:
+                document[key] = loader.construct_document(loader.compose_node(None, None))
+        loader.get_event()
+        if not streamed:
+            yield document
+    else:
+        document = loader.construct_document(loader.compose_node(None, None))
+        if document is not None:
+            yield document
+
+
+def read_yaml(stream):
+    """
+    Yield records of a YAML stream. Events are parsed incrementally and
+    records of a sequence (e.g. the ``datasets`` list of a single document)
+    are constructed one at a time, so only the current record is in memory.
+    """
+    loader = yaml.SafeLoader(stream)
+    try:
+        loader.get_event()
+        while not loader.check_event(yaml.StreamEndEvent):
+            loader.get_event()
+            for record in _load_records(loader):
+                yield record
+            loader.get_event()
+            # Anchors are scoped to a document
+            loader.anchors = {}
+    except yaml.YAMLError as exception:
+        raise MalformedInput('Malformed YAML: %s' % exception)
+    finally:
+        loader.dispose()
+
+
+class _JSONBuffer(object):
+    """
+    Text of a JSON stream read on demand.
+    """
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text = ''
+
+    def fill(self):
+        chunk = self.stream.read(self.chunk_size)
+        self.text += chunk
+        return bool(chunk)
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character, '' at the end.
+        """
+        while True:
+            self.text = self.text.lstrip()
+            if self.text:
+                return self.text[0]
+            if not self.fill():
+                return ''
+
+    def consume(self, length=1):
+        self.text = self.text[length:]
+
+    def lines(self):
+        """
+        Yield the remaining lines, split by '\\n' only: JSON strings may
+        contain other line separators, e.g. U+2028.
+        """
+        ended = False
+        while not ended:
+            ended = not self.fill()
+            lines = self.text.split('\n')
+            # The last line is complete at the end of the stream only
+            self.text = '' if ended else lines.pop()
+            for line in lines:
+                yield line
+
+    def decode(self, decoder):
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text)
+            except ValueError:
+                # Either an incomplete or a malformed value
+                if not self.fill():
+                    raise
+                continue
+            self.consume(end)
+            return value
+
+
+DATASETS_KEY_PATTERN = re.compile(r'\{\s*"datasets"\s*:\s*\[')
+
+
+def read_json(stream, chunk_size=64 * 1024):
+    """
+    Yield records of a JSON stream without decoding it as a whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer = _JSONBuffer(stream, chunk_size)
+    try:
+        char = buffer.peek()
+        in_array = False
+        if char == '[':
+            buffer.consume()
+            in_array = True
+        elif char == '{':
+            while len(buffer.text) < 256 and buffer.fill():
+                pass
+            match = DATASETS_KEY_PATTERN.match(buffer.text)
+            if match:
+                buffer.consume(match.end())
+                in_array = True
+
+        if not in_array:
+            # Newline-delimited records
+            for line in buffer.lines():
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exception:
+                    yield MalformedRecord('Malformed JSON: %s' % exception)
+                else:
+                    yield expand_record(record)
+            return
+
+        while True:
+            char = buffer.peek()
+            if char == ']':
+                break
+            if char == ',':
+                buffer.consume()
+                continue
+            if not char:
+                raise ValueError("Unterminated array")
+            yield expand_record(buffer.decode(decoder))
+    except ValueError as exception:
+        raise MalformedInput('Malformed JSON: %s' % exception)
+
+
+def read_csv(stream):
+    """
+    Yield records of a CSV stream with a header row.
+    """
+    try:
+        for row in csv.DictReader(stream):
+            record = {}
+            for column, value in row.items():
+                if column is None or value is None or not value.strip():
+                    continue
+                value = value.strip()
+                if column == 'keywords':
+                    value = [keyword for keyword in split_list(value) if keyword.strip()]
+                elif column.split('.', 1)[0] in ('sources', 'references'):
+                    value = split_list(value)
+                record[column] = value
+            yield expand_record(record)
+    except csv.Error as exception:
+        raise MalformedInput('Malformed CSV: %s' % exception)
+
+
+READERS = {
+    'yaml': read_yaml,
+    'json': read_json,
+    'csv': read_csv,
+}
+
+
+def read_records(stream, import_format):
+    """
+    Yield records of a text stream in ``import_format``.
+    """
+    return READERS[import_format](stream)
+
+
+class DatasetImporter(object):
+    """
+    Imports dataset records in chunked transactions.
+
+    Example:
+    >>> importer = DatasetImporter(contributor_id=user.id)
+    >>> report = importer.run(read_records(open('datasets.csv'), 'csv'))
+    """
+
+    def __init__(self, contributor_id=None, chunk_size=500, max_errors=1000):
+        self.contributor_id = contributor_id
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.schema = DatasetImportSchema()
+        self._source_columns = tuple(SourceImportSchema().fields)
+        self._reference_columns = tuple(ReferenceImportSchema().fields)
+        self.related_models = {
+            'license': License,
+            'organization': Organization,
+            'publisher': Publisher,
+        }
+        self.report = {'created': 0, 'failed': 0, 'errors': []}
+
+    def run(self, records):
+        """
+        Import all ``records``.
+        :return: a report with numbers of created and failed records and a
+        list of errors (row, name and message).
+        """
+        chunk = []
+        row = 0
+        try:
+            for row, record in enumerate(records, start=1):
+                data = self._load(row, record)
+                if data is not None:
+                    chunk.append((row, data))
+                if len(chunk) >= self.chunk_size:
+                    self._import_chunk(chunk)
+                    chunk = []
+        except MalformedInput as exception:
+            self._fail(row + 1, None, exception.message)
+        if chunk:
+            self._import_chunk(chunk)
+
+        log.info(
+            "Imported %d datasets, %d records failed",
+            self.report['created'],
+            self.report['failed']
+        )
+        return self.report
+
+    def _fail(self, row, name, message):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < self.max_errors:
+            self.report['errors'].append({'row': row, 'name': name, 'message': message})
+
+    def _load(self, row, record):
+        if isinstance(record, MalformedRecord):
+            self._fail(row, None, record.message)
+            return None
+        if not isinstance(record, dict):
+            self._fail(row, None, "A record has to be a mapping")
+            return None
+        data, errors = self.schema.load(record)
+        if errors:
+            self._fail(
+                row,
+                record.get('name'),
+                '; '.join('%s: %s' % (field, messages) for field, messages in sorted(errors.items()))
+            )
+            return None
+        return data
+
+    def _import_chunk(self, chunk):
+        names = [data['name'] for row, data in chunk]
+        existing = {
+            name for name, in db.session.query(Dataset.name).filter(Dataset.name.in_(names))
+        }
+        fresh = []
+        for row, data in chunk:
+            if data['name'] in existing:
+                self._fail(row, data['name'], 'Dataset "%s" already exists' % data['name'])
+                continue
+            existing.add(data['name'])
+            fresh.append((row, data))
+        if not fresh:
+            return
+
+        try:
+            self._insert(fresh)
+        except SQLAlchemyError:
+            log.warning("Failed to import a chunk of %d datasets, retrying one by one", len(fresh))
+            for row, data in fresh:
+                try:
+                    self._insert([(row, data)])
+                except SQLAlchemyError as exception:
+                    self._fail(row, data['name'], str(getattr(exception, 'orig', None) or exception))
+
+    def _insert(self, chunk):
+        with db.session.begin():
+            self._insert_mappings(chunk)
+        self.report['created'] += len(chunk)
+        DATASETS_CREATED.inc(len(chunk), source='import')
+
+    def _resolve_related(self, chunk):
+        """
+        IDs of licenses, organizations and publishers of a chunk by field
+        and name, see ``NameResolver``.
+        """
+        related_ids = {}
+        for field, model in self.related_models.items():
+            details = {}
+            for row, data in chunk:
+                if data.get(field):
+                    details.setdefault(data[field]['name'], data[field])
+            related_ids[field] = model.resolver.resolve_many(details) if details else {}
+        return related_ids
+
+    def _insert_mappings(self, chunk):
+        related_ids = self._resolve_related(chunk)
+        datasets, keywords, sources, references = [], [], [], []
+        for row, data in chunk:
+            dataset_id = Dataset.dataset_id()
+            keyword_list = DatasetKeyword.normalize(data['keywords'])
+
+            dataset = {column: data.get(column) for column in DatasetImportSchema.COLUMNS}
+            for field in self.related_models:
+                dataset['%s_id' % field] = related_ids[field].get(data[field]['name']) if data.get(field) else None
+            dataset.update(
+                id=dataset_id,
+                contributor_id=self.contributor_id,
+                # Tokens for full-text search, see ``Dataset.keywords``
+                keywords=[token for keyword in keyword_list for token in keyword.split()],
+            )
+            datasets.append(dataset)
+
+            keywords.extend(
+                {'dataset_id': dataset_id, 'keyword': keyword, 'position': position}
+                for position, keyword in enumerate(keyword_list)
+            )
+            sources.extend(
+                dict(dict.fromkeys(self._source_columns), dataset_id=dataset_id, **source)
+                for source in data['sources']
+            )
+            references.extend(
+                dict(dict.fromkeys(self._reference_columns), dataset_id=dataset_id, **reference)
+                for reference in data['references']
+            )
+
+        db.session.bulk_insert_mappings(Dataset, datasets)
+        for model, mappings in ((DatasetKeyword, keywords), (Source, sources), (Reference, references)):
+            if mappings:
+                db.session.bulk_insert_mappings(model, mappings)
+        # Bulk inserts skip ORM events
+        response_cache.invalidate_on_commit(db.session(), response_cache.tag(Dataset))
@@ -0,0 +1,278 @@
+# encoding: utf-8
+"""
+Dataset leaderboards
+--------------------
+
+Rankings of datasets are precomputed rather than sorted on every request:
+
+* ``top`` - most starred datasets;
+* ``trending`` - datasets with the highest score of recent activity: stars,
+  story links and comments of the last ``TRENDING_WINDOW_DAYS``, each one
+  weighted by ``WEIGHTS`` and decayed by half every
+  ``TRENDING_HALF_LIFE_DAYS``.
+
+The first ``LEADERBOARD_SIZE`` entries of each board are materialized into
+the ``dataset_ranking`` table, so all the workers share one computation, and
+kept in memory as a sorted list, so a page costs a slice and a query of the
+datasets of the page.
+
+Boards are recomputed once they are older than
+``LEADERBOARD_REFRESH_INTERVAL`` seconds by a background thread, which
+every process serving leaderboards starts on its first request, or by the
+``app.datasets.refresh_leaderboards`` Invoke task. Threads of several
+workers check the age of the materialized boards at jittered times, so
+usually one of them recomputes and the others see the fresh boards.
+Requests never recompute boards, they only reload the materialized ones
+whenever the shared ``response_cache`` version of the table tag changes, or
+once they expire if the versions are not shared (see
+``ResponseCache.shared_version``).
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func
+
+from catalog.extensions import db, response_cache
+from catalog.modules.comments.models import Comment, CommentType
+from catalog.modules.stories.models import StoryDatasetAssociation
+from catalog.modules.users.models import UserStarDataset
+from .models import Dataset, DatasetRanking
+
+log = logging.getLogger(__name__)
+
+BOARDS = ('top', 'trending')
+
+# Weights of a trending activity
+WEIGHTS = {
+    'star': 1.0,
+    'comment': 2.0,
+    'story': 3.0,
+}
+
+
+def _day(value):
+    # ``date()`` returns strings on SQLite
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _daily_activity(dataset_column, time_column, since, *criteria):
+    """
+    Number of events per dataset and day since ``since``.
+    """
+    day = func.date(time_column)
+    return db.session.query(dataset_column, day, func.count()) \
+        .join(Dataset, Dataset.id == dataset_column) \
+        .filter(Dataset.deleted.is_(False), time_column >= since, *criteria) \
+        .group_by(dataset_column, day)
+
+
+def compute_top(size):
+    """
+    Returns:
+        ranking (list) - ``(dataset_id, stars)`` of the most starred datasets.
+    """
+    return [
+        (dataset_id, float(stars)) for dataset_id, stars in db.session.query(Dataset.id, Dataset.stars)
+        .filter(Dataset.deleted.is_(False), Dataset.stars > 0)
+        .order_by(Dataset.stars.desc(), Dataset.created, Dataset.id)
+        .limit(size)
+    ]
+
+
+def compute_trending(size, half_life_days=3, window_days=7, now=None):
+    """
+    Returns:
+        ranking (list) - ``(dataset_id, score)`` of the datasets with the
+        highest decayed score of recent activity.
+    """
+    today = (now or datetime.utcnow()).date()
+    since = datetime.combine(today - timedelta(days=window_days - 1), datetime.min.time())
+    activities = (
+        ('star', _daily_activity(UserStarDataset.dataset_id, UserStarDataset.stared_time, since)),
+        ('story', _daily_activity(
+            StoryDatasetAssociation.dataset_id, StoryDatasetAssociation.linked_time, since
+        )),
+        ('comment', _daily_activity(
+            Comment.target_id, Comment.created, since,
+            Comment.target_type == int(CommentType.DATASET_COMMENT)
+        )),
+    )
+
+    scores = defaultdict(float)
+    for activity, query in activities:
+        for dataset_id, day, count in query:
+            age = (today - _day(day)).days
+            scores[dataset_id] += WEIGHTS[activity] * count * 0.5 ** (max(age, 0) / half_life_days)
+
+    ranking = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return ranking[:size]
+
+
+class Leaderboard(object):
+    """
+    Materialized and in-memory dataset leaderboards.
+    """
+
+    def __init__(self, size=100, refresh_interval=600, half_life_days=3, window_days=7):
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.half_life_days = half_life_days
+        self.window_days = window_days
+        self.background_refresh = False
+        self.tag = response_cache.tag(DatasetRanking)
+        self.stats = {'refreshes': 0, 'loads': 0}
+        self._boards = {}
+        self._loaded = None
+        self._version = None
+        self._refresher_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.size = app.config.get('LEADERBOARD_SIZE', 100)
+        self.refresh_interval = app.config.get('LEADERBOARD_REFRESH_INTERVAL', 600)
+        self.half_life_days = app.config.get('TRENDING_HALF_LIFE_DAYS', 3)
+        self.window_days = app.config.get('TRENDING_WINDOW_DAYS', 7)
+        # Tests refresh the boards explicitly, without an interval only the
+        # Invoke task does
+        self.background_refresh = not app.testing and self.refresh_interval > 0
+
+    def compute(self, board):
+        if board == 'top':
+            return compute_top(self.size)
+        return compute_trending(
+            self.size, half_life_days=self.half_life_days, window_days=self.window_days
+        )
+
+    def refresh(self):
+        """
+        Recompute and materialize all the boards.
+        """
+        computed = datetime.utcnow()
+        boards = {board: self.compute(board) for board in BOARDS}
+        session = db.session()
+        with session.begin():
+            DatasetRanking.query.delete(synchronize_session=False)
+            session.bulk_insert_mappings(DatasetRanking, [
+                {
+                    'board': board,
+                    'position': position,
+                    'dataset_id': dataset_id,
+                    'score': score,
+                    'computed': computed,
+                }
+                for board, ranking in boards.items()
+                for position, (dataset_id, score) in enumerate(ranking)
+            ])
+            response_cache.invalidate_on_commit(session, self.tag)
+        self.stats['refreshes'] += 1
+        log.info("Dataset leaderboards were refreshed in %.3fs", (datetime.utcnow() - computed).total_seconds())
+
+    def refresh_if_expired(self):
+        """
+        Refresh the boards unless they have been refreshed (by any process)
+        within the refresh interval.
+
+        Returns:
+            expires (datetime) - when the materialized boards expire.
+        """
+        computed = db.session.query(func.max(DatasetRanking.computed)).scalar()
+        if computed is None or self._is_expired(computed):
+            # Boards are empty until there is some activity, so they are not
+            # recomputed more often than the non-empty ones
+            computed = datetime.utcnow()
+            self.refresh()
+        return computed + timedelta(seconds=self.refresh_interval)
+
+    def _load(self):
+        boards = {board: [] for board in BOARDS}
+        for board, dataset_id, score in db.session.query(
+                DatasetRanking.board, DatasetRanking.dataset_id, DatasetRanking.score
+        ).order_by(DatasetRanking.board, DatasetRanking.position):
+            if board in boards:
+                boards[board].append((dataset_id, score))
+        self.stats['loads'] += 1
+        return boards
+
+    def _is_expired(self, computed):
+        return datetime.utcnow() - computed > timedelta(seconds=self.refresh_interval)
+
+    def _start_refresher(self):
+        # Threads do not survive forks, every worker starts its own refresher
+        pid = os.getpid()
+        with self._lock:
+            if self._refresher_pid == pid:
+                return
+            self._refresher_pid = pid
+        LeaderboardRefresher(current_app._get_current_object(), self).start()
+
+    def ranking(self, board):
+        """
+        Returns:
+            ranking (list) - ``(dataset_id, score)`` of ``board``, best first.
+        """
+        if self.background_refresh:
+            self._start_refresher()
+        with self._lock:
+            version = response_cache.shared_version(self.tag)
+            if self._loaded is None or version != self._version or self._is_expired(self._loaded):
+                self._version = version
+                self._boards = self._load()
+                self._loaded = datetime.utcnow()
+            return self._boards[board]
+
+    def page(self, board, offset=0, limit=20):
+        """
+        Returns:
+            datasets (list) - datasets of ``board`` from ``offset`` position.
+        """
+        ids = [dataset_id for dataset_id, _ in self.ranking(board)[offset:offset + limit]]
+        if not ids:
+            return []
+        datasets = {
+            dataset.id: dataset for dataset in Dataset.query.filter(Dataset.id.in_(ids), Dataset.deleted.is_(False))
+        }
+        return [datasets[dataset_id] for dataset_id in ids if dataset_id in datasets]
+
+
+class LeaderboardRefresher(threading.Thread):
+    """
+    Daemon thread refreshing ``leaderboard`` within the application context
+    whenever its materialized boards expire.
+    """
+
+    def __init__(self, app, leaderboard):
+        # pylint: disable=redefined-outer-name
+        super(LeaderboardRefresher, self).__init__(name='leaderboard-refresher')
+        self.daemon = True
+        self.app = app
+        self.leaderboard = leaderboard
+
+    def _jitter(self):
+        # Workers started together check the boards at different times
+        return random.uniform(0, min(self.leaderboard.refresh_interval * 0.1, 30))
+
+    def run(self):
+        delay = self._jitter()
+        while True:
+            time.sleep(delay)
+            try:
+                with self.app.app_context():
+                    expires = self.leaderboard.refresh_if_expired()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Dataset leaderboards refresh has failed.")
+                delay = self.leaderboard.refresh_interval
+            else:
+                delay = max((expires - datetime.utcnow()).total_seconds(), 0) + self._jitter()
+
+
+leaderboard = Leaderboard()
@@ -1,6 +1,8 @@
 from .dataset import Dataset
+from .keyword import DatasetKeyword
 from .license import License
 from .organization import Organization
 from .publisher import Publisher
+from .ranking import DatasetRanking
 from .reference import Reference
 from .source import Source
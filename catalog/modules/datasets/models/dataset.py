@@ -1,11 +1,13 @@
 import logging
 import uuid
 
-from sqlalchemy import func
+from sqlalchemy import event, func
 from sqlalchemy_utils.types import ScalarListType
 
 from catalog.exception import ObjectDoesNotExist
-from catalog.extensions import db
+from catalog.extensions import db, metrics, response_cache
+from catalog.extensions.search import FullTextIndex
+from .keyword import DatasetKeyword
 from .reference import Reference
 from .source import Source
 
@@ -17,6 +19,19 @@ class Dataset(db.Model):
     Database of datasets
     """
     __tablename__ = 'dataset'
+    __table_args__ = (
+        # Keyset pagination key
+        db.Index('ix_dataset_created_id', 'created', 'id'),
+        # Filtered and sorted listings, see ``ListDatasetsParameters``
+        db.Index('ix_dataset_deleted_created', 'deleted', 'created'),
+        db.Index('ix_dataset_deleted_stars', 'deleted', 'stars'),
+        db.Index('ix_dataset_deleted_category_created', 'deleted', 'category', 'created'),
+        db.Index('ix_dataset_deleted_access_level_created', 'deleted', 'access_level', 'created'),
+        db.Index('ix_dataset_deleted_license_created', 'deleted', 'license_id', 'created'),
+        db.Index('ix_dataset_deleted_organization_created', 'deleted', 'organization_id', 'created'),
+        db.Index('ix_dataset_deleted_publisher_created', 'deleted', 'publisher_id', 'created'),
+        db.Index('ix_dataset_deleted_language_created', 'deleted', 'language', 'created'),
+    )
     type = 'table'
 
     id = db.Column(db.String(128), primary_key=True)
@@ -25,6 +40,8 @@ class Dataset(db.Model):
     description = db.Column(db.Text, nullable=False)
     homepage = db.Column(db.String(1024), nullable=False)
     version = db.Column(db.String(24))
+    # Whitespace separated tokens of the keywords for full-text search, the
+    # keywords themselves are stored in ``keyword_entries``
     keywords = db.Column(ScalarListType(separator=' '), nullable=False)
     image = db.Column(db.String(1024))
     temporal = db.Column(db.String(64))
@@ -39,6 +56,9 @@ class Dataset(db.Model):
     issued_time = db.Column(db.String(64))
     language = db.Column(db.String(64))
     stars = db.Column(db.Integer, default=0)
+    # Denormalized number of story links, maintained by
+    # ``StoryDatasetAssociation.link``/``unlink``
+    story_count = db.Column(db.Integer, default=0, nullable=False)
 
     license_id = db.Column(db.Integer, db.ForeignKey('license.id'))
     license = db.relationship('License', backref='datasets')
@@ -59,8 +79,14 @@ class Dataset(db.Model):
     deleted = db.Column(db.Boolean, default=False)
 
     # relationships
-    sources = db.relationship('Source', backref='dataset', lazy='dynamic')
-    references = db.relationship('Reference', backref='dataset', lazy='dynamic')
+    sources = db.relationship('Source', backref='dataset')
+    references = db.relationship('Reference', backref='dataset')
+    keyword_entries = db.relationship(
+        DatasetKeyword,
+        backref='dataset',
+        order_by=DatasetKeyword.position,
+        cascade='all, delete-orphan'
+    )
 
     @classmethod
     def dataset_id(cls):
@@ -113,10 +139,24 @@ class Dataset(db.Model):
         db.session.add(new_dataset)
         return new_dataset
 
+    @classmethod
+    def search(cls, text):
+        """
+        DAO: full-text search of datasets, best matches first.
+        :return: a query of datasets
+        """
+        return search_index.search(cls.query.filter_by(deleted=False), text)
+
     @classmethod
     def update(cls, id, **kwargs):
-        cls.query.filter_by(id=id, deleted=False).update(dict(kwargs))
-        return cls.get(id=id)
+        # Keywords are not a plain column, see ``Dataset.keywords`` listener
+        keywords = kwargs.pop('keywords', None)
+        if kwargs:
+            cls.query.filter_by(id=id, deleted=False).update(dict(kwargs))
+        dataset = cls.get(id=id)
+        if keywords is not None:
+            dataset.keywords = keywords
+        return dataset
 
     @classmethod
     def delete(cls, id=None, dataset=None, hard=True):
@@ -202,9 +242,55 @@ class Dataset(db.Model):
         db.session.add(new_source)
         return new_source
 
+    def keyword_list(self):
+        """
+        Get the keywords of the dataset
+        :return: a list of strings
+        """
+        return [entry.keyword for entry in self.keyword_entries]
+
+    def add_keyword(self, keyword):
+        self.keywords = self.keyword_list() + [keyword]
+
+    def remove_keyword(self, keyword):
+        keyword = keyword.casefold()
+        self.keywords = [item for item in self.keyword_list() if item.casefold() != keyword]
+
     def associated_stories_num(self):
         """
         Get the number of associated stories with the dataset
         :return: integer
         """
-        return len(list(self.stories_association))
+        return self.story_count
+
+
+@event.listens_for(Dataset.keywords, 'set', retval=True)
+def _set_keywords(dataset, value, oldvalue, initiator):
+    """
+    Keep ``keyword_entries`` in sync with every assignment of keywords.
+    Existing entries are reused, even by another case of the keyword, so
+    re-assigning a keyword never collides with its pending deletion.
+    """
+    keywords = DatasetKeyword.normalize(value)
+    existing = {entry.keyword.casefold(): entry for entry in dataset.keyword_entries}
+    entries = []
+    for position, keyword in enumerate(keywords):
+        entry = existing.get(keyword.casefold()) or DatasetKeyword(keyword=keyword)
+        entry.keyword = keyword
+        entry.position = position
+        entries.append(entry)
+    dataset.keyword_entries = entries
+    return [token for keyword in keywords for token in keyword.split()]
+
+
+# Counted once datasets are committed, by the API (``api``) or bulk imports
+# (``import``)
+DATASETS_CREATED = metrics.counter('catalog_datasets_created_total', "Datasets created", ('source',))
+
+response_cache.invalidate_on_change(Dataset, lambda dataset: [response_cache.tag(Dataset, dataset.id)])
+
+search_index = FullTextIndex(
+    Dataset,
+    ('title', 'description', 'keywords', 'category'),
+    weights=(10.0, 1.0, 5.0, 2.0)
+)
@@ -0,0 +1,69 @@
+from sqlalchemy import func
+
+from catalog.extensions import db, response_cache
+
+
+class DatasetKeyword(db.Model):
+    """
+    Keywords of datasets, One-to-Many. Maintained by assigning
+    ``Dataset.keywords``.
+    """
+    __tablename__ = 'dataset_keyword'
+    MAX_LENGTH = 128
+    __table_args__ = (
+        # "Datasets tagged X" and keyword facets
+        db.Index('ix_dataset_keyword_keyword', 'keyword', 'dataset_id'),
+    )
+
+    dataset_id = db.Column(
+        db.String(128), db.ForeignKey('dataset.id', ondelete='CASCADE'), primary_key=True
+    )
+    keyword = db.Column(db.String(MAX_LENGTH), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def normalize(cls, keywords):
+        """
+        Clean up a list of keywords: collapse whitespace, drop empty values and
+        duplicates, which differ in case only (the first spelling is kept, as
+        case-insensitive collations, e.g. MySQL ones, would not store both).
+        A string is treated as whitespace separated keywords.
+        :return: a list of keywords
+        :raise ValueError: a keyword is longer than ``MAX_LENGTH``
+        """
+        if keywords is None:
+            return []
+        if isinstance(keywords, str):
+            keywords = keywords.split()
+
+        normalized = []
+        seen = set()
+        for keyword in keywords:
+            keyword = ' '.join(str(keyword).split())
+            if len(keyword) > cls.MAX_LENGTH:
+                raise ValueError("Keyword '%s...' is longer than %d characters." % (keyword[:16], cls.MAX_LENGTH))
+            if keyword and keyword.casefold() not in seen:
+                seen.add(keyword.casefold())
+                normalized.append(keyword)
+        return normalized
+
+    @classmethod
+    def facet(cls):
+        """
+        DAO: keywords of the existing datasets with their number of datasets,
+        most used first.
+        :return: a query of ``(keyword, count)`` rows
+        """
+        from .dataset import Dataset
+
+        count = func.count(cls.dataset_id).label('count')
+        return db.session.query(cls.keyword, count) \
+            .join(Dataset, Dataset.id == cls.dataset_id) \
+            .filter(Dataset.deleted.is_(False)) \
+            .group_by(cls.keyword) \
+            .order_by(count.desc(), cls.keyword)
+
+
+response_cache.invalidate_on_change(
+    DatasetKeyword, lambda keyword: [response_cache.tag('dataset', keyword.dataset_id)]
+)
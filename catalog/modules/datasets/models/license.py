@@ -1,7 +1,8 @@
 from sqlalchemy import func
 
 from catalog.exception import ObjectDoesNotExist
-from catalog.extensions import db
+from catalog.extensions import db, response_cache
+from .resolver import NameResolver
 
 
 class License(db.Model):
@@ -43,3 +44,17 @@ class License(db.Model):
         new_license = License(**params)
         db.session.add(new_license)
         return new_license
+
+    @classmethod
+    def resolve(cls, name, **details):
+        """
+        DAO: ID of the license named ``name``, created with ``details`` if it
+        does not exist yet.
+        """
+        return cls.resolver.resolve(name, **details)
+
+
+# Nested into dataset responses
+response_cache.invalidate_on_change(License, lambda license: [response_cache.tag(License)])
+
+License.resolver = NameResolver(License)
@@ -1,7 +1,8 @@
 from sqlalchemy import func
 
 from catalog.exception import ObjectDoesNotExist
-from catalog.extensions import db
+from catalog.extensions import db, response_cache
+from .resolver import NameResolver
 
 
 class Organization(db.Model):
@@ -9,6 +10,10 @@ class Organization(db.Model):
     Database of dataset-publishing organizations, One-to-Many
     """
     __tablename__ = 'organization'
+    __table_args__ = (
+        # Keyset pagination key
+        db.Index('ix_organization_created_id', 'created', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128), nullable=False, unique=True)
@@ -44,3 +49,17 @@ class Organization(db.Model):
         new_org = Organization(**params)
         db.session.add(new_org)
         return new_org
+
+    @classmethod
+    def resolve(cls, name, **details):
+        """
+        DAO: ID of the organization named ``name``, created with ``details``
+        if it does not exist yet.
+        """
+        return cls.resolver.resolve(name, **details)
+
+
+# Nested into dataset responses
+response_cache.invalidate_on_change(Organization, lambda organization: [response_cache.tag(Organization)])
+
+Organization.resolver = NameResolver(Organization)
@@ -3,7 +3,8 @@ import uuid
 from sqlalchemy import func
 
 from catalog.exception import ObjectDoesNotExist
-from catalog.extensions import db
+from catalog.extensions import db, response_cache
+from .resolver import NameResolver
 
 
 class Publisher(db.Model):
@@ -49,3 +50,17 @@ class Publisher(db.Model):
         new_publisher = Publisher(**params)
         db.session.add(new_publisher)
         return new_publisher
+
+    @classmethod
+    def resolve(cls, name, **details):
+        """
+        DAO: ID of the publisher named ``name``, created with ``details`` if it
+        does not exist yet.
+        """
+        return cls.resolver.resolve(name, **details)
+
+
+# Nested into dataset responses
+response_cache.invalidate_on_change(Publisher, lambda publisher: [response_cache.tag(Publisher)])
+
+Publisher.resolver = NameResolver(Publisher)
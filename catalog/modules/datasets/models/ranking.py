@@ -0,0 +1,22 @@
+from sqlalchemy import func
+
+from catalog.extensions import db
+
+
+class DatasetRanking(db.Model):
+    """
+    Materialized leaderboards of datasets, see
+    ``catalog.modules.datasets.leaderboard``.
+    """
+    __tablename__ = 'dataset_ranking'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('board', 'position'),
+    )
+
+    board = db.Column(db.String(16), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    dataset_id = db.Column(
+        db.String(128), db.ForeignKey('dataset.id', ondelete='CASCADE'), nullable=False
+    )
+    score = db.Column(db.Float, nullable=False)
+    computed = db.Column(db.DateTime(), nullable=False, default=func.now())
@@ -3,7 +3,7 @@ import uuid
 from sqlalchemy import func
 
 from catalog.exception import ObjectDoesNotExist
-from catalog.extensions import db
+from catalog.extensions import db, response_cache
 
 
 class Reference(db.Model):
@@ -46,3 +46,8 @@ class Reference(db.Model):
         new_ref = Reference(**params)
         db.session.add(new_ref)
         return new_ref
+
+
+response_cache.invalidate_on_change(
+    Reference, lambda reference: [response_cache.tag('dataset', reference.dataset_id)]
+)
@@ -0,0 +1,151 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+from catalog.extensions import db, response_cache, server
+
+
+class NameResolver(object):
+    """
+    Get-or-create resolution of names of a small reference table (licenses,
+    organizations, publishers) to primary keys.
+
+    Resolved names are kept in a process-level cache, which is dropped once
+    a transaction which inserts, updates, renames or deletes rows of the
+    table (by the ORM or bulk queries) commits in this process, whenever the
+    shared ``response_cache`` version of the table tag changes (i.e. such a
+    commit by another worker) or after ``timeout`` seconds. Without shared
+    versions several workers could not notice renames by each other, so
+    names are not cached.
+
+    Missing names are inserted with ``INSERT ... ON CONFLICT DO NOTHING``
+    (``ON DUPLICATE KEY UPDATE`` on MySQL, ``INSERT OR IGNORE`` on SQLite),
+    so concurrent resolutions of the same new name never fail, and then
+    selected again.
+    """
+
+    def __init__(self, model, timeout=300):
+        self.model = model
+        self.timeout = timeout
+        self.tag = response_cache.tag(model)
+        self._ids = {}
+        self._version = None
+        self._loaded = 0
+        self._lock = threading.Lock()
+        self._session_key = 'name_resolver_%s_changed' % model.__tablename__
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, self._after_change)
+        event.listen(Session, 'after_bulk_update', self._after_bulk_change)
+        event.listen(Session, 'after_bulk_delete', self._after_bulk_change)
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_rollback', self._after_rollback)
+
+    def clear(self):
+        with self._lock:
+            self._ids = {}
+            self._version = None
+
+    def _cached_ids(self):
+        version = response_cache.shared_version(self.tag)
+        if version is None and server.workers > 1:
+            return {}
+        with self._lock:
+            if version != self._version or time.time() - self._loaded > self.timeout:
+                self._ids = {}
+                self._version = version
+                self._loaded = time.time()
+            return self._ids
+
+    def resolve(self, name, **details):
+        """
+        :return: ID of the instance named ``name``, created with ``details``
+        if missing.
+        """
+        return self.resolve_many({name: details})[name]
+
+    def resolve_many(self, details):
+        """
+        Resolve names at once: one query for all the uncached names, one
+        insert and one more query for all the missing ones.
+
+        :param details: a dict of names to column values of new instances.
+        :return: a dict of names to IDs.
+        """
+        cached = self._cached_ids()
+        ids = {name: cached[name] for name in details if name in cached}
+        missing = [name for name in details if name not in ids]
+        if not missing:
+            return ids
+
+        found = self._query_ids(missing)
+        new_names = [name for name in missing if name not in found]
+        if new_names:
+            self._insert_ignore([dict(details[name] or {}, name=name) for name in new_names])
+            found.update(self._query_ids(new_names, locking=True))
+
+        with self._lock:
+            cached.update(found)
+        ids.update(found)
+        return ids
+
+    def _query_ids(self, names, locking=False):
+        query = db.session.query(self.model.name, self.model.id).filter(self.model.name.in_(names))
+        if locking:
+            # Rows inserted by concurrent transactions are visible to locking
+            # reads only (MySQL repeatable read)
+            query = query.with_for_update(read=True)
+        return dict(query)
+
+    def _insert_ignore(self, rows):
+        session = db.session()
+        table = self.model.__table__
+        columns = set().union(*rows)
+        rows = [{column: row.get(column) for column in columns} for row in rows]
+
+        dialect_name = session.get_bind(self.model.__mapper__).dialect.name
+        if dialect_name == 'postgresql':
+            statement = postgresql.insert(table).on_conflict_do_nothing(index_elements=['name'])
+        elif dialect_name == 'mysql':
+            statement = mysql.insert(table)
+            statement = statement.on_duplicate_key_update(name=statement.inserted.name)
+        elif dialect_name == 'sqlite':
+            statement = table.insert().prefix_with('OR IGNORE')
+        else:
+            statement = None
+
+        with session.begin(subtransactions=True):
+            if statement is not None:
+                session.execute(statement, rows)
+            else:
+                for row in rows:
+                    try:
+                        with session.begin_nested():
+                            session.execute(table.insert(), row)
+                    except IntegrityError:
+                        pass
+            session.info[self._session_key] = True
+            # Core inserts skip ORM events
+            response_cache.invalidate_on_commit(session, self.tag)
+
+    def _after_change(self, mapper, connection, target):
+        # pylint: disable=unused-argument
+        session = object_session(target)
+        if session is not None:
+            session.info[self._session_key] = True
+
+    def _after_bulk_change(self, context):
+        if issubclass(context.mapper.class_, self.model):
+            context.session.info[self._session_key] = True
+
+    def _after_commit(self, session):
+        if session.info.pop(self._session_key, None):
+            self.clear()
+
+    def _after_rollback(self, session):
+        # Names inserted by the transaction may have been cached
+        if session.info.pop(self._session_key, None):
+            self.clear()
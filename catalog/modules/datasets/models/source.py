@@ -3,7 +3,7 @@ import uuid
 from sqlalchemy import func
 
 from catalog.exception import ObjectDoesNotExist
-from catalog.extensions import db
+from catalog.extensions import db, response_cache
 
 
 class Source(db.Model):
@@ -51,3 +51,8 @@ class Source(db.Model):
         new_source = Source(**params)
         db.session.add(new_source)
         return new_source
+
+
+response_cache.invalidate_on_change(
+    Source, lambda source: [response_cache.tag('dataset', source.dataset_id)]
+)
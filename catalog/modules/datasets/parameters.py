@@ -1,10 +1,82 @@
 # encoding: utf-8
 from flask_marshmallow import base_fields
-from marshmallow import validates
+from marshmallow import validate, validates, validates_schema, ValidationError
+from webargs.fields import DelimitedList
 
-from catalog.extensions.flask_restplus import PostFormParameters, PatchJSONParameters
-from catalog.modules.datasets import schemas
+from catalog.extensions.flask_restplus import Parameters, PostFormParameters, PatchJSONParameters
+from catalog.extensions.flask_restplus.parameters import BatchGetParameters, FilterSortParameters, \
+    PaginationParameters
+from catalog.modules.datasets import exporter, importer, schemas
 from catalog.modules.datasets.models.dataset import Dataset
+from catalog.modules.datasets.models.keyword import DatasetKeyword
+
+
+class ListDatasetsParameters(FilterSortParameters, BatchGetParameters):
+    """
+    Dataset listing parameters. With ``ids``, the listed datasets are the
+    requested ones and the other parameters are ignored.
+    """
+
+    FILTER_FIELDS = (
+        Dataset.category.key,
+        Dataset.license_id.key,
+        Dataset.organization_id.key,
+        Dataset.publisher_id.key,
+        Dataset.access_level.key,
+        Dataset.language.key,
+    )
+    SORT_FIELDS = (
+        Dataset.stars.key,
+        Dataset.created.key,
+    )
+
+    keyword = base_fields.String(description="only datasets tagged with the keyword.")
+    category = base_fields.String()
+    license_id = base_fields.Integer()
+    organization_id = base_fields.Integer()
+    publisher_id = base_fields.String()
+    access_level = base_fields.String()
+    language = base_fields.String()
+
+
+class BatchGetDatasetsParameters(BatchGetParameters):
+    """
+    Batch get parameters for lists of IDs too long for a query string.
+    """
+
+    ids = DelimitedList(
+        base_fields.String(validate=validate.Length(min=1)),
+        description="IDs (at most 1000) of the datasets to fetch.",
+        required=True,
+        validate=validate.Length(min=1, max=1000)
+    )
+
+
+class ListKeywordsParameters(PaginationParameters):
+    """
+    Keyword facet parameters. Keywords are ordered by counts, so only
+    ``offset``/``limit`` pagination is supported.
+    """
+
+    class Meta(PaginationParameters.Meta):
+        exclude = ('cursor',)
+
+
+class LeaderboardParameters(PaginationParameters):
+    """
+    Leaderboard parameters. Boards are precomputed rankings, so only
+    ``offset``/``limit`` pagination is supported.
+    """
+
+    class Meta(PaginationParameters.Meta):
+        exclude = ('cursor',)
+
+
+def validate_keywords(keywords):
+    try:
+        DatasetKeyword.normalize(keywords)
+    except ValueError as exception:
+        raise ValidationError(str(exception))
 
 
 class AddDatasetParameters(PostFormParameters, schemas.DatasetSchema):
@@ -24,6 +96,10 @@ class AddDatasetParameters(PostFormParameters, schemas.DatasetSchema):
             'publisher_name',
         )
 
+    @validates('keywords')
+    def validate_keywords(self, value):
+        validate_keywords(value)
+
     @validates('temporal')
     def validate_temporal_field(self):
         # TODO: support field validation
@@ -35,6 +111,38 @@ class AddDatasetParameters(PostFormParameters, schemas.DatasetSchema):
         pass
 
 
+class BulkImportDatasetsParameters(Parameters):
+    """
+    Bulk import parameters, records are read from the request body (or a
+    ``file`` upload) in the format guessed from its content type unless
+    ``format`` is given.
+    """
+
+    format = base_fields.String(
+        description="yaml, json or csv",
+        validate=validate.OneOf(importer.FORMATS),
+        location='query',
+    )
+    chunk_size = base_fields.Integer(
+        description="number of datasets stored per transaction",
+        missing=500,
+        validate=validate.Range(min=1, max=5000),
+        location='query',
+    )
+
+
+class ExportDatasetsParameters(Parameters):
+    """
+    Catalog export parameters.
+    """
+
+    format = base_fields.String(
+        description="ndjson or csv",
+        missing='ndjson',
+        validate=validate.OneOf(exporter.FORMATS),
+    )
+
+
 class PatchDatasetParameters(PatchJSONParameters):
     """
     Updatea a dataset
@@ -66,6 +174,37 @@ class PatchDatasetParameters(PatchJSONParameters):
         )
     )
 
+    @validates_schema
+    def validate_keywords(self, data):
+        if data.get('path') != '/%s' % Dataset.keywords.key or data.get('value') is None:
+            return
+        if data['op'] == self.OP_REPLACE:
+            validate_keywords(data['value'])
+        elif data['op'] == self.OP_ADD:
+            validate_keywords([data['value']])
+
+    @classmethod
+    def add(cls, obj, field, value, state):
+        """
+        Add a keyword, e.g. ``{"op": "add", "path": "/keywords", "value": "GDP"}``.
+        """
+        if field != Dataset.keywords.key:
+            raise ValidationError("Field '%s' does not support 'add' operation" % field)
+        obj.add_keyword(value)
+        return True
+
+    @classmethod
+    def _process_patch_operation(cls, operation, obj, state):
+        """
+        Remove a keyword, e.g. ``{"op": "remove", "path": "/keywords", "value": "GDP"}``.
+        """
+        if operation['op'] == cls.OP_REMOVE and operation['field_name'] == Dataset.keywords.key:
+            if 'value' not in operation:
+                raise ValidationError('value is required')
+            obj.remove_keyword(operation['value'])
+            return True
+        return super(PatchDatasetParameters, cls)._process_patch_operation(operation, obj, state)
+
 
 class AddLicenseParameters(PostFormParameters, schemas.LicenseSchema):
     """
@@ -3,25 +3,33 @@
 RESTful API Dataset resources
 --------------------------
 """
+import codecs
 import logging
 from http import HTTPStatus
 
+from flask import Response, request, stream_with_context
 from flask_login import current_user
 
 from catalog.exception import CatalogException
-from catalog.exception import ObjectDoesNotExist
-from catalog.extensions import db
+from catalog.extensions import db, response_cache
 from catalog.extensions import permissions
 from catalog.extensions.flask_restplus import Namespace
-from catalog.extensions.flask_restplus.parameters import PaginationParameters
+from catalog.extensions.flask_restplus.parameters import BatchGetParameters, PaginationParameters, \
+    SearchParameters
 from catalog.extensions.flask_restplus import Resource
-from catalog.modules.comments.models import Comment, CommentType
+from catalog.extensions.flask_restplus.errors import abort
+from catalog.modules.comments.models import COMMENTS_CREATED, Comment, CommentType
 from catalog.modules.comments.parameters import AddCommentParameters
 from catalog.modules.comments.schemas import CommentSchema
-from catalog.modules.datasets.models import Dataset, License, Organization, Publisher, Reference, Source
-from catalog.modules.datasets.parameters import AddDatasetParameters, PatchDatasetParameters
+from catalog.modules.datasets import exporter, importer
+from catalog.modules.datasets.leaderboard import leaderboard
+from catalog.modules.datasets.models import Dataset, DatasetKeyword, License, Organization, Publisher, Reference, \
+    Source
+from catalog.modules.datasets.models.dataset import DATASETS_CREATED
+from catalog.modules.datasets.parameters import AddDatasetParameters, BatchGetDatasetsParameters, \
+    BulkImportDatasetsParameters, ExportDatasetsParameters, LeaderboardParameters, ListDatasetsParameters, PatchDatasetParameters
 from catalog.modules.datasets.parameters import AddReferenceParameters, AddSourceParameters
-from catalog.modules.datasets.schemas import DatasetSchema, ReferenceSchema, SourceSchema
+from catalog.modules.datasets.schemas import BulkImportReportSchema, DatasetSchema, ReferenceSchema, SourceSchema
 from catalog.modules.stories.models import Story, StoryDatasetAssociation
 from catalog.modules.stories.parameters import AddStoryParameters
 from catalog.modules.stories.schemas import StorySchema
@@ -31,6 +39,27 @@ log = logging.getLogger(__name__)
 api = Namespace('datasets', description="On datasets")
 
 
+DATASETS_SCHEMA = DatasetSchema(many=True)
+
+
+def batch_get_datasets(ids):
+    """
+    Datasets of ``ids`` with their relationships in request order, ``None``
+    for not found (or deleted) ones.
+    """
+    query = Dataset.query \
+        .filter_by(deleted=False) \
+        .options(*DATASETS_SCHEMA.eager_loading_options())
+    return BatchGetParameters.batch_get(query, ids, Dataset)
+
+
+def dataset_cache_tags(*table_tags):
+    """
+    Cache tags of responses about a dataset from ``dataset_id`` argument.
+    """
+    return lambda kwargs: [response_cache.tag(Dataset, kwargs['dataset_id'])] + list(table_tags)
+
+
 @api.route("/")
 @api.login_required(oauth_scopes=['datasets:read'])
 class DatasetResource(Resource):
@@ -38,21 +67,28 @@ class DatasetResource(Resource):
     Manipulations with datasets
     """
 
-    @api.parameters(PaginationParameters())
-    @api.response(DatasetSchema(many=True))
+    @api.parameters(ListDatasetsParameters())
+    @api.response(DATASETS_SCHEMA)
     def get(self, args):
         """
         List of all datasets
 
         :param args: query parameters
-        :return: a list of datasets starting from ``offset`` limited by
-        ``limit`` parameter.
+        :return: a list of datasets (tagged with ``keyword``) starting from
+        ``offset`` (or ``cursor``) limited by ``limit`` parameter, or the
+        datasets of ``ids`` in the same order (``null`` if not found).
         """
-        return Dataset.query.filter_by(deleted=False) \
-            .offset(args['offset']) \
-            .limit(args['limit'])
+        if args.get('ids'):
+            return batch_get_datasets(args['ids'])
+        query = Dataset.query.filter_by(deleted=False)
+        if args.get('keyword'):
+            query = query \
+                .join(Dataset.keyword_entries) \
+                .filter(DatasetKeyword.keyword == args['keyword'])
+        return ListDatasetsParameters.paginate(query, args, Dataset)
 
     @api.login_required(oauth_scopes=['datasets:write'])
+    @api.rate_limited('datasets', '20/hour', per_client='1000/hour')
     @api.parameters(AddDatasetParameters())
     @api.response(DatasetSchema())
     @api.response(code=HTTPStatus.CONFLICT)
@@ -67,33 +103,149 @@ class DatasetResource(Resource):
             args['contributor_id'] = contributor.id
 
             if 'license_name' in args:
-                license_name = args.pop('license_name')
-                try:
-                    license = License.get(license_name=license_name)
-                except ObjectDoesNotExist:
-                    log.warning('License "{}" not found, and created automatically.'.format(license_name))
-                    license = License.create(name=license_name)
-                args['license_id'] = license.id
-
+                args['license_id'] = License.resolve(args.pop('license_name'))
             if 'organization_name' in args:
-                organization_name = args.pop('organization_name')
-                try:
-                    organization = Organization.get(org_name=organization_name)
-                except ObjectDoesNotExist:
-                    log.warning('Organization "{}" not found, and created automatically.'.format(organization_name))
-                    organization = Organization.create(name=organization_name)
-                args['organization_id'] = organization.id
-
+                args['organization_id'] = Organization.resolve(args.pop('organization_name'))
             if 'publisher_name' in args:
-                publisher_name = args.pop('publisher_name')
-                try:
-                    publisher = Publisher.get(publisher_name=publisher_name)
-                except ObjectDoesNotExist:
-                    log.warning('Publisher "{}" not found, and created automatically.'.format(publisher_name))
-                    publisher = Publisher.create(name=publisher_name)
-                args['publisher_id'] = publisher.id
+                args['publisher_id'] = Publisher.resolve(args.pop('publisher_name'))
+
+            dataset = Dataset.create(**args)
+        DATASETS_CREATED.inc(source='api')
+        return dataset
+
+
+@api.route("/batch-get")
+@api.login_required(oauth_scopes=['datasets:read'])
+class DatasetBatchGet(Resource):
+    """
+    Many datasets at once.
+    """
+
+    @api.parameters(BatchGetDatasetsParameters(), locations=('json',))
+    @api.response(DATASETS_SCHEMA)
+    def post(self, args):
+        """
+        Get the datasets of ``ids``
+
+        Same as listing datasets with ``ids`` for lists too long for a query
+        string: datasets are returned in the order of ``ids``, ``null`` if
+        not found.
+        """
+        return batch_get_datasets(args['ids'])
+
 
-            return Dataset.create(**args)
+@api.route("/bulk")
+@api.login_required(oauth_scopes=['datasets:write'])
+class DatasetBulkImport(Resource):
+    """
+    Bulk import of datasets.
+    """
+
+    @api.permission_required(permissions.AdminRolePermission())
+    @api.parameters(BulkImportDatasetsParameters(), locations=('query',))
+    @api.response(BulkImportReportSchema())
+    def post(self, args):
+        """
+        Import datasets from a YAML, JSON or CSV request body (or ``file``
+        upload)
+
+        Records are stored in chunks of ``chunk_size`` datasets, invalid ones
+        are skipped and reported with their row numbers.
+        """
+        upload = request.files.get('file')
+        if upload is not None:
+            stream = upload.stream
+            import_format = args.get('format') or importer.detect_format(upload.filename, upload.mimetype)
+        else:
+            stream = request.stream
+            import_format = args.get('format') or importer.detect_format(content_type=request.mimetype)
+        if import_format is None:
+            abort(code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE, message="Unknown import format.")
+
+        records = importer.read_records(codecs.getreader('utf-8')(stream), import_format)
+        dataset_importer = importer.DatasetImporter(
+            contributor_id=current_user.id,
+            chunk_size=args['chunk_size']
+        )
+        return dataset_importer.run(records)
+
+
+@api.route("/export")
+@api.login_required(oauth_scopes=['datasets:read'])
+class DatasetExport(Resource):
+    """
+    Export of the whole catalog.
+    """
+
+    @api.parameters(ExportDatasetsParameters())
+    def get(self, args):
+        """
+        Stream all datasets as NDJSON or CSV
+
+        License, organization and publisher are flattened into dotted fields,
+        rows are streamed as they are read from the database.
+        """
+        export_format = args['format']
+        return Response(
+            stream_with_context(exporter.export(export_format)),
+            mimetype=exporter.MIMETYPES[export_format],
+            headers={'Content-Disposition': 'attachment; filename=datasets.%s' % export_format}
+        )
+
+
+@api.route("/top")
+@api.login_required(oauth_scopes=['datasets:read'])
+class TopDatasets(Resource):
+    """
+    Most starred datasets.
+    """
+
+    @api.parameters(LeaderboardParameters())
+    @api.response(DatasetSchema(many=True))
+    def get(self, args):
+        """
+        List of the most starred datasets, most starred first
+
+        The ranking is refreshed periodically.
+        """
+        return leaderboard.page('top', offset=args['offset'], limit=args['limit'])
+
+
+@api.route("/trending")
+@api.login_required(oauth_scopes=['datasets:read'])
+class TrendingDatasets(Resource):
+    """
+    Datasets with the most recent activity.
+    """
+
+    @api.parameters(LeaderboardParameters())
+    @api.response(DatasetSchema(many=True))
+    def get(self, args):
+        """
+        List of trending datasets, by recent stars, story links and comments
+
+        The ranking is refreshed periodically.
+        """
+        return leaderboard.page('trending', offset=args['offset'], limit=args['limit'])
+
+
+@api.route("/search")
+@api.login_required(oauth_scopes=['datasets:read'])
+class DatasetSearch(Resource):
+    """
+    Full-text search of datasets.
+    """
+
+    @api.parameters(SearchParameters())
+    @api.response(DatasetSchema(many=True))
+    def get(self, args):
+        """
+        Search datasets by title, description, keywords and category
+
+        :param args: query parameters
+        :return: a list of matched datasets, best matches first.
+        """
+        return Dataset.search(args['q']).offset(args['offset']).limit(args['limit'])
 
 
 @api.route("/<id>")
@@ -104,6 +256,17 @@ class SingleDatasetResource(Resource):
     Manipulations with a specific dataset.
     """
 
+    @api.cached_response(
+        tags=lambda kwargs: [
+            response_cache.tag(Dataset, kwargs['dataset'].id),
+            response_cache.tag(Dataset),
+            response_cache.tag(License),
+            response_cache.tag(Organization),
+            response_cache.tag(Publisher),
+            response_cache.tag(Source),
+            response_cache.tag(Reference),
+        ]
+    )
     @api.response(DatasetSchema())
     def get(self, dataset):
         """ Get a specific dataset
@@ -152,6 +315,7 @@ class DatasetReferences(Resource):
     Manipulations with dataset references.
     """
 
+    @api.cached_response(tags=dataset_cache_tags(response_cache.tag(Reference)))
     @api.response(ReferenceSchema(many=True))
     def get(self, dataset_id):
         """ Get all references of a dataset"""
@@ -180,6 +344,7 @@ class DatasetSources(Resource):
     Manipulations with dataset sources.
     """
 
+    @api.cached_response(tags=dataset_cache_tags(response_cache.tag(Source)))
     @api.response(SourceSchema(many=True))
     def get(self, dataset_id):
         """ Get all sources of a dataset"""
@@ -209,6 +374,7 @@ class StarDatasetAction(Resource):
     """
 
     @api.login_required(oauth_scopes=['datasets:write'])
+    @api.rate_limited('stars', '60/minute', per_client='6000/minute')
     @api.response(DatasetSchema(only=['id', 'stars']))
     def patch(self, dataset_id):
         """Star a dataset by the login user
@@ -217,20 +383,14 @@ class StarDatasetAction(Resource):
                 db.session,
                 default_error_message="Failed to star a dataset."
         ):
-            user = current_user
-
             # Check existence of dataset
             dataset = Dataset.get(id=dataset_id)
 
-            user_star = UserStarDataset(user_id=user.id, dataset_id=dataset.id)
-            db.session.add(user_star)
-
-            dataset.stars += 1
-            db.session.add(dataset)
-
-            return dataset
+            stars = UserStarDataset.star(current_user.id, dataset.id)
+            return {'id': dataset.id, 'stars': stars}
 
     @api.login_required(oauth_scopes=['datasets:write'])
+    @api.rate_limited('stars', '60/minute', per_client='6000/minute')
     @api.response(DatasetSchema(only=['id', 'stars']))
     def delete(self, dataset_id):
         """Unstar a dataset by the login user
@@ -239,20 +399,11 @@ class StarDatasetAction(Resource):
                 db.session,
                 default_error_message="Failed to unstar a dataset."
         ):
-            user = current_user
-
             # Check existence of dataset
             dataset = Dataset.get(id=dataset_id)
-            user_star = UserStarDataset.query.filter_by(
-                user_id=user.id, dataset_id=dataset.id
-            ).first()
-
-            if user_star is not None:
-                db.session.delete(user_star)
-                dataset.stars -= 1
-                db.session.add(dataset)
 
-            return dataset
+            stars = UserStarDataset.unstar(current_user.id, dataset.id)
+            return {'id': dataset.id, 'stars': stars}
 
 
 @api.route('/<dataset_id>/comments')
@@ -262,15 +413,19 @@ class DatasetComments(Resource):
     Manipulations with a dataset comments.
     """
 
+    @api.parameters(PaginationParameters())
+    @api.cached_response(tags=dataset_cache_tags(response_cache.tag(Comment)))
     @api.response(CommentSchema(many=True))
-    def get(self, dataset_id):
-        """ Get all comments of a dataset"""
-        return Comment.get_target_comments(
-            target_id=dataset_id,
-            target_type=CommentType.DATASET_COMMENT
+    def get(self, args, dataset_id):
+        """ Get comments of a dataset, oldest first"""
+        return PaginationParameters.paginate(
+            Comment.query_target_comments(dataset_id, CommentType.DATASET_COMMENT),
+            args,
+            Comment
         )
 
     @api.login_required(oauth_scopes=['datasets:write'])
+    @api.rate_limited('comments', '10/minute', per_client='1000/minute')
     @api.parameters(AddCommentParameters())
     @api.response(CommentSchema())
     def post(self, args, dataset_id):
@@ -284,16 +439,14 @@ class DatasetComments(Resource):
             # Check existence of dataset
             dataset = Dataset.get(id=dataset_id)
 
-            # TODO: add comment flooding attack
-
             comment = Comment.create(
                 user_id=user.id,
                 target_id=dataset.id,
                 target_type=CommentType.DATASET_COMMENT,
                 comment=args.get('comment')
             )
-
-            return comment
+        COMMENTS_CREATED.inc(target='dataset')
+        return comment
 
 
 ##########################
@@ -307,11 +460,16 @@ class DatasetStories(Resource):
     Manipulations with a dataset's stories.
     """
 
+    @api.cached_response(
+        tags=dataset_cache_tags(response_cache.tag(Story), response_cache.tag(StoryDatasetAssociation))
+    )
     @api.response(StorySchema(many=True))
     def get(self, dataset_id):
         """ Get all associated stories of a dataset"""
-        associations = Dataset.get(id=dataset_id).stories_association
-        return [i.story for i in associations]
+        dataset = Dataset.get(id=dataset_id)
+        return Story.query \
+            .join(StoryDatasetAssociation) \
+            .filter(StoryDatasetAssociation.dataset_id == dataset.id)
 
     @api.login_required(oauth_scopes=['stories:write'])
     @api.parameters(AddStoryParameters())
@@ -333,10 +491,7 @@ class DatasetStories(Resource):
             new_story = Story.create(details_obj, **args)
 
             # Update dataset-story link
-            association = StoryDatasetAssociation(linker_id=contributor.id)
-            association.dataset = dataset
-            new_story.datasets_association.append(association)
-            db.session.add(new_story)
+            StoryDatasetAssociation.link(dataset, new_story, linker_id=contributor.id)
 
             return new_story
 
@@ -364,11 +519,7 @@ class DatasetStoryLinkAction(Resource):
             dataset = Dataset.get(id=dataset_id)
             story = Story.get(story_id=story_id)
 
-            sd = StoryDatasetAssociation(
-                story_id=story.id, dataset_id=dataset.id,
-                linker_id=user.id
-            )
-            db.session.add(sd)
+            StoryDatasetAssociation.link(dataset, story, linker_id=user.id)
 
             return dataset
 
@@ -395,7 +546,7 @@ class DatasetStoryLinkAction(Resource):
             ).first()
 
             if sd is not None:
-                db.session.delete(sd)
+                StoryDatasetAssociation.unlink(sd)
             else:
                 raise CatalogException('Unlinked already')
 
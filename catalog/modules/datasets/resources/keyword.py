@@ -0,0 +1,24 @@
+import logging
+
+from catalog.extensions.flask_restplus import Namespace
+from catalog.extensions.flask_restplus import Resource
+from catalog.modules.datasets.models import DatasetKeyword
+from catalog.modules.datasets.parameters import ListKeywordsParameters
+from catalog.modules.datasets.schemas import KeywordFacetSchema
+
+log = logging.getLogger(__name__)
+api = Namespace('keywords', description="On dataset keywords")
+
+
+@api.route('/')
+@api.login_required(oauth_scopes=['datasets:read'])
+class KeywordResource(Resource):
+
+    @api.parameters(ListKeywordsParameters())
+    @api.response(KeywordFacetSchema(many=True))
+    def get(self, args):
+        """
+        List of keywords with the number of datasets tagged with each one,
+        most used first.
+        """
+        return DatasetKeyword.facet().offset(args['offset']).limit(args['limit']).all()
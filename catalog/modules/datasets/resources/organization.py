@@ -22,7 +22,7 @@ class OrganizationResource(Resource):
         """
         List of organizations.
         """
-        return Organization.query.offset(args['offset']).limit(args['limit'])
+        return PaginationParameters.paginate(Organization.query, args, Organization)
 
     @api.login_required(oauth_scopes=['datasets:write'])
     @api.parameters(AddOrganizationParameters())
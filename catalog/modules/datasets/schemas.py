@@ -6,7 +6,7 @@ Dataset schemas
 
 from flask_marshmallow import base_fields
 
-from catalog.extensions.flask_restplus import ModelSchema
+from catalog.extensions.flask_restplus import ModelSchema, Schema
 from catalog.modules.datasets.models import Dataset, Organization, Publisher, Reference, Source, License
 
 
@@ -21,7 +21,7 @@ class DatasetSchema(ModelSchema):
     sources = base_fields.Nested('SourceSchema', many=True)
     references = base_fields.Nested('ReferenceSchema', many=True)
     contributor = base_fields.Nested('UserSchema')
-    story_count = base_fields.Method(serialize='count_stories')
+    keywords = base_fields.Method('dump_keywords', relationships=('keyword_entries',))
 
     class Meta:
         model = Dataset
@@ -31,6 +31,7 @@ class DatasetSchema(ModelSchema):
             Dataset.created.key,
             Dataset.updated.key,
             Dataset.stars.key,
+            Dataset.story_count.key,
             # Basic dimensions
             Dataset.name.key,
             Dataset.title.key,
@@ -57,25 +58,49 @@ class DatasetSchema(ModelSchema):
             'publisher',
             'sources',
             'references',
-            'story_count'
         )
         dump_only = (
             Dataset.id.key,
             Dataset.created.key,
             Dataset.updated.key,
             Dataset.stars.key,
+            Dataset.story_count.key,
             'contributor',
             'license',
             'organization',
             'publisher',
             'sources',
             'references',
-            'story_count'
         )
 
-    def count_stories(self, dataset):
-        assert isinstance(dataset, Dataset)
-        return dataset.associated_stories_num()
+    def dump_keywords(self, obj):
+        return obj.keyword_list()
+
+
+class KeywordFacetSchema(Schema):
+    """
+    Number of datasets tagged with a keyword.
+    """
+    keyword = base_fields.String()
+    count = base_fields.Integer()
+
+
+class BulkImportErrorSchema(Schema):
+    """
+    A record rejected by a bulk import.
+    """
+    row = base_fields.Integer()
+    name = base_fields.String()
+    message = base_fields.String()
+
+
+class BulkImportReportSchema(Schema):
+    """
+    Outcome of a bulk import.
+    """
+    created = base_fields.Integer()
+    failed = base_fields.Integer()
+    errors = base_fields.Nested(BulkImportErrorSchema, many=True)
 
 
 class LicenseSchema(ModelSchema):
@@ -0,0 +1,16 @@
+# encoding: utf-8
+"""
+Debug module
+============
+
+Admin-only introspection of the running application.
+"""
+from catalog.extensions.api import current_api
+
+
+def init_app(app, **kwargs):
+    current_api.add_oauth_scope('debug:read', "Provide access to debugging details")
+
+    from . import resources
+
+    current_api.add_namespace(resources.api)
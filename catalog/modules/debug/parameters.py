@@ -0,0 +1,17 @@
+# encoding: utf-8
+"""
+Input arguments (Parameters) for Debug resources RESTful API
+------------------------------------------------------------
+"""
+from flask_marshmallow import base_fields
+from marshmallow import validate
+
+from catalog.extensions.flask_restplus import Parameters
+
+
+class ProfileParameters(Parameters):
+    top = base_fields.Integer(
+        description="Number of the slowest endpoints (PROFILING_TOP by default).",
+        required=False,
+        validate=validate.Range(min=1, max=100)
+    )
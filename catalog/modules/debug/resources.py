@@ -0,0 +1,46 @@
+# encoding: utf-8
+"""
+RESTful API Debug resources
+---------------------------
+"""
+import logging
+from http import HTTPStatus
+
+from catalog.extensions import permissions, profiler
+from catalog.extensions.flask_restplus import Namespace
+from catalog.extensions.flask_restplus import Resource
+from catalog.modules.debug.parameters import ProfileParameters
+from catalog.modules.debug.schemas import ProfileReportSchema
+
+log = logging.getLogger(__name__)
+api = Namespace('_debug', description="Debugging tools")
+
+
+@api.route('/profile')
+@api.login_required(oauth_scopes=['debug:read'])
+class Profile(Resource):
+    """
+    Request profiler report, see ``PROFILING_ENABLED``.
+    """
+
+    @api.permission_required(permissions.AdminRolePermission())
+    @api.parameters(ProfileParameters())
+    @api.response(ProfileReportSchema())
+    def get(self, args):
+        """
+        List the slowest endpoints over their last requests.
+        """
+        return {
+            'enabled': profiler.enabled,
+            'window': profiler.window,
+            'endpoints': profiler.report(top=args.get('top')),
+        }
+
+    @api.permission_required(permissions.AdminRolePermission())
+    @api.response(code=HTTPStatus.NO_CONTENT)
+    def delete(self):
+        """
+        Forget the recorded requests.
+        """
+        profiler.reset()
+        return None
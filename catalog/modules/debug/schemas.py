@@ -0,0 +1,42 @@
+# encoding: utf-8
+"""
+Serialization schemas for Debug resources RESTful API
+-----------------------------------------------------
+"""
+from flask_marshmallow import base_fields
+
+from catalog.extensions.flask_restplus import Schema
+
+
+class PhasesSchema(Schema):
+    """
+    Mean time of request phases in milliseconds.
+    """
+    auth = base_fields.Float()
+    parse = base_fields.Float()
+    serialize = base_fields.Float()
+    app = base_fields.Float()
+
+
+class EndpointProfileSchema(Schema):
+    """
+    Timings of the last requests of an endpoint in milliseconds.
+    """
+    endpoint = base_fields.String()
+    count = base_fields.Integer()
+    mean_ms = base_fields.Float()
+    p50_ms = base_fields.Float()
+    p95_ms = base_fields.Float()
+    max_ms = base_fields.Float()
+    sql_count = base_fields.Float(description="Mean number of SQL statements")
+    sql_ms = base_fields.Float()
+    phases_ms = base_fields.Nested(PhasesSchema)
+
+
+class ProfileReportSchema(Schema):
+    """
+    Slowest endpoints of the request profiler.
+    """
+    enabled = base_fields.Boolean()
+    window = base_fields.Integer(description="Number of the last requests of an endpoint")
+    endpoints = base_fields.Nested(EndpointProfileSchema, many=True)
@@ -2,10 +2,12 @@
 import uuid
 from enum import IntEnum
 
+from sqlalchemy import inspect
 from sqlalchemy.sql import func
 
 from catalog.exception import ObjectDoesNotExist
-from catalog.extensions import db
+from catalog.extensions import db, response_cache
+from catalog.extensions.search import FullTextIndex
 from catalog.modules.datasets.models import Dataset
 
 
@@ -29,12 +31,53 @@ class StoryDatasetAssociation(db.Model):
     linker_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     dataset = db.relationship(Dataset.__name__, backref="stories_association")
 
+    @staticmethod
+    def _increment_counter(instance, counter_name, delta):
+        """
+        Update a denormalized counter with ``counter = counter + delta`` on
+        flush, so concurrent links do not overwrite each other. Pending
+        instances are not in the database yet, so their value is set directly.
+        """
+        if inspect(instance).persistent:
+            setattr(instance, counter_name, getattr(type(instance), counter_name) + delta)
+        else:
+            setattr(instance, counter_name, (getattr(instance, counter_name) or 0) + delta)
+
+    @classmethod
+    def link(cls, dataset, story, linker_id):
+        """
+        Link a story with a dataset and update both counters in the same
+        transaction.
+        :return: a new `StoryDatasetAssociation` instance
+        """
+        association = cls(linker_id=linker_id)
+        association.dataset = dataset
+        association.story = story
+        db.session.add(association)
+        cls._increment_counter(dataset, Dataset.story_count.key, 1)
+        cls._increment_counter(story, Story.dataset_count.key, 1)
+        return association
+
+    @classmethod
+    def unlink(cls, association):
+        """
+        Remove a link between a story and a dataset and update both counters
+        in the same transaction.
+        """
+        cls._increment_counter(association.dataset, Dataset.story_count.key, -1)
+        cls._increment_counter(association.story, Story.dataset_count.key, -1)
+        db.session.delete(association)
+
 
 class Story(db.Model):
     """
     Story database
     """
     __tablename__ = 'story'
+    __table_args__ = (
+        # Keyset pagination key
+        db.Index('ix_story_created_id', 'created', 'id'),
+    )
 
     id = db.Column(db.String(128), primary_key=True)
     title = db.Column(db.String(512), nullable=False, unique=True)
@@ -43,6 +86,9 @@ class Story(db.Model):
     category = db.Column(db.String(64))
     type = db.Column(db.Integer, nullable=False, default=int(StoryType.GENERAL))
     stars = db.Column(db.Integer, default=0)
+    # Denormalized number of dataset links, maintained by
+    # ``StoryDatasetAssociation.link``/``unlink``
+    dataset_count = db.Column(db.Integer, default=0, nullable=False)
     keywords = db.Column(db.String(1024))
     issued_time = db.Column(db.DateTime)
     contributor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -92,12 +138,30 @@ class Story(db.Model):
             db.session.add(details)
         return story
 
+    @classmethod
+    def search(cls, text):
+        """
+        DAO: full-text search of stories, best matches first.
+        :return: a query of stories
+        """
+        return search_index.search(cls.query, text)
+
     def associated_datasets_num(self):
         """
         Get the number of associated datasets with the story
         :return: integer
         """
-        return len(list(self.datasets_association))
+        return self.dataset_count
+
+
+search_index = FullTextIndex(Story, ('title', 'description', 'keywords'), weights=(10.0, 1.0, 5.0))
+
+
+response_cache.invalidate_on_change(
+    StoryDatasetAssociation, lambda association: [response_cache.tag(Dataset, association.dataset_id)]
+)
+# Nested into dataset stories responses
+response_cache.invalidate_on_change(Story, lambda story: [response_cache.tag(Story)])
 
 
 class StoryAcademic(db.Model):
@@ -128,3 +192,8 @@ class StoryNews(db.Model):
     date = db.Column(db.String(1024))
     location = db.Column(db.String(128))
     country = db.Column(db.String(64))
+
+
+# Nested into dataset stories responses as story details
+response_cache.invalidate_on_change(StoryAcademic, lambda details: [response_cache.tag(Story)])
+response_cache.invalidate_on_change(StoryNews, lambda details: [response_cache.tag(Story)])
@@ -3,9 +3,17 @@
 from flask_marshmallow import base_fields
 
 from catalog.extensions.flask_restplus import PostFormParameters
+from catalog.extensions.flask_restplus.parameters import BatchGetParameters, PaginationParameters
 from catalog.modules.stories import schemas
 
 
+class ListStoriesParameters(PaginationParameters, BatchGetParameters):
+    """
+    Story listing parameters. With ``ids``, the listed stories are the
+    requested ones and pagination is ignored.
+    """
+
+
 class AddStoryParameters(PostFormParameters, schemas.StorySchema):
     """
     New story creation parameters.
@@ -9,33 +9,59 @@ from catalog.extensions import db
 from catalog.extensions import permissions
 from catalog.extensions.flask_restplus import Namespace
 from catalog.extensions.flask_restplus import Resource
-from catalog.extensions.flask_restplus.parameters import PaginationParameters
-from catalog.modules.comments.models import Comment, CommentType
+from catalog.extensions.flask_restplus.parameters import BatchGetParameters, PaginationParameters, \
+    SearchParameters
+from catalog.modules.comments.models import COMMENTS_CREATED, Comment, CommentType
 from catalog.modules.comments.parameters import AddCommentParameters
 from catalog.modules.comments.schemas import CommentSchema
 from catalog.modules.stories.models import Story
-from catalog.modules.stories.parameters import UpdateStoryParameters
+from catalog.modules.stories.parameters import ListStoriesParameters, UpdateStoryParameters
 from catalog.modules.stories.schemas import StorySchema
 from catalog.modules.users.models import User, UserStarStory
 
 log = logging.getLogger(__name__)
 api = Namespace('stories', description="On stories")
 
+STORIES_SCHEMA = StorySchema(many=True)
+
 
 @api.route('/')
 @api.login_required(oauth_scopes=['stories:read'])
 class StoryResource(Resource):
-    @api.parameters(PaginationParameters())
-    @api.response(StorySchema(many=True))
+    @api.parameters(ListStoriesParameters())
+    @api.response(STORIES_SCHEMA)
     def get(self, args):
         """
         List of all stories.
 
         :param args: query parameters
-        :return: a list of stories starting from ``offset`` limited by
-        ``limit`` parameter.
+        :return: a list of stories starting from ``offset`` (or ``cursor``)
+        limited by ``limit`` parameter, or the stories of ``ids`` in the same
+        order (``null`` if not found).
         """
-        return Story.query.offset(args['offset']).limit(args['limit'])
+        if args.get('ids'):
+            query = Story.query.options(*STORIES_SCHEMA.eager_loading_options())
+            return BatchGetParameters.batch_get(query, args['ids'], Story)
+        return PaginationParameters.paginate(Story.query, args, Story)
+
+
+@api.route('/search')
+@api.login_required(oauth_scopes=['stories:read'])
+class StorySearch(Resource):
+    """
+    Full-text search of stories.
+    """
+
+    @api.parameters(SearchParameters())
+    @api.response(StorySchema(many=True))
+    def get(self, args):
+        """
+        Search stories by title, description and keywords.
+
+        :param args: query parameters
+        :return: a list of matched stories, best matches first.
+        """
+        return Story.search(args['q']).offset(args['offset']).limit(args['limit'])
 
 
 @api.route('/<story_id>')
@@ -78,6 +104,7 @@ class SingleStory(Resource):
 @api.login_required(oauth_scopes=['stories:read'])
 class StarStoryAction(Resource):
     @api.login_required(oauth_scopes=['stories:write'])
+    @api.rate_limited('stars', '60/minute', per_client='6000/minute')
     @api.response(StorySchema(only=['id', 'stars']))
     def patch(self, story_id):
         """Star a story by the login user
@@ -92,15 +119,11 @@ class StarStoryAction(Resource):
             # Check existence of story
             story = Story.get(story_id=story_id)
 
-            user_star = UserStarStory(user_id=user.id, story_id=story.id)
-            db.session.add(user_star)
-
-            story.stars += 1
-            db.session.add(story)
-
-            return story
+            stars = UserStarStory.star(user.id, story.id)
+            return {'id': story.id, 'stars': stars}
 
     @api.login_required(oauth_scopes=['stories:write'])
+    @api.rate_limited('stars', '60/minute', per_client='6000/minute')
     @api.response(StorySchema(only=['id', 'stars']))
     def delete(self, story_id):
         """Unstar a story by the login user
@@ -115,31 +138,25 @@ class StarStoryAction(Resource):
             # Check existence of story
             story = Story.get(story_id=story_id)
 
-            # Unstar a story
-            user_star = UserStarStory.query.filter_by(
-                user_id=user.id, story_id=story.id
-            ).first()
-
-            if user_star is not None:
-                db.session.delete(user_star)
-                story.stars -= 1
-                db.session.add(story)
-
-            return story
+            stars = UserStarStory.unstar(user.id, story.id)
+            return {'id': story.id, 'stars': stars}
 
 
 @api.route('/<story_id>/comments')
 @api.login_required(oauth_scopes=['stories:read'])
 class StoryComments(Resource):
+    @api.parameters(PaginationParameters())
     @api.response(CommentSchema(many=True))
-    def get(self, story_id):
-        """ Get all comments of a story"""
-        return Comment.get_target_comments(
-            target_id=story_id,
-            target_type=CommentType.STORY_COMMENT
+    def get(self, args, story_id):
+        """ Get comments of a story, oldest first"""
+        return PaginationParameters.paginate(
+            Comment.query_target_comments(story_id, CommentType.STORY_COMMENT),
+            args,
+            Comment
         )
 
     @api.login_required(oauth_scopes=['stories:write'])
+    @api.rate_limited('comments', '10/minute', per_client='1000/minute')
     @api.parameters(AddCommentParameters())
     @api.response(CommentSchema())
     def post(self, args, story_id):
@@ -154,13 +171,11 @@ class StoryComments(Resource):
             # Check existence of story
             story = Story.get(story_id=story_id)
 
-            # TODO: add comment flooding attack
-
             comment = Comment.create(
                 user_id=user.id,
                 target_id=story.id,
                 target_type=CommentType.STORY_COMMENT,
                 comment=args.get('comment')
             )
-
-            return comment
+        COMMENTS_CREATED.inc(target='story')
+        return comment
@@ -59,7 +59,8 @@ story_details_schema = {
 class StorySchema(ModelSchema):
     contributor = base_fields.Nested('UserSchema')
     details = base_fields.Method(serialize='dump_story_details',
-                                 deserialize='load_story_details')
+                                 deserialize='load_story_details',
+                                 relationships=tuple(story_details_fields.values()))
 
     class Meta(ModelSchema.Meta):
         model = Story
@@ -67,6 +68,7 @@ class StorySchema(ModelSchema):
             Story.id.key,
             Story.created.key,
             Story.updated.key,
+            Story.dataset_count.key,
             'contributor',
         )
         fields = (
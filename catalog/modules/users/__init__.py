@@ -3,6 +3,9 @@
 Users module
 ============
 """
+from functools import partial
+
+from catalog.extensions import metrics
 from catalog.extensions.api import current_api
 
 
@@ -17,3 +20,9 @@ def init_app(app, **kwargs):
     from . import models, resources
 
     current_api.add_namespace(resources.api)
+
+    # Coalesce star counter updates if configured
+    from .stars import collect_metrics, init_write_behind
+    counters = [models.UserStarDataset.counter, models.UserStarStory.counter]
+    init_write_behind(app, counters)
+    metrics.register_collector('stars', partial(collect_metrics, counters))
@@ -7,9 +7,11 @@ import enum
 
 from sqlalchemy.sql import func
 from sqlalchemy_utils import types as column_types
+from sqlalchemy_utils.types.password import Password
 
 from catalog.exception import ObjectDoesNotExist
-from catalog.extensions import db
+from catalog.extensions import db, password_hasher, response_cache
+from .stars import StarCounter
 
 
 def _get_is_static_role_property(role_name, static_role):
@@ -45,14 +47,15 @@ class User(db.Model):
     """
     User database model.
     """
+    __table_args__ = (
+        # Keyset pagination key
+        db.Index('ix_user_created_id', 'created', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(length=80), unique=True, nullable=False)
     password = db.Column(
-        column_types.PasswordType(
-            max_length=128,
-            schemes=('bcrypt',)
-        ),
+        password_hasher.column_type(max_length=128),
         nullable=False
     )
     email = db.Column(column_types.EmailType(length=120), unique=True, nullable=False)
@@ -145,9 +148,22 @@ class User(db.Model):
         user = cls.query.filter_by(username=username).first()
         if not user:
             return None
-        if user.password == password:
-            return user
-        return None
+        valid, new_hash = password_hasher.verify_and_update(password, user.password.hash)
+        if not valid:
+            return None
+        if new_hash is not None:
+            # The hash cost has changed since the password was set
+            with db.session.begin(subtransactions=True):
+                user.password = Password(new_hash)
+        return user
+
+    def verify_password(self, password):
+        """
+        Check a plain-text password with ``password_hasher``.
+        """
+        if self.password is None:
+            return False
+        return password_hasher.verify_and_update(password, self.password.hash)[0]
 
     @classmethod
     def get(cls, user_id=None, username=None, **kwargs):
@@ -239,12 +255,30 @@ class UserStarDataset(db.Model):
     __tablename__ = 'user_star_dataset'
     __table_args__ = (
         db.PrimaryKeyConstraint('user_id', 'dataset_id'),
+        # Recent stars of trending datasets
+        db.Index('ix_user_star_dataset_stared_time', 'stared_time'),
     )
 
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     dataset_id = db.Column(db.String(128), db.ForeignKey('dataset.id'), nullable=True)
     stared_time = db.Column(db.DateTime(), default=func.now())
 
+    @classmethod
+    def star(cls, user_id, dataset_id):
+        """
+        DAO: star a dataset, starring it again changes nothing.
+        :return: the number of stars of the dataset
+        """
+        return cls.counter.star(user_id, dataset_id)
+
+    @classmethod
+    def unstar(cls, user_id, dataset_id):
+        """
+        DAO: remove a star of a dataset if any.
+        :return: the number of stars of the dataset
+        """
+        return cls.counter.unstar(user_id, dataset_id)
+
 
 class UserStarStory(db.Model):
     """
@@ -258,3 +292,29 @@ class UserStarStory(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     story_id = db.Column(db.String(128), db.ForeignKey('story.id'), nullable=True)
     stared_time = db.Column(db.DateTime(), default=func.now())
+
+    @classmethod
+    def star(cls, user_id, story_id):
+        """
+        DAO: star a story, starring it again changes nothing.
+        :return: the number of stars of the story
+        """
+        return cls.counter.star(user_id, story_id)
+
+    @classmethod
+    def unstar(cls, user_id, story_id):
+        """
+        DAO: remove a star of a story if any.
+        :return: the number of stars of the story
+        """
+        return cls.counter.unstar(user_id, story_id)
+
+
+# ``Dataset.stars`` and ``Story.stars`` counters
+UserStarDataset.counter = StarCounter(
+    UserStarDataset, 'dataset_id', tags=lambda dataset_id: [response_cache.tag('dataset', dataset_id)]
+)
+# Stories are nested into other responses, which are cached by the table tag
+UserStarStory.counter = StarCounter(
+    UserStarStory, 'story_id', tags=lambda story_id: [response_cache.tag('story')]
+)
@@ -86,7 +86,7 @@ class PatchUserDetailsParameters(PatchJSONParameters):
         Additional check for 'current_password' as User hasn't field 'current_password'
         """
         if field == 'current_password':
-            if current_user.password != value and obj.password != value:
+            if not current_user.verify_password(value) and not obj.verify_password(value):
                 abort(code=HTTPStatus.FORBIDDEN, message="Wrong password")
             else:
                 state['current_password'] = value
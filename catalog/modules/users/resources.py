@@ -38,10 +38,10 @@ class Users(Resource):
         """
         List of all users.
 
-        Returns a list of users starting from ``offset`` limited by ``limit``
-        parameter.
+        Returns a list of users starting from ``offset`` (or ``cursor``)
+        limited by ``limit`` parameter.
         """
-        return User.query.offset(args['offset']).limit(args['limit'])
+        return PaginationParameters.paginate(User.query, args, User)
 
     @api.parameters(parameters.AddUserParameters())
     @api.response(schemas.UserSchema())
@@ -145,8 +145,9 @@ class UserAllFollowers(Resource):
     def get(self, args):
         """Get all followers of current user
         """
-        return User.query_all_followers(current_user.id) \
-            .offset(args['offset']).limit(args['limit'])
+        return PaginationParameters.paginate(
+            User.query_all_followers(current_user.id), args, User
+        )
 
 
 @api.route('/following')
@@ -158,8 +159,9 @@ class UserAllFollowing(Resource):
     def get(self, args):
         """Get all following users of current user
         """
-        return User.query_all_following(current_user.id) \
-            .offset(args['offset']).limit(args['limit'])
+        return PaginationParameters.paginate(
+            User.query_all_following(current_user.id), args, User
+        )
 
 
 @api.route('/following/<int:uid>')
@@ -167,6 +169,7 @@ class UserFollowingUpdate(Resource):
     @api.login_required(oauth_scopes=['users:write'])
     @api.permission_required(permissions.OwnerRolePermission())
     @api.permission_required(permissions.WriteAccessPermission())
+    @api.rate_limited('follows', '30/minute', per_client='3000/minute')
     @api.response(schemas.UserSchema())
     def patch(self, uid):
         """Follow a new user
@@ -183,6 +186,7 @@ class UserFollowingUpdate(Resource):
     @api.login_required(oauth_scopes=['users:write'])
     @api.permission_required(permissions.OwnerRolePermission())
     @api.permission_required(permissions.WriteAccessPermission())
+    @api.rate_limited('follows', '30/minute', per_client='3000/minute')
     @api.response(schemas.UserSchema())
     def delete(self, uid):
         """Un-follow a user
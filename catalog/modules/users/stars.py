@@ -0,0 +1,285 @@
+# encoding: utf-8
+"""
+Star counters
+=============
+
+``Dataset.stars`` and ``Story.stars`` are denormalized numbers of
+``UserStarDataset``/``UserStarStory`` rows. They are never read, modified
+and written back by the application, since concurrent stars would lose
+updates:
+
+* a star inserts the user star row ignoring duplicates (``ON CONFLICT DO
+  NOTHING``, ``INSERT IGNORE`` on MySQL, ``INSERT OR IGNORE`` on SQLite) and
+  an unstar deletes it, so a repeated star or unstar changes nothing;
+* only if a row was inserted or deleted, the counter is updated in the same
+  transaction with a single ``UPDATE ... SET stars = stars + 1``.
+
+With ``STAR_COUNTER_FLUSH_INTERVAL`` set, counters are written behind:
+committed increments are coalesced in memory per starred object and flushed
+every ``STAR_COUNTER_FLUSH_INTERVAL`` seconds, with an ``UPDATE`` per
+distinct increment, so a hot dataset costs one counter update per interval
+instead of one per star. Unflushed increments are lost if the process dies,
+so counters may need a recount (``StarCounter.recount``) afterwards.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event, func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from catalog.extensions import db, response_cache, server
+from catalog.extensions.metrics import stats_counter
+
+log = logging.getLogger(__name__)
+
+
+class StarCounter(object):
+    """
+    Stars of a model, recorded in ``star_model`` rows.
+
+    Args:
+        star_model (type) - ``UserStarDataset`` or ``UserStarStory``.
+        target_key (str) - name of the ``star_model`` column of starred IDs.
+        tags (callable) - response cache tags of a starred ID.
+    """
+
+    def __init__(self, star_model, target_key, tags):
+        self.star_model = star_model
+        self.target_column = star_model.__table__.c[target_key]
+        self.tags = tags
+        self.write_behind = False
+        self.stats = {'stars': 0, 'unstars': 0, 'updates': 0, 'flushes': 0}
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+        self._session_key = 'star_counter_%s' % star_model.__tablename__
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_rollback', self._after_rollback)
+
+    @property
+    def table(self):
+        # The starred table, e.g. ``dataset``
+        foreign_key, = self.target_column.foreign_keys
+        return foreign_key.column.table
+
+    def _count(self, stat, value=1):
+        with self._lock:
+            self.stats[stat] += value
+
+    def _insert_ignore(self, session, row):
+        table = self.star_model.__table__
+        dialect_name = session.get_bind(self.star_model.__mapper__).dialect.name
+        if dialect_name == 'postgresql':
+            statement = postgresql.insert(table).on_conflict_do_nothing()
+        elif dialect_name == 'mysql':
+            statement = table.insert().prefix_with('IGNORE')
+        elif dialect_name == 'sqlite':
+            statement = table.insert().prefix_with('OR IGNORE')
+        else:
+            try:
+                with session.begin_nested():
+                    session.execute(table.insert(), row)
+            except IntegrityError:
+                return False
+            return True
+        return session.execute(statement, row).rowcount > 0
+
+    def star(self, user_id, target_id):
+        """
+        Star ``target_id`` by ``user_id``.
+
+        Returns:
+            stars (int) - the number of stars of ``target_id``.
+        """
+        session = db.session()
+        with session.begin(subtransactions=True):
+            row = {'user_id': user_id, self.target_column.name: target_id}
+            if self._insert_ignore(session, row):
+                self._count('stars')
+                self._increment(session, target_id, 1)
+            return self.get(target_id)
+
+    def unstar(self, user_id, target_id):
+        """
+        Remove a star of ``target_id`` by ``user_id``.
+
+        Returns:
+            stars (int) - the number of stars of ``target_id``.
+        """
+        session = db.session()
+        with session.begin(subtransactions=True):
+            deleted = session.execute(
+                self.star_model.__table__.delete()
+                .where(self.star_model.__table__.c.user_id == user_id)
+                .where(self.target_column == target_id)
+            ).rowcount
+            if deleted:
+                self._count('unstars')
+                self._increment(session, target_id, -1)
+            return self.get(target_id)
+
+    def get(self, target_id):
+        """
+        Returns:
+            stars (int) - the number of stars of ``target_id`` including
+            increments which have not been flushed yet.
+        """
+        table = self.table
+        stars = db.session.execute(
+            db.select([table.c.stars]).where(table.c.id == target_id)
+        ).scalar() or 0
+        with self._lock:
+            stars += self._pending.get(target_id, 0)
+        return stars + db.session().info.get(self._session_key, {}).get(target_id, 0)
+
+    def _increment(self, session, target_id, delta):
+        if self.write_behind:
+            # Buffered once the transaction commits
+            deltas = session.info.setdefault(self._session_key, defaultdict(int))
+            deltas[target_id] += delta
+        else:
+            self._update(session, [target_id], delta)
+
+    def _update(self, session, target_ids, delta):
+        # Core update, ``Query.update`` would invalidate the whole table
+        table = self.table
+        session.execute(
+            table.update()
+            .where(table.c.id.in_(target_ids))
+            .values(stars=func.coalesce(table.c.stars, 0) + delta)
+        )
+        self._count('updates')
+        response_cache.invalidate_on_commit(
+            session, *[tag for target_id in target_ids for tag in self.tags(target_id)]
+        )
+
+    def _after_commit(self, session):
+        deltas = session.info.pop(self._session_key, None)
+        if deltas:
+            with self._lock:
+                for target_id, delta in deltas.items():
+                    self._pending[target_id] += delta
+
+    def _after_rollback(self, session):
+        session.info.pop(self._session_key, None)
+
+    def flush(self):
+        """
+        Write the buffered increments, an ``UPDATE`` per distinct increment.
+
+        Returns:
+            flushed (int) - the number of updated objects.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        by_delta = defaultdict(list)
+        for target_id, delta in pending.items():
+            if delta:
+                by_delta[delta].append(target_id)
+        if not by_delta:
+            return 0
+
+        session = db.session()
+        try:
+            with session.begin():
+                for delta, target_ids in by_delta.items():
+                    self._update(session, target_ids, delta)
+        except Exception:
+            # Keep the increments for the next flush
+            with self._lock:
+                for target_id, delta in pending.items():
+                    self._pending[target_id] += delta
+            raise
+        self._count('flushes')
+        return sum(len(target_ids) for target_ids in by_delta.values())
+
+    def recount(self):
+        """
+        Recompute all the counters from the user star rows, which already
+        include the buffered increments.
+        """
+        table = self.table
+        session = db.session()
+        with self._lock:
+            self._pending.clear()
+        with session.begin():
+            session.execute(
+                table.update().values(
+                    stars=db.select([func.count()])
+                    .select_from(self.star_model.__table__)
+                    .where(self.target_column == table.c.id)
+                    .as_scalar()
+                )
+            )
+            response_cache.invalidate_on_commit(session, response_cache.tag(table.name))
+
+
+class StarCountersFlusher(threading.Thread):
+    """
+    Daemon thread flushing write-behind ``counters`` every ``interval``
+    seconds within the application context.
+    """
+
+    def __init__(self, app, counters, interval):
+        super(StarCountersFlusher, self).__init__(name='star-counters')
+        self.daemon = True
+        self.app = app
+        self.counters = counters
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def flush(self):
+        for counter in self.counters:
+            try:
+                with self.app.app_context():
+                    counter.flush()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Star counters flush of %s has failed.", counter.table.name)
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+
+def init_write_behind(app, counters):
+    """
+    Switch ``counters`` to write-behind if ``STAR_COUNTER_FLUSH_INTERVAL``
+    is set.
+    """
+    interval = app.config.get('STAR_COUNTER_FLUSH_INTERVAL', 0)
+    for counter in counters:
+        counter.write_behind = interval > 0
+    if interval > 0 and not app.testing:
+        def start_flusher():
+            flusher = StarCountersFlusher(app, counters, interval)
+            flusher.start()
+            atexit.register(flusher.stop)
+
+        start_flusher()
+        # Forked workers of a preloaded app have their own increments
+        server.after_fork(start_flusher)
+
+
+def collect_metrics(counters):
+    """
+    Metrics of star ``counters``, by starred table.
+    """
+    collected = []
+    for counter in counters:
+        stats = dict(counter.stats)
+        collected.append(stats_counter(
+            'catalog_stars_total', "Stars and unstars by starred table",
+            {event: stats[event] for event in ('stars', 'unstars')}, 'event', target=counter.table.name
+        ))
+        collected.append(stats_counter(
+            'catalog_star_counter_writes_total', "Star counter updates and write-behind flushes",
+            {event: stats[event] for event in ('updates', 'flushes')}, 'event', target=counter.table.name
+        ))
+    return collected
@@ -34,4 +34,8 @@ mysql -u ${CATALOG_MYSQL_USERNAME} \
 CREATE DATABASE IF NOT EXISTS ${CATALOG_DATABASE} DEFAULT CHARSET utf8 COLLATE utf8_general_ci;
 EOF
 
-invoke app.run
+if [ "$FLASK_ENV" == "development" ]; then
+  invoke app.run
+else
+  exec invoke app.run.serve --flask-config=$FLASK_ENV --bind=0.0.0.0:${CATALOG_WEBSERVER_PORT:-4444}
+fi
@@ -0,0 +1,28 @@
+"""keyset pagination indexes
+
+Revision ID: 3b1f2c9a7d10
+Revises: d6c6529db987
+Create Date: 2026-10-18 10:12:41.118204
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3b1f2c9a7d10'
+down_revision = 'd6c6529db987'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_index('ix_dataset_created_id', 'dataset', ['created', 'id'], unique=False)
+    op.create_index('ix_organization_created_id', 'organization', ['created', 'id'], unique=False)
+    op.create_index('ix_story_created_id', 'story', ['created', 'id'], unique=False)
+    op.create_index('ix_user_created_id', 'user', ['created', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_created_id', table_name='user')
+    op.drop_index('ix_story_created_id', table_name='story')
+    op.drop_index('ix_organization_created_id', table_name='organization')
+    op.drop_index('ix_dataset_created_id', table_name='dataset')
@@ -0,0 +1,68 @@
+"""full-text search indexes of datasets and stories
+
+Revision ID: 5c7d2e9b4a13
+Revises: 8e4a61c0f2b5
+Create Date: 2026-10-18 12:41:09.204815
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5c7d2e9b4a13'
+down_revision = '8e4a61c0f2b5'
+
+from alembic import op
+
+
+INDEXED_COLUMNS = {
+    'dataset': ('title', 'description', 'keywords', 'category'),
+    'story': ('title', 'description', 'keywords'),
+}
+
+
+# A copy of the ``catalog.extensions.search`` DDL of this revision, so later
+# changes of the module do not change what the revision runs
+def _sqlite_statements(table, columns):
+    params = dict(
+        name='%s_fts' % table,
+        table=table,
+        columns=', '.join(columns),
+        new_values=', '.join('new.%s' % column for column in columns),
+        old_values=', '.join('old.%s' % column for column in columns),
+    )
+    return [
+        "CREATE VIRTUAL TABLE {name} USING fts5("
+        "{columns}, content='{table}', content_rowid='rowid', prefix='2 3')".format(**params),
+        "CREATE TRIGGER {name}_ai AFTER INSERT ON {table} BEGIN "
+        "INSERT INTO {name}(rowid, {columns}) VALUES (new.rowid, {new_values}); "
+        "END".format(**params),
+        "CREATE TRIGGER {name}_ad AFTER DELETE ON {table} BEGIN "
+        "INSERT INTO {name}({name}, rowid, {columns}) "
+        "VALUES ('delete', old.rowid, {old_values}); "
+        "END".format(**params),
+        "CREATE TRIGGER {name}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+        "INSERT INTO {name}({name}, rowid, {columns}) "
+        "VALUES ('delete', old.rowid, {old_values}); "
+        "INSERT INTO {name}(rowid, {columns}) VALUES (new.rowid, {new_values}); "
+        "END".format(**params),
+        # Index the existing rows
+        "INSERT INTO {name}({name}) VALUES ('rebuild')".format(**params),
+    ]
+
+
+def upgrade():
+    dialect_name = op.get_bind().dialect.name
+    for table, columns in INDEXED_COLUMNS.items():
+        if dialect_name == 'sqlite':
+            for statement in _sqlite_statements(table, columns):
+                op.execute(statement)
+        elif dialect_name == 'mysql':
+            op.create_index('%s_fts' % table, table, list(columns), mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    dialect_name = op.get_bind().dialect.name
+    for table in INDEXED_COLUMNS:
+        if dialect_name == 'sqlite':
+            op.execute("DROP TABLE IF EXISTS %s_fts" % table)
+        elif dialect_name == 'mysql':
+            op.drop_index('%s_fts' % table, table_name=table)
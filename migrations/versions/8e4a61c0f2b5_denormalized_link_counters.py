@@ -0,0 +1,34 @@
+"""denormalized dataset/story link counters
+
+Revision ID: 8e4a61c0f2b5
+Revises: 3b1f2c9a7d10
+Create Date: 2026-10-18 11:03:27.551342
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8e4a61c0f2b5'
+down_revision = '3b1f2c9a7d10'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('dataset', sa.Column('story_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('story', sa.Column('dataset_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill counters from the existing links
+    op.execute(
+        "UPDATE dataset SET story_count = ("
+        "SELECT COUNT(*) FROM dataset_story WHERE dataset_story.dataset_id = dataset.id)"
+    )
+    op.execute(
+        "UPDATE story SET dataset_count = ("
+        "SELECT COUNT(*) FROM dataset_story WHERE dataset_story.story_id = story.id)"
+    )
+
+
+def downgrade():
+    op.drop_column('story', 'dataset_count')
+    op.drop_column('dataset', 'story_count')
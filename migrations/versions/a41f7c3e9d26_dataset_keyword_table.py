@@ -0,0 +1,56 @@
+"""normalized dataset keywords
+
+Revision ID: a41f7c3e9d26
+Revises: 5c7d2e9b4a13
+Create Date: 2026-10-18 13:26:45.118032
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a41f7c3e9d26'
+down_revision = '5c7d2e9b4a13'
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+log = logging.getLogger('alembic.env')
+
+# ``DatasetKeyword.MAX_LENGTH`` when this revision was written
+MAX_LENGTH = 128
+
+
+def upgrade():
+    dataset_keyword = op.create_table(
+        'dataset_keyword',
+        sa.Column('dataset_id', sa.String(length=128), nullable=False),
+        sa.Column('keyword', sa.String(length=MAX_LENGTH), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['dataset_id'], ['dataset.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('dataset_id', 'keyword')
+    )
+    op.create_index('ix_dataset_keyword_keyword', 'dataset_keyword', ['keyword', 'dataset_id'])
+
+    # Backfill from the space separated ``dataset.keywords`` column with the
+    # rules of ``DatasetKeyword.normalize``: duplicates which differ in case
+    # only are dropped (case-insensitive collations would not store both) and
+    # so are over-long keywords, which the application rejects
+    connection = op.get_bind()
+    rows = []
+    for dataset_id, keywords in connection.execute(sa.text("SELECT id, keywords FROM dataset")):
+        seen = set()
+        for keyword in (keywords or '').split():
+            if len(keyword) > MAX_LENGTH:
+                log.warning("Keyword '%s...' of dataset %s is longer than %d characters, skipped.",
+                            keyword[:16], dataset_id, MAX_LENGTH)
+            elif keyword.casefold() not in seen:
+                seen.add(keyword.casefold())
+                rows.append({'dataset_id': dataset_id, 'keyword': keyword, 'position': len(seen) - 1})
+    if rows:
+        op.bulk_insert(dataset_keyword, rows)
+
+
+def downgrade():
+    op.drop_index('ix_dataset_keyword_keyword', table_name='dataset_keyword')
+    op.drop_table('dataset_keyword')
@@ -0,0 +1,33 @@
+"""materialized dataset leaderboards and recent stars index
+
+Revision ID: b8d41f6a2c93
+Revises: e7b3a9d05c62
+Create Date: 2026-10-18 18:02:37.541906
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'b8d41f6a2c93'
+down_revision = 'e7b3a9d05c62'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'dataset_ranking',
+        sa.Column('board', sa.String(length=16), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('dataset_id', sa.String(length=128), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('computed', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['dataset_id'], ['dataset.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('board', 'position')
+    )
+    op.create_index('ix_user_star_dataset_stared_time', 'user_star_dataset', ['stared_time'])
+
+
+def downgrade():
+    op.drop_index('ix_user_star_dataset_stared_time', table_name='user_star_dataset')
+    op.drop_table('dataset_ranking')
@@ -0,0 +1,47 @@
+"""composite indexes of filtered and sorted dataset listings
+
+Revision ID: c2e8b5d61f47
+Revises: a41f7c3e9d26
+Create Date: 2026-10-18 14:08:52.730164
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c2e8b5d61f47'
+down_revision = 'a41f7c3e9d26'
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index('ix_dataset_deleted_created', 'dataset', ['deleted', 'created'], unique=False)
+    op.create_index('ix_dataset_deleted_stars', 'dataset', ['deleted', 'stars'], unique=False)
+    op.create_index(
+        'ix_dataset_deleted_category_created', 'dataset', ['deleted', 'category', 'created'], unique=False
+    )
+    op.create_index(
+        'ix_dataset_deleted_access_level_created', 'dataset', ['deleted', 'access_level', 'created'], unique=False
+    )
+    op.create_index(
+        'ix_dataset_deleted_license_created', 'dataset', ['deleted', 'license_id', 'created'], unique=False
+    )
+    op.create_index(
+        'ix_dataset_deleted_organization_created', 'dataset', ['deleted', 'organization_id', 'created'], unique=False
+    )
+    op.create_index(
+        'ix_dataset_deleted_publisher_created', 'dataset', ['deleted', 'publisher_id', 'created'], unique=False
+    )
+    op.create_index(
+        'ix_dataset_deleted_language_created', 'dataset', ['deleted', 'language', 'created'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_dataset_deleted_language_created', table_name='dataset')
+    op.drop_index('ix_dataset_deleted_publisher_created', table_name='dataset')
+    op.drop_index('ix_dataset_deleted_organization_created', table_name='dataset')
+    op.drop_index('ix_dataset_deleted_license_created', table_name='dataset')
+    op.drop_index('ix_dataset_deleted_access_level_created', table_name='dataset')
+    op.drop_index('ix_dataset_deleted_category_created', table_name='dataset')
+    op.drop_index('ix_dataset_deleted_stars', table_name='dataset')
+    op.drop_index('ix_dataset_deleted_created', table_name='dataset')
@@ -0,0 +1,23 @@
+"""indexes of expired OAuth2 tokens and grants cleanup
+
+Revision ID: e7b3a9d05c62
+Revises: c2e8b5d61f47
+Create Date: 2026-10-18 16:21:04.318825
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3a9d05c62'
+down_revision = 'c2e8b5d61f47'
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index(op.f('ix_oauth2_grant_expires'), 'oauth2_grant', ['expires'], unique=False)
+    op.create_index(op.f('ix_oauth2_token_expires'), 'oauth2_token', ['expires'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_oauth2_token_expires'), table_name='oauth2_token')
+    op.drop_index(op.f('ix_oauth2_grant_expires'), table_name='oauth2_grant')
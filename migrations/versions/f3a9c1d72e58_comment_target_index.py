@@ -0,0 +1,23 @@
+"""index of comments of a dataset or story
+
+Revision ID: f3a9c1d72e58
+Revises: b8d41f6a2c93
+Create Date: 2026-10-18 18:47:12.906215
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c1d72e58'
+down_revision = 'b8d41f6a2c93'
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index(
+        'ix_comment_target_created', 'comment', ['target_type', 'target_id', 'created', 'id'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_comment_target_created', table_name='comment')
@@ -6,7 +6,7 @@ Application related tasks for Invoke.
 from invoke import Collection
 
 from catalog.config import BaseConfig
-from . import deps, env, db, run, users, swagger
+from . import deps, env, db, run, users, auth, datasets, swagger, benchmarks
 
 namespace = Collection(
     deps,
@@ -14,7 +14,10 @@ namespace = Collection(
     db,
     run,
     users,
+    auth,
+    datasets,
     swagger,
+    benchmarks,
 )
 
 namespace.configure({
@@ -0,0 +1,77 @@
+# encoding: utf-8
+"""
+Application Auth related tasks for Invoke.
+"""
+
+from ._utils import app_context_task
+
+
+@app_context_task(
+    help={
+        'retention_days': "Keep expired rows for this number of days (OAUTH2_GC_RETENTION_DAYS by default)",
+        'chunk_size': "Maximum number of rows deleted per transaction (OAUTH2_GC_CHUNK_SIZE by default)",
+    }
+)
+def purge_expired_tokens(context, retention_days=None, chunk_size=None):
+    """
+    Delete expired OAuth2 tokens and grants in batches.
+    """
+    from datetime import timedelta
+    from catalog.modules.auth.cleanup import purge_expired_tokens as purge
+
+    retention = None
+    if retention_days is not None:
+        retention = timedelta(days=int(retention_days))
+    if chunk_size is not None:
+        chunk_size = int(chunk_size)
+
+    reclaimed = purge(retention=retention, chunk_size=chunk_size)
+    for table_name, count in sorted(reclaimed.items()):
+        print("%s: %d expired rows purged" % (table_name, count))
+
+
+@app_context_task(
+    help={
+        'logins': "Total number of password verifications",
+        'concurrency': "Number of concurrent request threads",
+        'rounds': "bcrypt cost (PASSWORD_HASH_ROUNDS by default)",
+        'workers': "Hashing thread pool size (PASSWORD_HASH_WORKERS by default)",
+    }
+)
+def benchmark_login(context, logins=200, concurrency=16, rounds=None, workers=None):
+    """
+    Measure password login throughput under concurrent load.
+    """
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from catalog.extensions import password_hasher
+
+    password_hasher.configure(
+        rounds=int(rounds) if rounds is not None else None,
+        workers=int(workers) if workers is not None else None,
+    )
+    password_hash = password_hasher.hash('benchmark-password')
+
+    def login(index):
+        started = time.time()
+        password = 'benchmark-password' if index % 2 else 'wrong-password'
+        password_hasher.verify_and_update(password, password_hash)
+        return time.time() - started
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=int(concurrency)) as request_threads:
+        latencies = sorted(request_threads.map(login, range(int(logins))))
+    elapsed = time.time() - started
+
+    print(
+        "%d logins, %d request threads, %d hashing workers, bcrypt cost %d" % (
+            len(latencies), int(concurrency), password_hasher.workers, password_hasher.rounds
+        )
+    )
+    print("throughput: %.1f logins/s" % (len(latencies) / elapsed))
+    for percentile in (50, 95, 99):
+        print(
+            "p%d latency: %.1f ms" % (
+                percentile, 1000 * latencies[min(len(latencies) - 1, len(latencies) * percentile // 100)]
+            )
+        )
@@ -0,0 +1,732 @@
+# encoding: utf-8
+"""
+Application benchmarks for Invoke.
+
+* ``app.benchmarks.micro`` times hot code paths, pytest-benchmark style;
+* ``app.benchmarks.load`` seeds a scratch database with synthetic data and
+  drives concurrent requests to the endpoints of the ``datasets``,
+  ``stories``, ``comments``, ``users`` and ``auth`` modules through the Flask
+  test client, the development server or the production one, e.g. compare
+  ``--target=werkzeug`` and ``--target=gunicorn`` results;
+* ``app.benchmarks.compare`` reports regressions between two saved results.
+
+Results are saved as JSON with ``--output``, e.g.::
+
+    invoke app.benchmarks.load --output=baseline.json
+    # ... changes ...
+    invoke app.benchmarks.load --output=current.json
+    invoke app.benchmarks.compare baseline.json current.json
+"""
+import json
+import logging
+import math
+import os
+import platform
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    from invoke import ctask as task
+except ImportError:  # Invoke 0.13 renamed ctask to task
+    from invoke import task
+from invoke.exceptions import Exit
+
+from ._utils import app_context_task
+
+log = logging.getLogger(__name__)
+
+BENCHMARK_CLIENT_ID = 'benchmark'
+BENCHMARK_CLIENT_SECRET = 'benchmark'
+
+SERVER_TIMING_SQL = re.compile(r'sql;dur=[\d.]+;desc="(\d+) queries"')
+
+
+def _percentile(sorted_values, percent):
+    # Nearest rank
+    index = max(0, int(math.ceil(percent / 100.0 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def _statistics(timings):
+    """
+    Statistics of ``timings`` in seconds, in milliseconds.
+    """
+    timings = sorted(timings)
+    count = len(timings)
+    mean = sum(timings) / count
+    stddev = math.sqrt(sum((timing - mean) ** 2 for timing in timings) / (count - 1)) if count > 1 else 0.0
+    return {
+        'rounds': count,
+        'min_ms': timings[0] * 1000,
+        'max_ms': timings[-1] * 1000,
+        'mean_ms': mean * 1000,
+        'stddev_ms': stddev * 1000,
+        'p50_ms': _percentile(timings, 50) * 1000,
+        'p95_ms': _percentile(timings, 95) * 1000,
+        'p99_ms': _percentile(timings, 99) * 1000,
+    }
+
+
+def _metadata(**kwargs):
+    metadata = {
+        'created': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+    metadata.update(kwargs)
+    return metadata
+
+
+def _save(results, output):
+    if output:
+        with open(output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+        log.info("Results are saved to %s", output)
+
+
+def _example_datasets(count):
+    """
+    Transient datasets with everything ``DatasetSchema`` dumps, no database
+    is involved.
+    """
+    from catalog.modules.datasets.models import Dataset, DatasetKeyword, License, Organization, \
+        Publisher, Reference, Source
+    from catalog.modules.users.models import User
+
+    timestamps = {'created': datetime(2020, 1, 1), 'updated': datetime(2020, 1, 2)}
+    contributor = User(id=1, username='contributor', email='contributor@example.com', **timestamps)
+    license = License(id=1, name='CC-BY-4.0', url='https://creativecommons.org/licenses/by/4.0/', **timestamps)
+    organization = Organization(id=1, name='Example organization', **timestamps)
+    publisher = Publisher(id='publisher', name='Example publisher', **timestamps)
+    return [
+        Dataset(
+            id='dataset-%d' % index,
+            name='dataset_%d' % index,
+            title='Dataset %d' % index,
+            description='Description of dataset %d' % index,
+            homepage='http://example.com/dataset/%d' % index,
+            access_level='PUBLIC',
+            data_quality=True,
+            category='Economy',
+            stars=index,
+            contributor=contributor,
+            license=license,
+            organization=organization,
+            publisher=publisher,
+            sources=[
+                Source(id=index * 2 + i, title='Source %d' % i, url='http://example.com/source', **timestamps)
+                for i in range(2)
+            ],
+            references=[
+                Reference(id=index, title='Reference', url='http://example.com/reference', **timestamps)
+            ],
+            keyword_entries=[
+                DatasetKeyword(keyword=keyword, position=position)
+                for position, keyword in enumerate(('GDP', 'Economy', 'World'))
+            ],
+            **timestamps
+        )
+        for index in range(count)
+    ]
+
+
+@app_context_task(
+    help={
+        'count': "Number of datasets dumped per run",
+        'repeat': "Number of runs, the best one is reported",
+    }
+)
+def serializers(context, count=100, repeat=20):
+    """
+    Compare marshmallow and compiled dumps of a dataset listing.
+    """
+    import timeit
+
+    from catalog.extensions.flask_restplus import compiler
+    from catalog.modules.datasets.schemas import DatasetSchema
+
+    datasets = _example_datasets(int(count))
+    schema = DatasetSchema(many=True)
+    assert compiler.dump(schema, datasets) == schema.dump(datasets).data
+
+    results = {
+        'marshmallow': lambda: schema.dump(datasets),
+        'compiled': lambda: compiler.dump(schema, datasets),
+    }
+    timings = {
+        name: min(timeit.repeat(function, number=1, repeat=int(repeat)))
+        for name, function in results.items()
+    }
+    for name, timing in timings.items():
+        print("%-12s %8.2f ms  %8.0f datasets/s" % (name, timing * 1000, int(count) / timing))
+    print("Speedup: %.1fx" % (timings['marshmallow'] / timings['compiled']))
+
+
+##########################
+# Microbenchmarks
+
+def _microbenchmarks(app):
+    """
+    Functions timed by ``micro`` by name, they are called without arguments
+    within the application context.
+    """
+    from datetime import timedelta
+
+    from catalog.extensions import metrics, oauth2, rate_limiter
+    from catalog.extensions.flask_restplus import compiler
+    from catalog.extensions.flask_restplus.namespace import Namespace
+    from catalog.modules.datasets.parameters import ListDatasetsParameters
+    from catalog.modules.datasets.schemas import DatasetSchema
+
+    datasets = _example_datasets(20)
+    schema = DatasetSchema(many=True)
+    parameters = ListDatasetsParameters()
+    parser = Namespace.WEBARGS_PARSER
+    token_cache = oauth2.token_cache
+    token_cache.set('benchmark', datetime.utcnow() + timedelta(hours=1), user_id=1, scopes=['datasets:read'])
+
+    def parse_list_datasets_parameters():
+        with app.test_request_context('/api/v1/datasets/?limit=20&sort=-stars&category=Economy'):
+            parser.parse(parameters, locations=('query',))
+
+    return {
+        'dump.datasets.marshmallow': lambda: schema.dump(datasets),
+        'dump.datasets.compiled': lambda: compiler.dump(schema, datasets),
+        'parse.list_datasets': parse_list_datasets_parameters,
+        'oauth2.token_cache.get': lambda: token_cache.get('benchmark'),
+        'rate_limiter.check': lambda: rate_limiter.check({'user': 1}, 'benchmark', '1000000/second'),
+        'metrics.expose': metrics.expose,
+    }
+
+
+def _measure(function, rounds, min_round_time=0.001):
+    """
+    Per call timings of ``rounds`` rounds, the calls per round are
+    calibrated to last at least ``min_round_time`` seconds.
+    """
+    import timeit
+
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_round_time:
+        number *= 10
+    return [timing / number for timing in timer.repeat(repeat=rounds, number=number)]
+
+
+@app_context_task(
+    help={
+        'rounds': "Number of timed rounds of every benchmark",
+        'filter': "Only run benchmarks whose names contain this text",
+        'output': "Path of a JSON file the results are saved to",
+    }
+)
+def micro(context, rounds=50, filter=None, output=None):
+    """
+    Time hot code paths: serialization, parsing, token cache and rate limits.
+    """
+    # pylint: disable=redefined-builtin
+    from flask import current_app
+
+    benchmarks = _microbenchmarks(current_app)
+    results = {}
+    for name, function in sorted(benchmarks.items()):
+        if filter and filter not in name:
+            continue
+        statistics = _statistics(_measure(function, int(rounds)))
+        statistics['ops'] = 1000 / statistics['mean_ms']
+        results[name] = statistics
+        print("%-30s %10.4f ms  (min %.4f, stddev %.4f)  %10.0f ops/s" % (
+            name, statistics['p50_ms'], statistics['min_ms'], statistics['stddev_ms'], statistics['ops']
+        ))
+    _save({'meta': _metadata(benchmark='micro', rounds=int(rounds)), 'micro': results}, output)
+
+
+##########################
+# Load tests
+
+class Scenario(namedtuple('Scenario', 'name method path scopes data')):
+    """
+    A request of an endpoint. ``path`` and ``data`` values are formatted
+    with random IDs of synthetic rows: ``{dataset}``, ``{datasets}`` (ten
+    comma separated ones), ``{story}``, ``{comment}``, ``{word}``,
+    ``{unique}`` and the ``{user}`` ID and ``{username}`` of the requesting
+    user.
+    """
+
+    def __new__(cls, name, method, path, scopes=(), data=None):
+        return super(Scenario, cls).__new__(cls, name, method, path, tuple(scopes), data)
+
+    @property
+    def module(self):
+        return self.name.split('.', 1)[0]
+
+
+# Endpoints which only respond with errors, e.g. ``/users/datasets``, are
+# left out
+SCENARIOS = (
+    Scenario('datasets.list', 'GET', '/api/v1/datasets/?limit=20', ['datasets:read']),
+    Scenario('datasets.list_sorted', 'GET', '/api/v1/datasets/?limit=20&sort=-stars', ['datasets:read']),
+    Scenario('datasets.get', 'GET', '/api/v1/datasets/{dataset}', ['datasets:read']),
+    Scenario('datasets.batch_get', 'GET', '/api/v1/datasets/?ids={datasets}', ['datasets:read']),
+    Scenario('datasets.search', 'GET', '/api/v1/datasets/search?q={word}', ['datasets:read']),
+    Scenario('datasets.top', 'GET', '/api/v1/datasets/top', ['datasets:read']),
+    Scenario('datasets.keywords', 'GET', '/api/v1/keywords/', ['datasets:read']),
+    Scenario('datasets.stories', 'GET', '/api/v1/datasets/{dataset}/stories', ['datasets:read']),
+    Scenario('datasets.create', 'POST', '/api/v1/datasets/', ['datasets:write'], {
+        'name': 'load_{unique}',
+        'title': 'Load {unique}',
+        'description': '{word} {word} {word}',
+        'homepage': 'http://example.com/load/{unique}',
+        'keywords': '{word}',
+        'access_level': 'PUBLIC',
+        'data_quality': 'true',
+        'category': 'Economy',
+        'license_name': 'load-license',
+    }),
+    Scenario('datasets.star', 'PATCH', '/api/v1/datasets/{dataset}/stars', ['datasets:write']),
+    Scenario('stories.list', 'GET', '/api/v1/stories/?limit=20', ['stories:read']),
+    Scenario('stories.search', 'GET', '/api/v1/stories/search?q={word}', ['stories:read']),
+    Scenario('comments.dataset', 'GET', '/api/v1/datasets/{dataset}/comments?limit=20', ['datasets:read']),
+    Scenario('comments.story', 'GET', '/api/v1/stories/{story}/comments?limit=20', ['stories:read']),
+    Scenario('comments.get', 'GET', '/api/v1/comments/{comment}', ['comments:read']),
+    Scenario('comments.create', 'POST', '/api/v1/datasets/{dataset}/comments', ['datasets:write'], {
+        'comment': '{word} {word} {word}',
+    }),
+    Scenario('users.me', 'GET', '/api/v1/users/me', ['users:read']),
+    Scenario('users.get', 'GET', '/api/v1/users/{user}', ['users:read']),
+    Scenario('auth.clients', 'GET', '/api/v1/auth/oauth2_clients/?user_id={user}', ['auth:read']),
+    Scenario('auth.token', 'POST', '/auth/oauth2/token', data={
+        'grant_type': 'password',
+        'username': '{username}',
+        'password': 'password',
+        'client_id': BENCHMARK_CLIENT_ID,
+        'client_secret': BENCHMARK_CLIENT_SECRET,
+    }),
+)
+
+
+class _Formatter(object):
+    """
+    Random values of scenario placeholders, one instance per worker thread.
+    """
+
+    def __init__(self, data, tokens, seed):
+        from tasks.app.synthetic import WORDS
+
+        self.data = data
+        self.tokens = tokens
+        self.words = WORDS
+        self.rng = random.Random(seed)
+        self._unique = 0
+
+    def values(self):
+        rng = self.rng
+        data = self.data
+        user_index = rng.randrange(len(data.users))
+        self._unique += 1
+        return {
+            'dataset': rng.choice(data.datasets),
+            'datasets': ','.join(rng.choice(data.datasets) for _ in range(10)),
+            'story': rng.choice(data.stories),
+            'comment': rng.choice(data.comments),
+            'word': rng.choice(self.words),
+            'unique': '%d_%d_%d' % (os.getpid(), id(self), self._unique),
+            'user': data.users[user_index],
+            'username': data.usernames[user_index],
+            'token': self.tokens[data.users[user_index]],
+        }
+
+    def request(self, scenario):
+        """
+        Returns:
+            (method, path, headers, form) - a request of ``scenario``.
+        """
+        values = self.values()
+        path = scenario.path.format(**values)
+        form = None
+        if scenario.data is not None:
+            form = {key: value.format(**values) for key, value in scenario.data.items()}
+        headers = {}
+        if scenario.scopes:
+            headers['Authorization'] = 'Bearer %s' % values['token']
+        return scenario.method, path, headers, form
+
+
+def _seed(data_volumes, seed):
+    """
+    Seed synthetic data, a benchmark OAuth2 client and a token with all the
+    scopes for every synthetic user.
+    """
+    import uuid
+    from datetime import timedelta
+
+    from catalog.extensions import api, db
+    from catalog.modules.auth.models import OAuth2Client, OAuth2Token
+    from catalog.modules.datasets.models import License
+    from tasks.app import synthetic
+
+    data = synthetic.generate(seed=seed, **data_volumes)
+    scopes = sorted(api.api_v1.authorizations['oauth2_password']['scopes'])
+    tokens = {}
+    with db.session.begin():
+        db.session.add(License(name='load-license'))
+        db.session.add(OAuth2Client(
+            client_id=BENCHMARK_CLIENT_ID,
+            client_secret=BENCHMARK_CLIENT_SECRET,
+            client_type=OAuth2Client.ClientTypes.confidential,
+            user_id=data.users[0],
+            redirect_uris=[],
+            default_scopes=scopes,
+        ))
+        for user_id in data.users:
+            tokens[user_id] = uuid.uuid4().hex
+            db.session.add(OAuth2Token(
+                client_id=BENCHMARK_CLIENT_ID,
+                user_id=user_id,
+                token_type=OAuth2Token.TokenTypes.Bearer,
+                access_token=tokens[user_id],
+                expires=datetime.utcnow() + timedelta(days=1),
+                scopes=scopes,
+            ))
+    return data, tokens
+
+
+class _TestClientTarget(object):
+    """
+    Requests sent through the Flask test client, no network is involved.
+    """
+
+    name = 'client'
+
+    def __init__(self, app):
+        self.app = app
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def send(self, method, path, headers, form):
+        response = self.app.test_client().open(path, method=method, headers=headers, data=form)
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+
+class _WSGIServerTarget(object):
+    """
+    Requests sent over HTTP to a threaded werkzeug WSGI server run in the
+    background.
+    """
+
+    name = 'werkzeug'
+
+    def __init__(self, app):
+        self.app = app
+        self.server = None
+        self.url = None
+        self._sessions = threading.local()
+
+    def __enter__(self):
+        from werkzeug.serving import make_server
+
+        # Access logs of every request would slow the server down
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.server = make_server('127.0.0.1', 0, self.app, threaded=True)
+        self.url = 'http://127.0.0.1:%d' % self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+
+    def send(self, method, path, headers, form):
+        import requests
+
+        session = getattr(self._sessions, 'session', None)
+        if session is None:
+            session = self._sessions.session = requests.Session()
+        response = session.request(method, self.url + path, headers=headers, data=form)
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+
+class _PreforkServerTarget(_WSGIServerTarget):
+    """
+    Requests sent over HTTP to gunicorn workers pre-forked from the benchmark
+    process, the way ``app.run.serve`` serves a preloaded app.
+    """
+
+    name = 'gunicorn'
+
+    def __init__(self, app, workers=None, threads=None):
+        super(_PreforkServerTarget, self).__init__(app)
+        self.workers = workers
+        self.threads = threads
+        self.process = None
+
+    def __enter__(self):
+        import multiprocessing
+        import socket
+
+        import requests
+
+        from catalog.extensions import server
+
+        # gunicorn does not report the port it binds, a free one is picked
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        options = server.options(
+            self.app, bind='127.0.0.1:%d' % port, workers=self.workers, threads=self.threads, preload_app=True
+        )
+        options.pop('pidfile', None)
+        self.process = multiprocessing.get_context('fork').Process(
+            target=server.serve, args=(lambda: self.app, options)
+        )
+        self.process.start()
+        self.url = 'http://127.0.0.1:%d' % port
+
+        deadline = time.time() + 30
+        while True:
+            try:
+                requests.get(self.url + '/')
+            except requests.ConnectionError:
+                if time.time() > deadline or not self.process.is_alive():
+                    self.__exit__()
+                    raise Exit("gunicorn has not started.")
+                time.sleep(0.1)
+            else:
+                return self
+
+    def __exit__(self, *exc_info):
+        # Workers finish their requests and stop
+        self.process.terminate()
+        self.process.join()
+
+
+TARGETS = {
+    'client': _TestClientTarget,
+    'werkzeug': _WSGIServerTarget,
+    'gunicorn': _PreforkServerTarget,
+}
+
+
+def _run_scenario(target, scenario, formatters, requests_count, concurrency):
+    """
+    Send ``requests_count`` requests of ``scenario`` from ``concurrency``
+    workers.
+
+    Returns:
+        result (dict) - latency statistics, errors, throughput and SQL
+        queries per request.
+    """
+    def worker(index):
+        formatter = formatters[index]
+        timings, queries, errors = [], [], 0
+        for _ in range(requests_count // concurrency + (index < requests_count % concurrency)):
+            method, path, headers, form = formatter.request(scenario)
+            started = time.perf_counter()
+            status, server_timing = target.send(method, path, headers, form)
+            timings.append(time.perf_counter() - started)
+            if status >= 400:
+                errors += 1
+            match = SERVER_TIMING_SQL.search(server_timing)
+            if match:
+                queries.append(int(match.group(1)))
+        return timings, queries, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    timings = [timing for outcome in outcomes for timing in outcome[0]]
+    queries = [count for outcome in outcomes for count in outcome[1]]
+    result = _statistics(timings)
+    result.update(
+        method=scenario.method,
+        path=scenario.path,
+        errors=sum(outcome[2] for outcome in outcomes),
+        rps=len(timings) / elapsed,
+        queries_per_request=sum(queries) / float(len(queries)) if queries else None,
+    )
+    return result
+
+
+def _load_app(flask_config, database_uri, cache):
+    from catalog import create_app
+    from catalog.extensions import profiler, rate_limiter, response_cache
+
+    app = create_app(flask_config_name=flask_config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    # Query counts are read from ``Server-Timing`` headers, profiles of
+    # single requests are not logged
+    profiler.enabled = True
+    logging.getLogger('catalog.extensions.profiling').setLevel(logging.WARNING)
+    rate_limiter.enabled = False
+    if not cache:
+        app.config['RESPONSE_CACHE_TYPE'] = 'null'
+        response_cache.init_app(app)
+    return app
+
+
+@task(
+    help={
+        'target': "'client' (Flask test client), 'werkzeug' (threaded development server) "
+                  "or 'gunicorn' (pre-forked production server)",
+        'workers': "Number of gunicorn worker processes (SERVER_WORKERS)",
+        'threads': "Number of threads of every gunicorn worker (SERVER_THREADS)",
+        'requests': "Number of requests of every endpoint",
+        'concurrency': "Number of concurrent clients",
+        'modules': "Comma separated modules of the benchmarked endpoints",
+        'endpoints': "Comma separated names of the benchmarked endpoints, e.g. datasets.get",
+        'users': "Number of synthetic users",
+        'datasets': "Number of synthetic datasets",
+        'stories': "Number of synthetic stories",
+        'comments': "Number of synthetic comments",
+        'stars': "Number of synthetic dataset stars",
+        'seed': "Seed of the synthetic data and of the requests",
+        'database_uri': "Database of the benchmark, a scratch SQLite file by default",
+        'flask_config': "Flask configuration name, e.g. production",
+        'cache': "Serve repeated reads from the response cache",
+        'output': "Path of a JSON file the results are saved to",
+    }
+)
+def load(
+        context,
+        target='client',
+        workers=None,
+        threads=None,
+        requests=200,
+        concurrency=4,
+        modules='datasets,stories,comments,users,auth',
+        endpoints=None,
+        users=50,
+        datasets=500,
+        stories=50,
+        comments=1000,
+        stars=1000,
+        seed=0,
+        database_uri=None,
+        flask_config=None,
+        cache=True,
+        output=None,
+):
+    """
+    Load test API endpoints and report latency percentiles and SQL queries
+    per request.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals,redefined-outer-name
+    from catalog.extensions import db
+
+    if target not in TARGETS:
+        raise Exit("Unknown target %r, expected one of: %s" % (target, ', '.join(sorted(TARGETS))))
+    requests, concurrency, seed = int(requests), int(concurrency), int(seed)
+    modules = set(modules.split(','))
+    names = set(endpoints.split(',')) if endpoints else None
+    scenarios = [
+        scenario for scenario in SCENARIOS
+        if (scenario.name in names if names else scenario.module in modules)
+    ]
+    volumes = {
+        'users': int(users), 'datasets': int(datasets), 'stories': int(stories),
+        'comments': int(comments), 'stars': int(stars),
+    }
+
+    scratch = None
+    if database_uri is None:
+        scratch = tempfile.NamedTemporaryFile(prefix='catalog-benchmark-', suffix='.db', delete=False)
+        scratch.close()
+        database_uri = 'sqlite:///%s' % scratch.name
+    app = _load_app(flask_config, database_uri, cache)
+
+    results = {}
+    try:
+        with app.app_context():
+            db.create_all()
+            log.info("Seeding synthetic data: %s", volumes)
+            data, tokens = _seed(volumes, seed)
+
+        formatters = [_Formatter(data, tokens, seed=seed * 1000 + index) for index in range(concurrency)]
+        if target == _PreforkServerTarget.name:
+            load_target = _PreforkServerTarget(
+                app,
+                workers=None if workers is None else int(workers),
+                threads=None if threads is None else int(threads),
+            )
+        else:
+            load_target = TARGETS[target](app)
+        with load_target:
+            for scenario in scenarios:
+                # Warm up caches and compiled schemas
+                _run_scenario(load_target, scenario, formatters, concurrency, concurrency)
+                result = results[scenario.name] = _run_scenario(
+                    load_target, scenario, formatters, requests, concurrency
+                )
+                print("%-22s %8.2f %8.2f %8.2f ms  %8.1f req/s  %6s queries  %d errors" % (
+                    scenario.name, result['p50_ms'], result['p95_ms'], result['p99_ms'], result['rps'],
+                    '-' if result['queries_per_request'] is None else '%.1f' % result['queries_per_request'],
+                    result['errors'],
+                ))
+    finally:
+        if scratch is not None:
+            os.unlink(scratch.name)
+
+    _save({
+        'meta': _metadata(
+            benchmark='load', target=target, workers=workers, threads=threads,
+            requests=requests, concurrency=concurrency,
+            seed=seed, volumes=volumes, cache=bool(cache), database=database_uri.split(':', 1)[0],
+        ),
+        'endpoints': results,
+    }, output)
+
+
+##########################
+# Regressions
+
+# Compared statistics, lower is better
+COMPARED = {
+    'endpoints': ('p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'),
+    'micro': ('p50_ms',),
+}
+
+
+@task(
+    help={
+        'baseline': "Path of the baseline JSON results",
+        'current': "Path of the current JSON results",
+        'threshold': "Relative increase (in percents) reported as a regression",
+    }
+)
+def compare(context, baseline, current, threshold=10.0):
+    """
+    Compare two saved results and fail on regressions.
+    """
+    with open(baseline) as baseline_file:
+        baseline_results = json.load(baseline_file)
+    with open(current) as current_file:
+        current_results = json.load(current_file)
+
+    regressions = []
+    for section, statistics in sorted(COMPARED.items()):
+        before, after = baseline_results.get(section, {}), current_results.get(section, {})
+        for name in sorted(set(before) & set(after)):
+            for statistic in statistics:
+                old, new = before[name].get(statistic), after[name].get(statistic)
+                if old is None or new is None:
+                    continue
+                change = (new - old) / old * 100 if old else (0.0 if new == old else float('inf'))
+                regressed = change > float(threshold)
+                if regressed:
+                    regressions.append((name, statistic))
+                print("%-30s %-20s %10.3f -> %10.3f  %+7.1f%%%s" % (
+                    name, statistic, old, new, change, '  REGRESSION' if regressed else ''
+                ))
+    if regressions:
+        raise Exit("%d regression(s) over %s%%" % (len(regressions), threshold), code=1)
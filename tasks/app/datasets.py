@@ -0,0 +1,87 @@
+# encoding: utf-8
+"""
+Application Datasets management related tasks for Invoke.
+"""
+
+from ._utils import app_context_task
+
+
+@app_context_task(
+    help={
+        'path': "A YAML, JSON or CSV file of datasets",
+        'format': "yaml, json or csv (guessed from the file extension by default)",
+        'username': "Contributor of the imported datasets",
+        'chunk_size': "Number of datasets stored per transaction",
+    }
+)
+def bulk_import(context, path, format=None, username=None, chunk_size=500):
+    """
+    Import datasets from a file.
+    """
+    # pylint: disable=redefined-builtin
+    from catalog.modules.datasets.importer import DatasetImporter, detect_format, read_records
+    from catalog.modules.users.models import User
+
+    import_format = format or detect_format(filename=path)
+    if import_format is None:
+        raise Exception("Unknown format of '%s', use --format option." % path)
+
+    contributor_id = None
+    if username is not None:
+        contributor_id = User.get(username=username).id
+
+    with open(path) as data_file:
+        report = DatasetImporter(
+            contributor_id=contributor_id,
+            chunk_size=int(chunk_size)
+        ).run(read_records(data_file, import_format))
+
+    for error in report['errors']:
+        print("Row %(row)s (%(name)s): %(message)s" % error)
+    print("%d datasets imported, %d records failed" % (report['created'], report['failed']))
+
+
+@app_context_task(
+    help={
+        'path': "Output file (stdout by default)",
+        'format': "ndjson or csv",
+        'batch_size': "Number of datasets read from the database at once",
+    }
+)
+def export(context, path=None, format='ndjson', batch_size=1000):
+    """
+    Export all datasets.
+    """
+    # pylint: disable=redefined-builtin
+    import sys
+    from catalog.modules.datasets import exporter
+
+    output = open(path, 'w') if path else sys.stdout
+    try:
+        for chunk in exporter.export(format, batch_size=int(batch_size)):
+            output.write(chunk)
+    finally:
+        if path:
+            output.close()
+
+
+@app_context_task
+def recount_stars(context):
+    """
+    Recompute star counters of datasets and stories, e.g. after a crash with
+    unflushed write-behind counters.
+    """
+    from catalog.modules.users.models import UserStarDataset, UserStarStory
+
+    for star_model in (UserStarDataset, UserStarStory):
+        star_model.counter.recount()
+
+
+@app_context_task
+def refresh_leaderboards(context):
+    """
+    Recompute top and trending datasets.
+    """
+    from catalog.modules.datasets.leaderboard import leaderboard
+
+    leaderboard.refresh()
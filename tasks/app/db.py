@@ -301,3 +301,114 @@ def init_dev_data(context, upgrade_db=True, skip_on_failure=False):
             log.info("Initializing development data step is skipped.")
     else:
         log.info("Fixtures have been successfully applied.")
+
+
+@app_context_task(
+    help={
+        'dry_run': "Only report datasets and stories with drifted counters",
+    }
+)
+def reconcile_counters(context, dry_run=False):
+    """
+    Backfill/reconcile denormalized dataset.story_count and story.dataset_count
+    counters with the actual dataset-story links.
+    """
+    from sqlalchemy import func, select
+
+    from catalog.extensions import db
+    from catalog.modules.datasets.models import Dataset
+    from catalog.modules.stories.models import Story, StoryDatasetAssociation
+
+    counters = (
+        (Dataset, Dataset.story_count, StoryDatasetAssociation.dataset_id),
+        (Story, Story.dataset_count, StoryDatasetAssociation.story_id),
+    )
+    for model, counter, link_column in counters:
+        actual_count = select([func.count()]) \
+            .where(link_column == model.id) \
+            .correlate(model.__table__) \
+            .as_scalar()
+        drifted = model.query.filter(counter != actual_count)
+        log.info("%d %s row(s) have a drifted %s counter", drifted.count(), model.__name__, counter.key)
+        if dry_run:
+            continue
+        with db.session.begin():
+            updated = drifted.update({counter: actual_count}, synchronize_session=False)
+        log.info("%d %s row(s) reconciled", updated, model.__name__)
+
+
+@app_context_task
+def vacuum(context):
+    """
+    Compact the SQLite database and rebuild the full-text search indexes,
+    which refer to rows by their (renumbered by VACUUM) rowid.
+    """
+    from catalog.extensions import db
+    from catalog.extensions.search import FullTextIndex
+
+    if db.engine.dialect.name != 'sqlite':
+        log.info("VACUUM is only supported on SQLite, skipping.")
+        return
+
+    with db.engine.connect() as connection:
+        connection.execute('VACUUM')
+        with connection.begin():
+            for index in FullTextIndex.registry:
+                index.rebuild(connection)
+                log.info("Full-text index %s has been rebuilt", index.name)
+
+
+@app_context_task(
+    help={
+        'users': "Number of users",
+        'datasets': "Number of datasets",
+        'stories': "Number of stories",
+        'comments': "Number of comments on datasets and stories",
+        'stars': "Maximum number of dataset stars",
+        'story_stars': "Maximum number of story stars",
+        'follows': "Maximum number of following relationships",
+        'licenses': "Number of licenses",
+        'organizations': "Number of organizations",
+        'publishers': "Number of publishers",
+        'days': "Number of days the timestamps span",
+        'chunk_size': "Number of rows inserted per statement and transaction",
+        'seed': "Seed of the random generator, the same seed generates the same data",
+    }
+)
+def generate(
+        context,
+        users=1000,
+        datasets=10000,
+        stories=1000,
+        comments=20000,
+        stars=50000,
+        story_stars=5000,
+        follows=20000,
+        licenses=20,
+        organizations=200,
+        publishers=500,
+        days=365,
+        chunk_size=5000,
+        seed=0,
+):
+    """
+    Fill a database with synthetic data for scale testing, e.g.
+    ``--datasets=1000000 --stories=100000 --stars=10000000``.
+    """
+    # pylint: disable=too-many-arguments,unused-argument
+    import time
+
+    from tasks.app import synthetic
+
+    volumes = {
+        'users': users, 'datasets': datasets, 'stories': stories, 'comments': comments, 'stars': stars,
+        'story_stars': story_stars, 'follows': follows, 'licenses': licenses,
+        'organizations': organizations, 'publishers': publishers,
+    }
+    log.info("Generating synthetic data (seed %s): %s", seed, volumes)
+    started = time.time()
+    synthetic.generate(
+        days=int(days), chunk_size=int(chunk_size), seed=int(seed),
+        **{name: int(value) for name, value in volumes.items()}
+    )
+    log.info("Synthetic data has been generated in %.1fs.", time.time() - started)
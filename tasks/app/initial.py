@@ -4,15 +4,17 @@ This file contains initialization data for development usage only.
 
 You can execute this code via ``invoke app.db.init_dev_data``
 """
+import logging
 import os
-import yaml
 
 from catalog.extensions import db, api
 from catalog.modules.auth.models import OAuth2Client
-from catalog.modules.datasets.models import Dataset
+from catalog.modules.datasets.importer import DatasetImporter, read_records
 from catalog.modules.users.models import User
 from tasks.settings import Settings
 
+log = logging.getLogger(__name__)
+
 
 def init_users():
     with db.session.begin():
@@ -67,11 +69,10 @@ def init_auth(user):
 
 
 def init_datasets(user):
-    data_file = open(os.path.join(os.path.dirname(__file__), 'data/datasets.yml'))
-    datasets = yaml.load(data_file)['datasets']
-    with db.session.begin():
-        for data_desc in datasets:
-            Dataset.create(contributor=user, **data_desc)
+    with open(os.path.join(os.path.dirname(__file__), 'data/datasets.yml')) as data_file:
+        report = DatasetImporter(contributor_id=user.id).run(read_records(data_file, 'yaml'))
+    for error in report['errors']:
+        log.warning("Dataset #%(row)s (%(name)s) is not imported: %(message)s", error)
 
 
 def init():
@@ -87,4 +88,4 @@ def init():
 
     root_user, docs_user, regular_user = init_users()  # pylint: disable=unused-variable
     init_auth(docs_user)
-    # init_datasets(docs_user)
+    init_datasets(docs_user)
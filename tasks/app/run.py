@@ -16,6 +16,7 @@ try:
     from invoke import ctask as task
 except ImportError:  # Invoke 0.13 renamed ctask to task
     from invoke import task
+from invoke.exceptions import Exit
 
 
 @task(default=True)
@@ -62,3 +63,93 @@ def run(
         use_reloader = False
 
     app.run(host=host, port=port, debug=True, use_reloader=use_reloader)
+
+
+@task(
+    help={
+        'bind': "Address of the server, e.g. 0.0.0.0:4444 (SERVER_BIND)",
+        'workers': "Number of worker processes (SERVER_WORKERS)",
+        'threads': "Number of threads of every worker (SERVER_THREADS)",
+        'preload': "Create the app once in the master process (SERVER_PRELOAD)",
+        'pidfile': "Path of the master process ID file, see app.run.reload (SERVER_PIDFILE)",
+        'flask_config': "Flask configuration name, production by default",
+    }
+)
+def serve(
+        context,
+        bind=None,
+        workers=None,
+        threads=None,
+        preload=None,
+        pidfile=None,
+        flask_config='production',
+        install_dependencies=False,
+        upgrade_db=True
+):
+    """
+    Serve the app with pre-forked gunicorn workers in production.
+    """
+    # pylint: disable=too-many-arguments
+    if flask_config is not None:
+        os.environ['CATALOG_CONFIG'] = flask_config
+
+    if install_dependencies:
+        context.invoke_execute(context, 'app.deps.install')
+
+    from catalog import create_app
+    from catalog.extensions import server
+    app = create_app()
+
+    if upgrade_db:
+        from . import db as db_tasks
+        reload(db_tasks)
+
+        context.invoke_execute(context, 'app.db.upgrade', app=app)
+
+    options = server.options(
+        app,
+        bind=bind,
+        workers=None if workers is None else int(workers),
+        threads=None if threads is None else int(threads),
+        preload_app=preload,
+        pidfile=pidfile,
+    )
+    # Workers of an app which is not preloaded create their own one
+    server.serve((lambda: app) if options.get('preload_app') else create_app, options)
+
+
+@task(
+    name='reload',
+    help={
+        'pidfile': "Path of the master process ID file of app.run.serve",
+        'timeout': "Seconds to wait for the new master process",
+    }
+)
+def reload_server(context, pidfile, timeout=60):
+    """
+    Gracefully reload the code of a server started by app.run.serve.
+
+    A new master process is started with the new code, once it runs the old
+    master stops and its workers finish their requests.
+    """
+    import signal
+    import time
+
+    with open(pidfile) as pid_file:
+        old_pid = int(pid_file.read())
+    os.kill(old_pid, signal.SIGUSR2)
+
+    # The new master writes its pid to "<pidfile>.2" until the old one stops
+    deadline = time.time() + float(timeout)
+    while time.time() < deadline:
+        time.sleep(0.5)
+        try:
+            with open('%s.2' % pidfile) as pid_file:
+                new_pid = int(pid_file.read() or 0)
+        except (IOError, ValueError):
+            continue
+        if new_pid and new_pid != old_pid:
+            os.kill(old_pid, signal.SIGTERM)
+            print("Server %d has been replaced by %d." % (old_pid, new_pid))
+            return
+    raise Exit("A new master process has not started in %s seconds, server %d keeps running." % (timeout, old_pid))
@@ -0,0 +1,441 @@
+# encoding: utf-8
+"""
+Synthetic data generator
+------------------------
+
+Deterministic users, licenses, organizations, publishers, datasets (with
+keywords, sources and references), stories, comments, stars and followers
+for benchmarks and scale testing: the same ``seed`` and volumes generate the
+same rows, IDs included, so benchmark runs can be compared. Timestamps span
+the ``days`` before the current UTC day.
+
+Popularity follows power laws, as it does in real catalogs: a few datasets
+get most stars, story links and comments, a few users star, comment and
+follow the most, a few licenses and publishers cover most datasets, see
+``Popularity``.
+
+Rows are written by ``bulk_insert_mappings`` in chunks of ``chunk_size``,
+a transaction per chunk, and denormalized counters (``Dataset.stars``,
+``Dataset.story_count``, ``Story.stars``, ``Story.dataset_count``,
+``User.followers`` and ``User.following``) are computed along and written
+in bulk, so millions of rows never go through the ORM unit of work.
+"""
+import bisect
+import logging
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+log = logging.getLogger(__name__)
+
+WORDS = (
+    'population', 'income', 'energy', 'climate', 'health', 'education', 'trade', 'transport',
+    'housing', 'water', 'agriculture', 'employment', 'census', 'budget', 'crime', 'election',
+    'emission', 'forest', 'hospital', 'inflation', 'migration', 'mobility', 'pollution', 'poverty',
+    'railway', 'school', 'tourism', 'traffic', 'weather', 'wage', 'export', 'import',
+)
+CATEGORIES = ('Economy', 'Health', 'Education', 'Environment', 'Transport', 'Society', 'Science', 'Government')
+ACCESS_LEVELS = ('PUBLIC', 'PUBLIC', 'PUBLIC', 'RESTRICTED')
+FORMATS = (('CSV', 'text/csv'), ('JSON', 'application/json'), ('XLSX', 'application/vnd.ms-excel'),
+           ('XML', 'application/xml'), ('ZIP', 'application/zip'))
+
+# Password of every generated user
+PASSWORD = 'password'
+
+CHUNK_SIZE = 5000
+
+# Number of comment IDs kept in ``SyntheticData.comments``
+SAMPLE_SIZE = 10000
+
+# Share of comments on stories rather than datasets
+STORY_COMMENTS = 0.2
+
+
+class SyntheticData(object):
+    """
+    IDs of generated rows, only a sample of ``SAMPLE_SIZE`` comments.
+    """
+
+    def __init__(self):
+        self.users = []
+        self.usernames = []
+        self.datasets = []
+        self.stories = []
+        self.comments = []
+
+
+class Popularity(object):
+    """
+    Zipf distributed choices of ``items``: the item of rank ``n`` is chosen
+    ``1 / n ** exponent`` times as often as the most popular one. Ranks are
+    shuffled, so popularity does not follow the order of insertion.
+    """
+
+    def __init__(self, items, rng, exponent=1.0):
+        self.items = list(items)
+        self.rng = rng
+        rng.shuffle(self.items)
+        self._cumulative = []
+        total = 0.0
+        for rank in range(1, len(self.items) + 1):
+            total += rank ** -exponent
+            self._cumulative.append(total)
+        self._total = total
+
+    def __len__(self):
+        return len(self.items)
+
+    def choice(self):
+        index = bisect.bisect_right(self._cumulative, self.rng.random() * self._total)
+        return self.items[min(index, len(self.items) - 1)]
+
+    def sample(self, count):
+        """
+        ``count`` distinct items, the popular ones are more likely.
+        """
+        if count >= len(self.items):
+            return list(self.items)
+        if count > len(self.items) // 4:
+            # Rejection sampling would mostly hit the popular ones again
+            return self.rng.sample(self.items, count)
+        chosen = set()
+        while len(chosen) < count:
+            chosen.add(self.choice())
+        return sorted(chosen)
+
+    def quotas(self, total, limit):
+        """
+        Split ``total`` among items by popularity, no item gets over
+        ``limit``.
+
+        Returns:
+            quotas (list) - ``(item, quota)`` pairs of non-zero quotas.
+        """
+        counts = Counter(self.choice() for _ in range(total))
+        return [(item, min(counts[item], limit)) for item in self.items if counts[item]]
+
+
+def _identity(rng):
+    # Deterministic replacement of ``uuid.uuid4().hex``
+    return '%032x' % rng.getrandbits(128)
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(mappings):
+    """
+    Insert ``(model, rows)`` pairs of ``mappings`` in a transaction.
+    """
+    from catalog.extensions import db, response_cache
+
+    session = db.session()
+    with session.begin():
+        for model, rows in mappings:
+            if rows:
+                session.bulk_insert_mappings(model, rows)
+        # Bulk inserts skip ORM events
+        response_cache.invalidate_on_commit(
+            session, *(response_cache.tag(model) for model, rows in mappings if rows)
+        )
+
+
+def _insert_all(model, rows, chunk_size):
+    count = 0
+    for chunk in _chunks(rows, chunk_size):
+        _insert([(model, chunk)])
+        count += len(chunk)
+    log.info("%d %s row(s) generated", count, model.__tablename__)
+    return count
+
+
+def _update_counters(model, counters, chunk_size):
+    """
+    Write ``counters``, ``{id: {column: value}}``, in bulk.
+    """
+    from catalog.extensions import db
+
+    rows = (dict(values, id=identity) for identity, values in counters.items())
+    for chunk in _chunks(rows, chunk_size):
+        with db.session.begin():
+            db.session.bulk_update_mappings(model, chunk)
+
+
+def _ids_by_name(column, prefix):
+    """
+    IDs of generated rows by name, ``bulk_insert_mappings`` does not fetch
+    generated primary keys.
+    """
+    from catalog.extensions import db
+
+    model = column.class_
+    rows = db.session.query(model.id, column).filter(column.startswith(prefix, autoescape=True))
+    return {name: identity for identity, name in rows}
+
+
+def generate(
+        users=20,
+        datasets=100,
+        stories=20,
+        comments=200,
+        stars=200,
+        story_stars=20,
+        follows=100,
+        licenses=20,
+        organizations=50,
+        publishers=100,
+        days=365,
+        chunk_size=CHUNK_SIZE,
+        seed=0,
+):
+    """
+    Insert synthetic rows, ``stars``, ``story_stars`` and ``follows`` are
+    upper bounds: a user never stars or follows the same thing twice.
+
+    Returns:
+        data (SyntheticData) - IDs of the generated rows.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals,too-many-statements
+    from sqlalchemy_utils import Password
+
+    from catalog.extensions import password_hasher
+    from catalog.modules.comments.models import Comment, CommentType
+    from catalog.modules.datasets.models import Dataset, DatasetKeyword, License, Organization, \
+        Publisher, Reference, Source
+    from catalog.modules.stories.models import Story, StoryDatasetAssociation
+    from catalog.modules.users.models import User, UserFollowers, UserStarDataset, UserStarStory
+
+    rng = random.Random(seed)
+    data = SyntheticData()
+    end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    span = timedelta(days=days).total_seconds()
+
+    def timestamp():
+        return end - timedelta(seconds=int(rng.random() * span))
+
+    def recent():
+        # Activity grows over time
+        return end - timedelta(seconds=int(rng.random() ** 2 * span))
+
+    prefix = 'synthetic%d' % seed
+
+    # Hashing is slow on purpose, every user gets the same hash
+    password = Password(password_hasher.hash(PASSWORD))
+    active_regular_user = User.StaticRoles.ACTIVE.mask | User.StaticRoles.REGULAR_USER.mask
+    data.usernames = ['%s_user_%d' % (prefix, index) for index in range(users)]
+
+    def user_rows():
+        for username in data.usernames:
+            created = timestamp()
+            yield {
+                'username': username,
+                'email': '%s@example.com' % username,
+                'password': password,
+                'first_name': rng.choice(WORDS).title(),
+                'last_name': rng.choice(WORDS).title(),
+                'static_roles': active_regular_user,
+                'created': created,
+                'updated': created,
+            }
+
+    _insert_all(User, user_rows(), chunk_size)
+    user_ids = _ids_by_name(User.username, '%s_user_' % prefix)
+    data.users = [user_ids[username] for username in data.usernames]
+
+    license_names = ['%s-license-%d' % (prefix, index) for index in range(licenses)]
+    _insert_all(License, (
+        {'name': name, 'url': 'http://example.com/licenses/%d' % index} for index, name in enumerate(license_names)
+    ), chunk_size)
+    organization_names = ['%s-organization-%d' % (prefix, index) for index in range(organizations)]
+    _insert_all(Organization, (
+        {'name': name, 'web': 'http://example.com/organizations/%d' % index}
+        for index, name in enumerate(organization_names)
+    ), chunk_size)
+    ids = _ids_by_name(License.name, '%s-license-' % prefix)
+    license_ids = Popularity([ids[name] for name in license_names], rng)
+    ids = _ids_by_name(Organization.name, '%s-organization-' % prefix)
+    organization_ids = Popularity([ids[name] for name in organization_names], rng)
+
+    publisher_rows = [
+        {
+            'id': _identity(rng),
+            'name': '%s-publisher-%d' % (prefix, index),
+            'organization_id': organization_ids.choice() if organization_ids else None,
+        }
+        for index in range(publishers)
+    ]
+    _insert_all(Publisher, publisher_rows, chunk_size)
+    publisher_ids = Popularity([row['id'] for row in publisher_rows], rng)
+
+    # Active users contribute, comment, star and follow the most, popular
+    # ones are followed the most
+    activity = Popularity(data.users, rng, exponent=0.8)
+    fame = Popularity(data.users, rng)
+    keywords = Popularity(WORDS, rng)
+
+    data.datasets = [_identity(rng) for _ in range(datasets)]
+    data.stories = [_identity(rng) for _ in range(stories)]
+    dataset_popularity = Popularity(data.datasets, rng)
+    story_popularity = Popularity(data.stories, rng)
+
+    # Stories are planned first, so datasets are inserted with their
+    # ``story_count``
+    story_contributors = {}
+    links = []
+    story_counts = Counter()
+    for story_id in data.stories:
+        story_contributors[story_id] = activity.choice()
+        for dataset_id in dataset_popularity.sample(min(datasets, rng.randint(1, 4))):
+            links.append((story_id, dataset_id))
+            story_counts[dataset_id] += 1
+
+    def dataset_chunks():
+        for chunk in _chunks(enumerate(data.datasets), chunk_size):
+            dataset_rows, keyword_rows, source_rows, reference_rows = [], [], [], []
+            for index, dataset_id in chunk:
+                created = timestamp()
+                dataset_keywords = sorted(set(keywords.choice() for _ in range(rng.randint(1, 6))))
+                dataset_rows.append({
+                    'id': dataset_id,
+                    'name': '%s_dataset_%d' % (prefix, index),
+                    'title': _sentence(rng, rng.randint(2, 8)).title(),
+                    'description': _sentence(rng, int(rng.lognormvariate(3, 0.8)) + 1),
+                    'homepage': 'http://example.com/datasets/%d' % index,
+                    'keywords': dataset_keywords,
+                    'access_level': rng.choice(ACCESS_LEVELS),
+                    'data_quality': rng.random() < 0.3,
+                    'category': rng.choice(CATEGORIES),
+                    'license_id': license_ids.choice() if license_ids else None,
+                    'organization_id': organization_ids.choice() if organization_ids else None,
+                    'publisher_id': publisher_ids.choice() if publisher_ids else None,
+                    'contributor_id': activity.choice() if activity else None,
+                    'stars': 0,
+                    'story_count': story_counts[dataset_id],
+                    'deleted': False,
+                    'created': created,
+                    'updated': created,
+                })
+                keyword_rows.extend(
+                    {'dataset_id': dataset_id, 'keyword': keyword, 'position': position}
+                    for position, keyword in enumerate(dataset_keywords)
+                )
+                for position in range(rng.choice((0, 1, 1, 1, 2, 2, 3, 5))):
+                    file_format, media_type = rng.choice(FORMATS)
+                    source_rows.append({
+                        'id': _identity(rng),
+                        'dataset_id': dataset_id,
+                        'title': '%s source %d-%d' % (prefix, index, position),
+                        'url': 'http://example.com/datasets/%d/%d.%s' % (index, position, file_format.lower()),
+                        'format': file_format,
+                        'media_type': media_type,
+                    })
+                for position in range(rng.choice((0, 0, 0, 1, 1, 2))):
+                    reference_rows.append({
+                        'id': _identity(rng),
+                        'dataset_id': dataset_id,
+                        'title': '%s reference %d-%d' % (prefix, index, position),
+                        'url': 'http://example.com/papers/%d/%d' % (index, position),
+                    })
+            yield [
+                (Dataset, dataset_rows), (DatasetKeyword, keyword_rows),
+                (Source, source_rows), (Reference, reference_rows),
+            ]
+
+    for mappings in dataset_chunks():
+        _insert(mappings)
+    log.info("%d dataset row(s) generated", datasets)
+
+    dataset_counts = Counter(story_id for story_id, _ in links)
+    _insert_all(Story, (
+        {
+            'id': story_id,
+            'title': '%s story %d: %s' % (prefix, index, _sentence(rng, rng.randint(3, 8))),
+            'web': 'http://example.com/stories/%d' % index,
+            'description': _sentence(rng, int(rng.lognormvariate(3.5, 0.8)) + 1),
+            'keywords': ' '.join(sorted(set(keywords.choice() for _ in range(3)))),
+            'contributor_id': story_contributors[story_id],
+            'stars': 0,
+            'dataset_count': dataset_counts[story_id],
+            'created': timestamp(),
+        }
+        for index, story_id in enumerate(data.stories)
+    ), chunk_size)
+    _insert_all(StoryDatasetAssociation, (
+        {
+            'story_id': story_id,
+            'dataset_id': dataset_id,
+            'linker_id': story_contributors[story_id],
+            'linked_time': recent(),
+        }
+        for story_id, dataset_id in links
+    ), chunk_size)
+
+    def comment_rows():
+        dataset_share = 0.0 if not datasets else 1.0 if not stories else 1 - STORY_COMMENTS
+        for _ in range(comments if (datasets or stories) and users else 0):
+            if rng.random() < dataset_share:
+                target_id, target_type = dataset_popularity.choice(), CommentType.DATASET_COMMENT
+            else:
+                target_id, target_type = story_popularity.choice(), CommentType.STORY_COMMENT
+            comment_id = _identity(rng)
+            if len(data.comments) < SAMPLE_SIZE:
+                data.comments.append(comment_id)
+            created = recent()
+            yield {
+                'id': comment_id,
+                'comment': _sentence(rng, int(rng.lognormvariate(2.5, 0.9)) + 1),
+                'target_id': target_id,
+                'target_type': int(target_type),
+                'user_id': activity.choice(),
+                'stars': 0,
+                'created': created,
+                'updated': created,
+            }
+
+    _insert_all(Comment, comment_rows(), chunk_size)
+
+    def star_rows(target_key, popularity, total, counts):
+        for user_id, quota in activity.quotas(total if popularity else 0, len(popularity)):
+            for target_id in popularity.sample(quota):
+                counts[target_id] += 1
+                yield {'user_id': user_id, target_key: target_id, 'stared_time': recent()}
+
+    dataset_stars = Counter()
+    _insert_all(UserStarDataset, star_rows(
+        'dataset_id', dataset_popularity, stars, dataset_stars
+    ), chunk_size)
+    _update_counters(Dataset, {key: {'stars': value} for key, value in dataset_stars.items()}, chunk_size)
+    story_stars_counts = Counter()
+    _insert_all(UserStarStory, star_rows(
+        'story_id', story_popularity, story_stars, story_stars_counts
+    ), chunk_size)
+    _update_counters(Story, {key: {'stars': value} for key, value in story_stars_counts.items()}, chunk_size)
+
+    followers, following = Counter(), Counter()
+
+    def follower_rows():
+        for follower_id, quota in activity.quotas(follows if users > 1 else 0, users - 1):
+            followed = [user_id for user_id in fame.sample(quota + 1) if user_id != follower_id][:quota]
+            for user_id in followed:
+                followers[user_id] += 1
+                following[follower_id] += 1
+                yield {'user_id': user_id, 'follower_id': follower_id, 'issued_time': recent()}
+
+    _insert_all(UserFollowers, follower_rows(), chunk_size)
+    _update_counters(User, {
+        user_id: {'followers': followers[user_id], 'following': following[user_id]}
+        for user_id in set(followers) | set(following)
+    }, chunk_size)
+    return data
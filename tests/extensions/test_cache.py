@@ -0,0 +1,33 @@
+from catalog.extensions.cache import MemoryBackend
+
+
+def test_memory_backend_bounds_tag_versions():
+    backend = MemoryBackend(max_entries=2, max_versions=2)
+    stale = backend.get_versions(['dataset:1', 'dataset:2'])
+
+    for identity in range(1, 101):
+        backend.bump_version('dataset:%d' % identity)
+    assert len(backend._versions) == 2
+
+    # Evicted tags look changed, so their stale entries are never read again
+    versions = backend.get_versions(['dataset:1', 'dataset:2'])
+    assert versions[0] != stale[0]
+    assert versions[1] != stale[1]
+
+    # Untouched tags keep their version until the next eviction
+    assert backend.get_versions(['dataset:1']) == versions[:1]
+    backend.bump_version('dataset:100')
+    assert backend.get_versions(['dataset:1']) == versions[:1]
+    backend.bump_version('dataset:101')
+    assert backend.get_versions(['dataset:1']) != versions[:1]
+
+
+def test_memory_backend_clear_changes_versions():
+    backend = MemoryBackend()
+    backend.bump_version('dataset:1')
+    versions = backend.get_versions(['dataset:1', 'dataset:2'])
+
+    backend.clear()
+    assert backend._versions == {}
+    assert backend.get_versions(['dataset:1']) != versions[:1]
+    assert backend.get_versions(['dataset:2']) != versions[1:]
@@ -9,6 +9,12 @@ from catalog import extensions
         'marshmallow',
         'api',
         'oauth2',
+        'password_hasher',
+        'response_cache',
+        'rate_limiter',
+        'profiler',
+        'metrics',
+        'server',
     ])
 def test_extension_availability(extension_name):
     assert hasattr(extensions, extension_name)
@@ -0,0 +1,134 @@
+# encoding: utf-8
+import re
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from catalog.extensions import metrics
+from catalog.extensions.metrics import Counter, Histogram, Metrics, pool_gauges
+
+
+def sample(text, metric_name, **labels):
+    """
+    Value of a sample of the exposition ``text``, labels in any order.
+    """
+    for line in text.splitlines():
+        match = re.match(r'^(\w+)(?:\{(.*)\})? (\S+)$', line)
+        if match and match.group(1) == metric_name:
+            sample_labels = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ''))
+            if sample_labels == labels:
+                return float(match.group(3))
+    return None
+
+
+def test_exposition_format():
+    registry = Metrics()
+    counter = registry.counter('example_total', "Example\ncounter", ('name',))
+    counter.inc(name='a "quoted"\nname')
+    counter.inc(2, name='b')
+    histogram = registry.histogram('example_seconds', "Example histogram", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+    registry.register_collector('gauges', lambda: [Counter('collected_total', "Collected")])
+
+    text = registry.expose()
+    assert '# HELP example_total Example\\ncounter\n# TYPE example_total counter\n' in text
+    assert 'example_total{name="a \\"quoted\\"\\nname"} 1\n' in text
+    assert sample(text, 'example_total', name='b') == 2
+    assert sample(text, 'example_seconds_bucket', le='0.1') == 1
+    assert sample(text, 'example_seconds_bucket', le='1.0') == 2
+    assert sample(text, 'example_seconds_bucket', le='+Inf') == 3
+    assert sample(text, 'example_seconds_sum') == 5.55
+    assert sample(text, 'example_seconds_count') == 3
+    assert '# TYPE collected_total counter' in text
+
+    with pytest.raises(ValueError):
+        counter.inc(other='label')
+    with pytest.raises(ValueError):
+        counter.inc(-1, name='b')
+    # Registered metrics are shared by name
+    assert registry.counter('example_total', "Example counter", ('name',)) is counter
+    with pytest.raises(ValueError):
+        registry.histogram('example_total', "Example counter", ('name',))
+
+
+def test_families_of_several_metrics_are_merged():
+    registry = Metrics()
+    registry.register_collector('a', lambda: [Counter('shared_total', "Shared", ('source',))])
+    registry.register_collector('b', lambda: [Counter('shared_total', "Shared", ('source',))])
+    assert registry.expose().count('# TYPE shared_total counter') == 1
+
+
+def test_metrics_of_several_processes_are_merged(tmpdir, monkeypatch):
+    def registry(count, size):
+        registry = Metrics()
+        registry.directory = str(tmpdir)
+        registry.counter('example_total', "Example", ('name',)).inc(count, name='a')
+        registry.histogram('example_seconds', "Example", buckets=(1,)).observe(count)
+        registry.gauge('example_size', "Example").set(size)
+        return registry
+
+    monkeypatch.setattr('os.getpid', lambda: 1001)
+    registry(2, 10).save(str(tmpdir))
+    monkeypatch.setattr('os.getpid', lambda: 1002)
+    text = registry(3, 20).expose()
+
+    assert sample(text, 'example_total', name='a') == 5
+    assert sample(text, 'example_seconds_count') == 2
+    assert sample(text, 'example_seconds_sum') == 5
+    # Gauges describe the scraped process only
+    assert sample(text, 'example_size', pid='1002') == 20
+    assert sample(text, 'example_size', pid='1001') is None
+
+
+def test_pool_gauges():
+    engine = create_engine('sqlite://', poolclass=QueuePool, pool_size=3)
+    with engine.connect():
+        gauges = {gauge.name: gauge.samples()[0][2] for gauge in pool_gauges(engine.pool)}
+    assert gauges['catalog_db_pool_size'] == 3
+    assert gauges['catalog_db_pool_checked_out'] == 1
+
+
+def test_histogram_buckets():
+    histogram = Histogram('example_seconds', "Example", ('route',), buckets=(1, 0.5))
+    histogram.observe(0.5, route='/')
+    assert [value for name, labels, value in histogram.samples() if name.endswith('_bucket')] == [1, 1, 1]
+
+
+def test_metrics_endpoint(flask_app_client, db, regular_user, example_dataset):
+    from catalog.modules.comments.models import Comment
+
+    route = '/api/v1/datasets/<id>'
+    before = flask_app_client.get('/metrics').get_data(as_text=True)
+
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read', 'datasets:write')):
+        response = flask_app_client.get('/api/v1/datasets/%s' % example_dataset.id)
+        assert response.status_code == 200
+        response = flask_app_client.post(
+            '/api/v1/datasets/%s/comments' % example_dataset.id,
+            data={'comment': 'Counted'}
+        )
+        assert response.status_code == 200
+
+    response = flask_app_client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type == 'text/plain; version=0.0.4; charset=utf-8'
+    text = response.get_data(as_text=True)
+
+    def increase(name, **labels):
+        return sample(text, name, **labels) - (sample(before, name, **labels) or 0)
+
+    assert increase('catalog_http_requests_total', method='GET', route=route, status='200') == 1
+    assert increase('catalog_http_request_duration_seconds_count', method='GET', route=route) == 1
+    assert increase('catalog_comments_created_total', target='dataset') == 1
+    assert sample(text, 'catalog_oauth2_token_cache_hit_ratio') is not None
+    assert sample(text, 'catalog_stars_total', target='dataset', event='stars') is not None
+    assert sample(text, 'catalog_schema_compiler_events_total', event='fallbacks') is not None
+
+    with db.session.begin():
+        assert Comment.query.filter_by(comment='Counted').delete(synchronize_session=False) == 1
+
+
+def test_registered_collectors():
+    assert {'extensions', 'stars', 'leaderboard', 'oauth2_gc'} <= set(metrics._collectors)
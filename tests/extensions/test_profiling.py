@@ -0,0 +1,84 @@
+# encoding: utf-8
+import re
+
+import pytest
+
+from catalog.extensions import profiler
+from catalog.extensions.profiling import RequestProfile
+
+
+@pytest.fixture()
+def profiling():
+    enabled = profiler.enabled
+    profiler.enabled = True
+    profiler.reset()
+    try:
+        yield profiler
+    finally:
+        profiler.enabled = enabled
+        profiler.reset()
+
+
+def server_timing(response):
+    return {
+        match.group(1): float(match.group(2))
+        for match in re.finditer(r'(\w+);dur=([\d.]+)', response.headers['Server-Timing'])
+    }
+
+
+def test_phases_are_exclusive():
+    profile = RequestProfile()
+    profile.enter('auth')
+    profile.enter('app')
+    profile.exit()
+    profile.exit()
+    total = profile.finish()
+
+    assert set(profile.phases) == {'app', 'auth'}
+    assert sum(profile.phases.values()) == pytest.approx(total)
+
+
+def test_disabled_profiler_does_not_add_headers(flask_app_client, regular_user, example_dataset, monkeypatch):
+    monkeypatch.setattr(profiler, 'enabled', False)
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/%s' % example_dataset.id)
+
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response.headers
+
+
+def test_server_timing(flask_app_client, regular_user, example_dataset, profiling):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/', query_string={'ids': example_dataset.id})
+
+    assert response.status_code == 200
+    timings = server_timing(response)
+    assert set(timings) == {'auth', 'parse', 'serialize', 'app', 'sql', 'total'}
+    assert timings['total'] >= timings['auth'] + timings['parse'] + timings['serialize']
+    assert re.search(r'sql;dur=[\d.]+;desc="[1-9]\d* queries"', response.headers['Server-Timing'])
+
+    report = profiling.report()
+    assert [endpoint['endpoint'] for endpoint in report] == ['GET /api/v1/datasets/']
+    assert report[0]['count'] == 1
+    assert report[0]['sql_count'] >= 1
+
+
+def test_profile_report(flask_app_client, admin_user, regular_user, profiling):
+    with flask_app_client.login(regular_user, auth_scopes=('debug:read',)):
+        response = flask_app_client.get('/api/v1/_debug/profile')
+        assert response.status_code == 403
+
+    with flask_app_client.login(admin_user, auth_scopes=('debug:read',)):
+        flask_app_client.get('/api/v1/_debug/profile')
+        response = flask_app_client.get('/api/v1/_debug/profile', query_string={'top': 1})
+        assert response.status_code == 200
+        assert response.json['enabled'] is True
+        assert [endpoint['endpoint'] for endpoint in response.json['endpoints']] == [
+            'GET /api/v1/_debug/profile'
+        ]
+        assert set(response.json['endpoints'][0]['phases_ms']) == {'auth', 'parse', 'serialize', 'app'}
+
+        response = flask_app_client.delete('/api/v1/_debug/profile')
+        assert response.status_code == 204
+    # Only the reset request itself is left
+    assert [endpoint['endpoint'] for endpoint in profiling.report()] == ['DELETE /api/v1/_debug/profile']
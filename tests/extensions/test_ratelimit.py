@@ -0,0 +1,64 @@
+import pytest
+
+from catalog.extensions.ratelimit import RateLimiter, parse_limit
+
+
+@pytest.mark.parametrize('limit,expected', [
+    ('10/minute', (10, 60)),
+    ('1/second', (1, 1)),
+    ('100/15minutes', (100, 900)),
+    (' 5 / hour ', (5, 3600)),
+])
+def test_parse_limit(limit, expected):
+    assert parse_limit(limit) == expected
+
+
+def test_parse_invalid_limit():
+    with pytest.raises(ValueError):
+        parse_limit('10 per minute')
+
+
+def test_sliding_window():
+    limiter = RateLimiter()
+    identities = {'user': 1}
+    # Middle of a window
+    now = 6000 + 30
+
+    assert [limiter.check(identities, 'comments', '3/minute', now=now) for _ in range(3)] == [0, 0, 0]
+    # The next window starts in 30 seconds, but the 3 requests still weigh
+    # more than 2 until a third of it has passed
+    assert limiter.check(identities, 'comments', '3/minute', now=now) == 30 + 20
+    # Other users and scopes are counted on their own
+    assert limiter.check({'user': 2}, 'comments', '3/minute', now=now) == 0
+    assert limiter.check(identities, 'stars', '3/minute', now=now) == 0
+
+    # Half of the previous window still overlaps the sliding window: 3 / 2
+    now += 60
+    assert limiter.check(identities, 'comments', '3/minute', now=now) == 0
+    assert limiter.check(identities, 'comments', '3/minute', now=now) == 10
+    now += 10
+    assert limiter.check(identities, 'comments', '3/minute', now=now) == 0
+    assert limiter.stats == {'hits': 7, 'rejected': 2}
+
+
+def test_client_limit():
+    limiter = RateLimiter()
+    now = 6000
+
+    assert limiter.check({'user': 1, 'client': 'app'}, 'comments', '2/minute', '3/minute', now=now) == 0
+    assert limiter.check({'user': 2, 'client': 'app'}, 'comments', '2/minute', '3/minute', now=now) == 0
+    assert limiter.check({'user': 3, 'client': 'app'}, 'comments', '2/minute', '3/minute', now=now) == 0
+    assert limiter.check({'user': 4, 'client': 'app'}, 'comments', '2/minute', '3/minute', now=now) == 80
+    # A rejected request is not counted by the user limit
+    assert limiter.check({'user': 4}, 'comments', '2/minute', now=now) == 0
+    assert limiter.check({'user': 4}, 'comments', '2/minute', now=now) == 0
+
+
+def test_configured_limits():
+    limiter = RateLimiter()
+    limiter.limits = {'comments': parse_limit('1/minute')}
+    assert limiter.check({'user': 1}, 'comments', '10/minute', now=6000) == 0
+    assert limiter.check({'user': 1}, 'comments', '10/minute', now=6000) == 120
+
+    limiter.enabled = False
+    assert limiter.check({'user': 1}, 'comments', '10/minute', now=6000) == 0
@@ -0,0 +1,115 @@
+# encoding: utf-8
+import json
+from datetime import datetime
+
+import pytest
+from flask_marshmallow import base_fields
+from marshmallow import post_dump
+
+from catalog.extensions.flask_restplus import ModelSchema, compiler
+
+
+def assert_same_dump(schema, obj):
+    fallbacks = compiler.stats['fallbacks']
+    dumped = compiler.dump(schema, obj)
+    assert compiler.stats['fallbacks'] == fallbacks
+    # Byte-identical, including the order of keys
+    assert json.dumps(dumped, default=str) == json.dumps(schema.dump(obj).data, default=str)
+
+
+@pytest.fixture()
+def detailed_dataset():
+    from catalog.modules.datasets.models import Dataset, DatasetKeyword, License, Organization, \
+        Publisher, Reference, Source
+    from catalog.modules.users.models import User
+
+    # Transient instances get SQL defaults of timestamps until they are stored
+    timestamps = {
+        'created': datetime(2020, 5, 17, 10, 30, 15, 123456),
+        'updated': datetime(2020, 5, 18, 8, 0),
+    }
+    dataset = Dataset(
+        id=Dataset.dataset_id(),
+        name='detailed_dataset',
+        title=u'D\xe9tailed dataset',
+        description=None,
+        stars=3,
+        data_quality=True,
+        contributor=User(id=42, username='contributor', is_active=True, **timestamps),
+        license=License(id=1, name='example_license', **timestamps),
+        organization=Organization(id=2, name='example_organization', **timestamps),
+        publisher=Publisher(id='publisher', name='example_publisher', **timestamps),
+        sources=[Source(id=index, title='source_%d' % index, **timestamps) for index in range(2)],
+        references=[Reference(id=1, title='reference', url='http://example.com/reference', **timestamps)],
+        keyword_entries=[DatasetKeyword(keyword='GDP', position=0)],
+        **timestamps
+    )
+    yield dataset
+
+
+def test_compiled_dump_is_identical(detailed_dataset, example_dataset, regular_user):
+    from catalog.modules.comments.models import Comment
+    from catalog.modules.comments.schemas import CommentSchema
+    from catalog.modules.datasets.schemas import DatasetSchema
+    from catalog.modules.stories.models import Story
+    from catalog.modules.stories.schemas import StorySchema
+    from catalog.modules.users.schemas import UserSchema
+
+    contributor = detailed_dataset.contributor
+
+    assert_same_dump(DatasetSchema(), detailed_dataset)
+    assert_same_dump(DatasetSchema(many=True), [detailed_dataset, example_dataset])
+    assert_same_dump(DatasetSchema(only=('id', 'license', 'keywords')), detailed_dataset)
+    assert_same_dump(DatasetSchema(exclude=('sources',)), example_dataset)
+    assert_same_dump(UserSchema(), regular_user)
+    assert_same_dump(CommentSchema(), Comment(id='comment', comment='Hi', user=contributor, created=contributor.created))
+    assert_same_dump(StorySchema(), Story(id='story', title='Story', contributor=contributor, created=contributor.created))
+
+
+def test_compiled_dump_is_cached(detailed_dataset):
+    from catalog.modules.datasets.schemas import DatasetSchema
+
+    schema = DatasetSchema()
+    dump = compiler.compile_dump(schema)
+    assert dump is not None
+    assert compiler.compile_dump(schema) is dump
+
+    compiled = compiler.stats['compiled']
+    # The same class and fields share the generated code
+    assert compiler.compile_dump(DatasetSchema()) is not None
+    assert compiler.stats['compiled'] == compiled
+
+
+def test_schema_with_processors_is_not_compiled(regular_user):
+    from catalog.modules.users.models import User
+
+    class ProcessedUserSchema(ModelSchema):
+        class Meta:
+            model = User
+            fields = ('id', 'username')
+
+        @post_dump
+        def add_greeting(self, data):
+            data['greeting'] = 'Hi %s' % data['username']
+            return data
+
+    schema = ProcessedUserSchema()
+    assert compiler.compile_dump(schema) is None
+    assert compiler.dump(schema, regular_user)['greeting'] == 'Hi regular_user'
+
+
+def test_compiled_dump_falls_back_on_errors(regular_user):
+    from catalog.modules.users.models import User
+
+    class UserEmailSchema(ModelSchema):
+        email = base_fields.Email()
+
+        class Meta:
+            model = User
+            fields = ('id', 'email')
+
+    user = User(id=1, email='not an email')
+    schema = UserEmailSchema()
+    fallbacks = compiler.stats['fallbacks']
+    assert compiler.dump(schema, user) == schema.dump(user).data
+    assert compiler.stats['fallbacks'] == fallbacks + 1
@@ -0,0 +1,63 @@
+# encoding: utf-8
+import os
+
+import pytest
+from sqlalchemy import exc
+
+from catalog.extensions.server import Server, _check_pid, _remember_pid
+
+
+def test_forked_runs_callbacks_after_a_failing_one():
+    server = Server()
+    calls = []
+
+    @server.after_fork
+    def failing():
+        raise RuntimeError()
+
+    server.after_fork(lambda: calls.append('started'))
+    server.forked()
+    assert calls == ['started']
+
+
+def test_options_from_config_and_overrides(flask_app):
+    options = Server().options(flask_app, workers=3, pidfile=None, max_requests=100)
+    assert options['bind'] == flask_app.config['SERVER_BIND']
+    assert options['threads'] == flask_app.config['SERVER_THREADS']
+    assert options['workers'] == 3
+    assert 'pidfile' not in options
+    assert options['max_requests_jitter'] == 10
+    assert callable(options['post_fork'])
+
+
+def test_pool_connections_of_another_process_are_discarded(monkeypatch):
+    class Record(object):
+        info = {}
+        connection = object()
+
+    class Proxy(object):
+        connection = Record.connection
+
+    record, proxy = Record(), Proxy()
+    _remember_pid(record.connection, record)
+    _check_pid(record.connection, record, proxy)
+
+    monkeypatch.setattr(os, 'getpid', lambda: record.info['pid'] + 1)
+    with pytest.raises(exc.DisconnectionError):
+        _check_pid(record.connection, record, proxy)
+    assert record.connection is None
+    assert proxy.connection is None
+
+
+def test_application_settings(flask_app):
+    pytest.importorskip('gunicorn')
+    from catalog.extensions.server.application import Application
+
+    application = Application(lambda: flask_app, Server().options(flask_app, workers=2, threads=3))
+    assert application.cfg.workers == 2
+    assert application.cfg.threads == 3
+    assert application.load() is flask_app
+
+    # gunicorn exits on configuration errors
+    with pytest.raises(SystemExit):
+        Application(lambda: flask_app, {'unknown': True})
@@ -0,0 +1,99 @@
+# encoding: utf-8
+from base64 import b64encode
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests import utils
+
+
+@pytest.yield_fixture()
+def users_read_token(regular_user_oauth2_client, db):
+    from catalog.modules.auth.models import OAuth2Token
+
+    token = OAuth2Token(
+        client=regular_user_oauth2_client,
+        user=regular_user_oauth2_client.user,
+        access_token='users_read_token',
+        refresh_token='users_read_refresh_token',
+        expires=datetime.utcnow() + timedelta(seconds=3600),
+        token_type=OAuth2Token.TokenTypes.Bearer,
+        scopes=['users:read']
+    )
+    with db.session.begin():
+        db.session.add(token)
+
+    yield token
+
+    with db.session.begin():
+        OAuth2Token.query.filter_by(access_token='users_read_token').delete()
+
+
+def test_cached_token_saves_queries_per_request(flask_app_client, users_read_token, db):
+    from catalog.extensions import oauth2
+
+    headers = (('Authorization', 'Bearer %s' % users_read_token.access_token), )
+    oauth2.token_cache.invalidate(users_read_token.access_token)
+    hits = oauth2.token_cache.stats['hits']
+
+    with utils.count_queries(db.engine) as uncached_statements:
+        response = flask_app_client.get('/api/v1/users/me', headers=headers)
+    assert response.status_code == 200
+
+    with utils.count_queries(db.engine) as cached_statements:
+        response = flask_app_client.get('/api/v1/users/me', headers=headers)
+    assert response.status_code == 200
+    assert response.json['username'] == users_read_token.user.username
+
+    assert oauth2.token_cache.stats['hits'] == hits + 1
+    # The token and the client are not queried anymore, only the user is
+    assert len(uncached_statements) - len(cached_statements) >= 2
+    assert not any('oauth2_token' in statement for statement in cached_statements)
+
+
+def test_revoked_token_is_not_served_from_cache(flask_app_client, users_read_token):
+    headers = (('Authorization', 'Bearer %s' % users_read_token.access_token), )
+    client = users_read_token.client
+
+    response = flask_app_client.get('/api/v1/users/me', headers=headers)
+    assert response.status_code == 200
+
+    response = flask_app_client.post(
+        '/auth/oauth2/revoke',
+        content_type='application/x-www-form-urlencoded',
+        headers={
+            'Authorization': 'Basic %s' % b64encode(
+                ('%s:%s' % (client.client_id, client.client_secret)).encode('utf-8')
+            ).decode('ascii'),
+        },
+        data={'token': users_read_token.access_token},
+    )
+    assert response.status_code == 200
+
+    response = flask_app_client.get('/api/v1/users/me', headers=headers)
+    assert response.status_code == 401
+
+
+def test_memory_token_cache_is_bypassed_by_several_workers(monkeypatch):
+    from catalog.extensions import server
+    from catalog.extensions.auth.oauth2 import BearerTokenCache
+
+    token_cache = BearerTokenCache()
+    expires = datetime.utcnow() + timedelta(seconds=3600)
+    token_cache.set('token', expires, user_id=1)
+    assert token_cache.get('token') == {'user_id': 1, 'expires': expires}
+
+    monkeypatch.setattr(server, 'workers', 3)
+    assert token_cache.get('token') is None
+
+
+def test_changed_token_is_invalidated_on_commit(users_read_token, db):
+    from catalog.extensions import oauth2
+
+    with db.session.begin():
+        users_read_token.scopes = ['users:read', 'users:write']
+        db.session.flush()
+        # A concurrent request still reads the committed token
+        oauth2.token_cache.set(users_read_token.access_token, users_read_token.expires, scopes=['users:read'])
+    assert oauth2.token_cache.get(users_read_token.access_token) is None
+
@@ -0,0 +1,78 @@
+# encoding: utf-8
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.yield_fixture()
+def oauth2_tokens(regular_user_oauth2_client, db):
+    from catalog.modules.auth.models import OAuth2Grant, OAuth2Token
+
+    now = datetime.utcnow()
+    tokens = [
+        OAuth2Token(
+            client=regular_user_oauth2_client,
+            user=regular_user_oauth2_client.user,
+            access_token='cleanup_token_%d' % index,
+            expires=expires,
+            token_type=OAuth2Token.TokenTypes.Bearer,
+            scopes=[]
+        )
+        for index, expires in enumerate([
+            now - timedelta(days=30),
+            now - timedelta(days=20),
+            now - timedelta(days=20),
+            now - timedelta(days=1),
+            now + timedelta(hours=1),
+        ])
+    ]
+    grants = [
+        OAuth2Grant(
+            client=regular_user_oauth2_client,
+            user=regular_user_oauth2_client.user,
+            code='cleanup_code_%d' % index,
+            redirect_uri='http://localhost/',
+            expires=expires,
+            scopes=[]
+        )
+        for index, expires in enumerate([now - timedelta(days=20), now + timedelta(minutes=1)])
+    ]
+    with db.session.begin():
+        db.session.add_all(tokens + grants)
+
+    yield tokens, grants
+
+    with db.session.begin():
+        OAuth2Token.query.filter(OAuth2Token.access_token.like('cleanup_token_%')).delete(synchronize_session=False)
+        OAuth2Grant.query.filter(OAuth2Grant.code.like('cleanup_code_%')).delete(synchronize_session=False)
+
+
+def test_purge_expired_respects_retention(oauth2_tokens, flask_app):
+    from catalog.modules.auth import cleanup
+    from catalog.modules.auth.models import OAuth2Token
+
+    reclaimed_before = cleanup.stats['reclaimed'].get('oauth2_token', 0)
+
+    # Small chunks still purge every expired row
+    reclaimed = cleanup.purge_expired(OAuth2Token, retention=timedelta(days=14), chunk_size=2)
+    assert reclaimed == 3
+    assert sorted(
+        token.access_token for token in OAuth2Token.query.filter(OAuth2Token.access_token.like('cleanup_token_%'))
+    ) == ['cleanup_token_3', 'cleanup_token_4']
+    assert cleanup.stats['reclaimed']['oauth2_token'] == reclaimed_before + 3
+
+    assert cleanup.purge_expired(OAuth2Token, retention=timedelta(days=14), chunk_size=2) == 0
+
+
+def test_purge_expired_tokens_uses_config(oauth2_tokens, flask_app):
+    from catalog.modules.auth import cleanup
+    from catalog.modules.auth.models import OAuth2Grant
+
+    runs = cleanup.stats['runs']
+    reclaimed = cleanup.purge_expired_tokens()
+
+    assert flask_app.config['OAUTH2_GC_RETENTION_DAYS'] == 14
+    assert reclaimed == {'oauth2_token': 3, 'oauth2_grant': 1}
+    assert cleanup.stats['runs'] == runs + 1
+    assert [grant.code for grant in OAuth2Grant.query.filter(OAuth2Grant.code.like('cleanup_code_%'))] == \
+        ['cleanup_code_1']
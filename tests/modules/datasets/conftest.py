@@ -0,0 +1,58 @@
+# encoding: utf-8
+import pytest
+
+
+@pytest.yield_fixture()
+def example_datasets(db, regular_user):
+    """
+    A handful of datasets with licenses, organizations, publishers, sources
+    and references attached, i.e. everything ``DatasetSchema`` dumps.
+    """
+    from catalog.modules.datasets.models import Dataset, License, Organization, Publisher, \
+        Reference, Source
+
+    license = License(name='example_license')
+    organization = Organization(name='example_organization')
+    publisher = Publisher(name='example_publisher')
+    datasets = []
+    with db.session.begin():
+        db.session.add_all([license, organization, publisher])
+        db.session.flush()
+        for index in range(5):
+            dataset = Dataset(
+                id=Dataset.dataset_id(),
+                contributor_id=regular_user.id,
+                license_id=license.id,
+                organization_id=organization.id,
+                publisher_id=publisher.id,
+                name='example_dataset_%d' % index,
+                title='Example dataset %d' % index,
+                description='Description of dataset',
+                homepage='http://example.com/dataset',
+                keywords=['Data'],
+                access_level='PUBLIC',
+                data_quality=True,
+                category='Awesome category'
+            )
+            dataset.sources = [
+                Source(title='example_source_%d_%d' % (index, i), url='http://example.com/source')
+                for i in range(2)
+            ]
+            dataset.references = [
+                Reference(title='example_reference_%d' % index, url='http://example.com/reference')
+            ]
+            db.session.add(dataset)
+            datasets.append(dataset)
+
+    yield datasets
+
+    with db.session.begin():
+        for dataset in datasets:
+            for source in dataset.sources:
+                db.session.delete(source)
+            for reference in dataset.references:
+                db.session.delete(reference)
+            db.session.delete(dataset)
+        db.session.delete(publisher)
+        db.session.delete(organization)
+        db.session.delete(license)
@@ -0,0 +1,54 @@
+# encoding: utf-8
+import json
+
+import pytest
+
+from tests import utils
+
+
+def test_getting_datasets_by_ids(flask_app_client, regular_user, example_datasets):
+    ids = [example_datasets[3].id, 'missing', example_datasets[0].id]
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/', query_string={'ids': ','.join(ids)})
+
+    assert response.status_code == 200
+    assert [dataset and dataset['id'] for dataset in response.json] == [ids[0], None, ids[2]]
+    assert response.json[0]['license']['name'] == 'example_license'
+    assert len(response.json[0]['sources']) == 2
+
+
+def test_batch_getting_datasets(flask_app_client, regular_user, example_datasets):
+    ids = [dataset.id for dataset in reversed(example_datasets)] + ['missing']
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.post(
+            '/api/v1/datasets/batch-get',
+            data=json.dumps({'ids': ids}),
+            content_type='application/json'
+        )
+
+    assert response.status_code == 200
+    assert [dataset and dataset['id'] for dataset in response.json] == ids[:-1] + [None]
+
+
+def test_batch_getting_datasets_issues_constant_number_of_queries(
+        flask_app_client, regular_user, example_datasets, db
+):
+    ids = [dataset.id for dataset in example_datasets]
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        with utils.count_queries(db.engine) as single_dataset_statements:
+            response = flask_app_client.get('/api/v1/datasets/', query_string={'ids': ids[0]})
+        assert len(response.json) == 1
+
+        with utils.count_queries(db.engine) as many_datasets_statements:
+            response = flask_app_client.get('/api/v1/datasets/', query_string={'ids': ','.join(ids)})
+        assert len(response.json) == len(example_datasets)
+
+    assert len(many_datasets_statements) == len(single_dataset_statements)
+
+
+@pytest.mark.parametrize('ids', ('', ','.join(['id'] * 101)))
+def test_getting_datasets_by_invalid_ids(flask_app_client, regular_user, ids):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/', query_string={'ids': ids})
+
+    assert response.status_code == 422
@@ -0,0 +1,183 @@
+# encoding: utf-8
+import io
+import json
+import os
+
+import pytest
+
+
+@pytest.yield_fixture()
+def imported_datasets_cleanup(db):
+    from catalog.modules.datasets.models import Dataset, License, Organization, Publisher
+
+    existing_ids = {
+        model: [row_id for row_id, in db.session.query(model.id)]
+        for model in (License, Organization, Publisher)
+    }
+
+    yield
+
+    with db.session.begin():
+        for dataset in Dataset.query.filter(Dataset.name.like('bulk_%')):
+            for source in dataset.sources:
+                db.session.delete(source)
+            for reference in dataset.references:
+                db.session.delete(reference)
+            db.session.delete(dataset)
+        for model, ids in existing_ids.items():
+            # Imported rows must not stay in the identity map, their ids are reused
+            model.query.filter(~model.id.in_(ids)).delete(synchronize_session='fetch')
+
+
+def _dataset(name, **kwargs):
+    return dict(
+        dict(
+            name=name,
+            title='Bulk dataset %s' % name,
+            description='Description of dataset',
+            homepage='http://example.com/dataset',
+            access_level='PUBLIC',
+            category='Bulk category',
+        ),
+        **kwargs
+    )
+
+
+def test_bulk_importing_datasets_from_csv(flask_app_client, admin_user, imported_datasets_cleanup):
+    from catalog.modules.datasets.models import Dataset, License
+
+    body = (
+        'name,title,description,homepage,access_level,category,data_quality,keywords,license,license.url\n'
+        'bulk_0,Bulk 0,Description,http://example.com,PUBLIC,Bulk,true,GDP;machine learning,bulk_license,http://l\n'
+        'bulk_1,,Description,http://example.com,PUBLIC,Bulk,false,,bulk_license,\n'
+        'bulk_2,Bulk 2,Description,http://example.com,PUBLIC,Bulk,false,GDP,bulk_license,\n'
+        'bulk_2,Bulk 2,Description,http://example.com,PUBLIC,Bulk,false,GDP,bulk_license,\n'
+    )
+    with flask_app_client.login(admin_user, auth_scopes=('datasets:write',)):
+        response = flask_app_client.post(
+            '/api/v1/datasets/bulk', query_string={'chunk_size': 2}, data=body, content_type='text/csv'
+        )
+
+    assert response.status_code == 200
+    assert response.json['created'] == 2
+    assert response.json['failed'] == 2
+    assert [(error['row'], error['name']) for error in response.json['errors']] == [(2, 'bulk_1'), (4, 'bulk_2')]
+    assert 'title' in response.json['errors'][0]['message']
+
+    # The license is created once and shared by both chunks
+    license = License.get(license_name='bulk_license')
+    assert license.url == 'http://l'
+    dataset = Dataset.get(name='bulk_0')[0]
+    assert dataset.license_id == license.id
+    assert dataset.contributor_id == admin_user.id
+    assert dataset.data_quality is True
+    assert dataset.keyword_list() == ['GDP', 'machine learning']
+    assert Dataset.get(name='bulk_2')[0].license_id == license.id
+    assert [found.name for found in Dataset.search('learning')] == ['bulk_0']
+
+
+def test_bulk_importing_datasets_from_json_upload(flask_app_client, admin_user, imported_datasets_cleanup):
+    from catalog.modules.datasets.models import Dataset
+
+    records = [
+        _dataset(
+            'bulk_nested',
+            keywords=['GDP'],
+            license={'title': 'bulk_pddl', 'web': 'http://pddl.org/license'},
+            organization={'name': 'bulk_organization', 'email': 'bulk@example.com'},
+            publisher='bulk_publisher',
+            sources=[{'title': 'bulk_source', 'format': 'csv', 'access_url': 'http://example.com/data.csv'}],
+            references=[{'name': 'bulk_reference', 'reference': 'http://wikipedia.com/gdp'}],
+        ),
+        # Unique source titles are enforced by the database
+        _dataset('bulk_conflict', sources=[{'title': 'bulk_source', 'url': 'http://example.com/other.csv'}]),
+        ['not a record'],
+    ]
+    with flask_app_client.login(admin_user, auth_scopes=('datasets:write',)):
+        response = flask_app_client.post(
+            '/api/v1/datasets/bulk',
+            data={'file': (io.BytesIO(json.dumps(records).encode('utf-8')), 'datasets.json')},
+            content_type='multipart/form-data'
+        )
+
+    assert response.status_code == 200
+    assert response.json['created'] == 1
+    assert [(error['row'], error['name']) for error in response.json['errors']] == \
+        [(3, None), (2, 'bulk_conflict')]
+
+    dataset = Dataset.get(name='bulk_nested')[0]
+    assert dataset.license.name == 'bulk_pddl'
+    assert dataset.license.url == 'http://pddl.org/license'
+    assert dataset.organization.email == 'bulk@example.com'
+    assert dataset.publisher.name == 'bulk_publisher'
+    assert [(source.title, source.url) for source in dataset.sources] == \
+        [('bulk_source', 'http://example.com/data.csv')]
+    assert [(reference.title, reference.url) for reference in dataset.references] == \
+        [('bulk_reference', 'http://wikipedia.com/gdp')]
+    assert not Dataset.get(name='bulk_conflict')
+
+
+def test_bulk_importing_datasets_from_ndjson_with_malformed_lines(flask_app_client, admin_user,
+                                                                 imported_datasets_cleanup):
+    lines = [
+        json.dumps(_dataset('bulk_first')),
+        '{"name": "bulk_malformed", ',
+        '',
+        json.dumps(_dataset('bulk_last', description='Line\u2028separator')),
+    ]
+    with flask_app_client.login(admin_user, auth_scopes=('datasets:write',)):
+        response = flask_app_client.post(
+            '/api/v1/datasets/bulk',
+            data={'file': (io.BytesIO('\n'.join(lines).encode('utf-8')), 'datasets.ndjson')},
+            content_type='multipart/form-data'
+        )
+
+    assert response.status_code == 200
+    assert response.json['created'] == 2
+    assert [(error['row'], error['name']) for error in response.json['errors']] == [(2, None)]
+    assert response.json['errors'][0]['message'].startswith('Malformed JSON')
+
+
+def test_bulk_importing_requires_known_format(flask_app_client, admin_user):
+    with flask_app_client.login(admin_user, auth_scopes=('datasets:write',)):
+        response = flask_app_client.post('/api/v1/datasets/bulk', data='name', content_type='text/plain')
+    assert response.status_code == 415
+
+
+def test_bulk_importing_is_forbidden_for_regular_users(flask_app_client, regular_user):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:write',)):
+        response = flask_app_client.post('/api/v1/datasets/bulk', data='[]', content_type='application/json')
+    assert response.status_code == 403
+
+
+def test_development_datasets_are_importable(db, imported_datasets_cleanup):
+    from catalog.modules.datasets.importer import DatasetImporter, read_records
+
+    path = os.path.join(os.path.dirname(__file__), '../../../../tasks/app/data/datasets.yml')
+    with open(path) as data_file:
+        records = [dict(record, name='bulk_%s' % record['name']) for record in read_records(data_file, 'yaml')]
+
+    report = DatasetImporter().run(records)
+    assert report == {'created': len(records), 'failed': 0, 'errors': []}
+
+
+@pytest.mark.parametrize('document,names', [
+    ('datasets:\n  - name: a\n  - &b {name: b}\n  - *b\n', ['a', 'b', 'b']),
+    ('- name: a\n- name: b\n', ['a', 'b']),
+    ('name: a\n---\n---\nname: b\n', ['a', 'b']),
+    ('title: Datasets\ndatasets: [{name: a}]\n', ['a']),
+])
+def test_reading_yaml_records(document, names):
+    from catalog.modules.datasets.importer import read_records
+
+    assert [record['name'] for record in read_records(io.StringIO(document), 'yaml')] == names
+
+
+def test_reading_yaml_records_is_incremental():
+    from catalog.modules.datasets.importer import MalformedInput, read_records
+
+    records = read_records(io.StringIO('datasets:\n  - name: a\n  - name: [b\n'), 'yaml')
+    # The first record is read before the rest of the document is parsed
+    assert next(records) == {'name': 'a'}
+    with pytest.raises(MalformedInput):
+        next(records)
@@ -0,0 +1,105 @@
+# encoding: utf-8
+import json
+
+
+def test_dataset_sources_response_is_cached_until_a_source_is_added(
+        flask_app_client, regular_user, example_dataset
+):
+    from catalog.extensions import response_cache
+    from catalog.modules.datasets.models import Source
+
+    sources_url = '/api/v1/datasets/%s/sources' % example_dataset.id
+    hits = response_cache.stats['hits']
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read', 'datasets:write')):
+        response = flask_app_client.get(sources_url)
+        assert response.status_code == 200
+        assert response.headers['X-Cache'] == 'MISS'
+        assert response.json == []
+
+        response = flask_app_client.get(sources_url)
+        assert response.headers['X-Cache'] == 'HIT'
+        assert response.json == []
+        assert response_cache.stats['hits'] == hits + 1
+
+        response = flask_app_client.post(
+            sources_url, data={'title': 'cached_source', 'url': 'http://example.com/source'}
+        )
+        assert response.status_code == 200
+
+        response = flask_app_client.get(sources_url)
+        assert response.headers['X-Cache'] == 'MISS'
+        assert [source['title'] for source in response.json] == ['cached_source']
+
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        # Another set of scopes has its own entry
+        response = flask_app_client.get(sources_url)
+        assert response.headers['X-Cache'] == 'MISS'
+
+    from catalog.extensions import db
+    with db.session.begin():
+        Source.query.filter_by(title='cached_source').delete()
+
+
+def test_dataset_response_is_invalidated_by_writes(flask_app_client, admin_user, example_datasets):
+    dataset = example_datasets[0]
+    dataset_url = '/api/v1/datasets/%s' % dataset.id
+    with flask_app_client.login(admin_user, auth_scopes=('datasets:read', 'datasets:write')):
+        response = flask_app_client.get(dataset_url)
+        assert response.headers['X-Cache'] == 'MISS'
+        response = flask_app_client.get(dataset_url)
+        assert response.headers['X-Cache'] == 'HIT'
+
+        response = flask_app_client.patch(
+            dataset_url,
+            content_type='application/json',
+            data=json.dumps([{'op': 'replace', 'path': '/title', 'value': 'Cached dataset'}])
+        )
+        assert response.status_code == 200
+
+        response = flask_app_client.get(dataset_url)
+        assert response.headers['X-Cache'] == 'MISS'
+        assert response.json['title'] == 'Cached dataset'
+
+        response = flask_app_client.patch('%s/stars' % dataset_url)
+        assert response.status_code == 200
+
+        response = flask_app_client.get(dataset_url)
+        assert response.headers['X-Cache'] == 'MISS'
+        assert response.json['stars'] == 1
+
+        response = flask_app_client.delete('%s/stars' % dataset_url)
+        assert response.status_code == 200
+
+
+def test_dataset_response_is_not_invalidated_by_rolled_back_writes(db, example_dataset):
+    from catalog.extensions import response_cache
+    from catalog.modules.datasets.models import Dataset
+
+    tag = response_cache.tag(Dataset, example_dataset.id)
+    version = response_cache.backend.get_versions([tag])
+
+    try:
+        with db.session.begin():
+            example_dataset.title = 'Rolled back'
+            db.session.merge(example_dataset)
+            db.session.flush()
+            raise RuntimeError()
+    except RuntimeError:
+        pass
+
+    assert response_cache.backend.get_versions([tag]) == version
+
+
+def test_memory_response_cache_is_bypassed_by_several_workers(
+        flask_app_client, regular_user, example_dataset, monkeypatch
+):
+    from catalog.extensions import server
+
+    dataset_url = '/api/v1/datasets/%s' % example_dataset.id
+    # Writes handled by the other workers would not invalidate the entries
+    monkeypatch.setattr(server, 'workers', 3)
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        for _ in range(2):
+            response = flask_app_client.get(dataset_url)
+            assert response.status_code == 200
+            assert response.headers['X-Cache'] == 'MISS'
@@ -0,0 +1,89 @@
+# encoding: utf-8
+from datetime import datetime, timedelta
+
+from werkzeug.http import http_date
+
+
+def test_getting_list_of_datasets_with_etag(flask_app_client, regular_user, example_datasets, db):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/')
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        assert 'Last-Modified' not in response.headers
+
+        response = flask_app_client.get('/api/v1/datasets/', headers=(('If-None-Match', etag), ))
+        assert response.status_code == 304
+        assert response.data == b''
+
+        with db.session.begin():
+            example_datasets[0].title = 'Modified title'
+            db.session.merge(example_datasets[0])
+
+        response = flask_app_client.get('/api/v1/datasets/', headers=(('If-None-Match', etag), ))
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+
+def test_polling_list_of_datasets_after_deleting_one(flask_app_client, regular_user, example_datasets, db):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/')
+        count = len(response.json)
+        etag = response.headers['ETag']
+
+        with db.session.begin():
+            example_datasets[0].deleted = True
+            db.session.merge(example_datasets[0])
+
+        future = http_date(datetime.utcnow() + timedelta(days=1))
+        response = flask_app_client.get('/api/v1/datasets/', headers=(('If-Modified-Since', future), ))
+        assert response.status_code == 200
+        assert len(response.json) == count - 1
+
+        response = flask_app_client.get('/api/v1/datasets/', headers=(('If-None-Match', etag), ))
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+
+def test_getting_user_with_if_modified_since(flask_app_client, regular_user):
+    with flask_app_client.login(regular_user, auth_scopes=('users:read',)):
+        response = flask_app_client.get('/api/v1/users/me')
+        assert response.status_code == 200
+        assert 'Last-Modified' in response.headers
+
+        future = http_date(datetime.utcnow() + timedelta(days=1))
+        response = flask_app_client.get('/api/v1/users/me', headers=(('If-Modified-Since', future), ))
+        assert response.status_code == 304
+
+        past = http_date(datetime.utcnow() - timedelta(days=1))
+        response = flask_app_client.get('/api/v1/users/me', headers=(('If-Modified-Since', past), ))
+        assert response.status_code == 200
+
+
+def test_polling_dataset_after_adding_a_source(flask_app_client, regular_user, example_dataset):
+    dataset_url = '/api/v1/datasets/%s' % example_dataset.id
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read', 'datasets:write')):
+        response = flask_app_client.get(dataset_url)
+        assert response.status_code == 200
+        # Nested rows do not move the timestamp of the dataset
+        assert 'Last-Modified' not in response.headers
+        sources = len(response.json['sources'])
+        etag = response.headers['ETag']
+
+        # Served from the response cache
+        response = flask_app_client.get(dataset_url, headers=(('If-None-Match', etag), ))
+        assert response.status_code == 304
+        assert response.headers['X-Cache'] == 'HIT'
+
+        response = flask_app_client.post(
+            dataset_url + '/sources', data={'title': 'polled_source', 'url': 'http://example.com/source'}
+        )
+        assert response.status_code == 200
+
+        future = http_date(datetime.utcnow() + timedelta(days=1))
+        response = flask_app_client.get(dataset_url, headers=(('If-Modified-Since', future), ))
+        assert response.status_code == 200
+        assert len(response.json['sources']) == sources + 1
+
+        response = flask_app_client.get(dataset_url, headers=(('If-None-Match', etag), ))
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
@@ -0,0 +1,103 @@
+# encoding: utf-8
+import pytest
+
+from tests import utils
+
+
+@pytest.yield_fixture()
+def example_comments(db, example_dataset, regular_user, admin_user):
+    from catalog.modules.comments.models import Comment, CommentType
+
+    comments = []
+    with db.session.begin():
+        for index in range(5):
+            comments.append(Comment.create(
+                user_id=(regular_user, admin_user)[index % 2].id,
+                target_id=example_dataset.id,
+                target_type=CommentType.DATASET_COMMENT,
+                comment='Comment %d' % index
+            ))
+
+    yield comments
+
+    with db.session.begin():
+        for comment in comments:
+            db.session.delete(comment)
+
+
+def test_dataset_comments_are_paginated_by_cursor(
+        flask_app_client, db, regular_user, example_dataset, example_comments
+):
+    comments_url = '/api/v1/datasets/%s/comments' % example_dataset.id
+    expected_ids = [
+        comment.id for comment in sorted(example_comments, key=lambda comment: (comment.created, comment.id))
+    ]
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        for cache_status in ('MISS', 'HIT'):
+            ids = []
+            cursor = ''
+            while cursor is not None:
+                response = flask_app_client.get(comments_url, query_string={'cursor': cursor, 'limit': 2})
+                assert response.status_code == 200
+                assert response.headers['X-Cache'] == cache_status
+                ids.extend(comment['id'] for comment in response.json)
+                cursor = response.headers.get('X-Next-Cursor')
+            assert ids == expected_ids
+
+        response = flask_app_client.get(comments_url, query_string={'cursor': '', 'limit': 1})
+        first_comment = next(comment for comment in example_comments if comment.id == expected_ids[0])
+        assert response.json[0]['user'] == {
+            'id': first_comment.user.id,
+            'username': first_comment.user.username,
+        }
+
+
+def test_dataset_comments_authors_are_loaded_at_once(
+        flask_app_client, db, regular_user, example_dataset, example_comments
+):
+    from catalog.extensions.flask_restplus.parameters import PaginationParameters
+    from catalog.modules.comments.models import Comment, CommentType
+    from catalog.modules.comments.schemas import CommentSchema
+
+    query = Comment.query_target_comments(example_dataset.id, CommentType.DATASET_COMMENT)
+    with flask_app_client.application.test_request_context():
+        with utils.count_queries(db.engine) as statements:
+            comments = PaginationParameters.paginate(query, {'cursor': '', 'limit': 10}, Comment)
+            data, errors = CommentSchema(many=True).dump(comments)
+    assert errors == {}
+    assert len(data) == len(example_comments)
+    # Keys of the page and the page with authors
+    assert len(statements) == 2
+    assert 'JOIN user' in statements[-1]
+
+
+@pytest.yield_fixture()
+def rate_limiter():
+    from catalog.extensions import rate_limiter as rate_limiter_instance
+    from catalog.extensions.ratelimit import parse_limit
+
+    rate_limiter_instance.enabled = True
+    rate_limiter_instance.limits = {'comments': parse_limit('2/minute')}
+
+    yield rate_limiter_instance
+
+    rate_limiter_instance.enabled = False
+    rate_limiter_instance.limits = {}
+    rate_limiter_instance.backend.clear()
+
+
+def test_dataset_comments_flood_is_rejected(flask_app_client, db, regular_user, example_dataset, rate_limiter):
+    from catalog.modules.comments.models import Comment
+
+    comments_url = '/api/v1/datasets/%s/comments' % example_dataset.id
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read', 'datasets:write')):
+        for index in range(2):
+            response = flask_app_client.post(comments_url, data={'comment': 'Flood %d' % index})
+            assert response.status_code == 200
+
+        response = flask_app_client.post(comments_url, data={'comment': 'Flood 2'})
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) > 0
+
+    with db.session.begin():
+        assert Comment.query.filter(Comment.comment.like('Flood %')).delete(synchronize_session=False) == 2
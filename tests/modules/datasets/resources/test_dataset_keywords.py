@@ -0,0 +1,120 @@
+# encoding: utf-8
+import json
+
+import pytest
+
+
+@pytest.yield_fixture()
+def tagged_datasets(db, regular_user):
+    from catalog.modules.datasets.models import Dataset
+
+    datasets = [
+        Dataset(
+            id=Dataset.dataset_id(),
+            contributor_id=regular_user.id,
+            name='tagged_dataset_%d' % index,
+            title='Tagged dataset %d' % index,
+            description='Description of dataset',
+            homepage='http://example.com/dataset',
+            keywords=keywords,
+            access_level='PUBLIC',
+            data_quality=True,
+            category='Awesome category'
+        )
+        for index, keywords in enumerate([['machine learning', 'GDP'], ['GDP']])
+    ]
+    with db.session.begin():
+        db.session.add_all(datasets)
+
+    yield datasets
+
+    with db.session.begin():
+        for dataset in datasets:
+            db.session.delete(dataset)
+
+
+def test_filtering_datasets_by_keyword(flask_app_client, regular_user, tagged_datasets):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/', query_string={'keyword': 'machine learning'})
+    assert response.status_code == 200
+    assert [dataset['name'] for dataset in response.json] == ['tagged_dataset_0']
+    assert response.json[0]['keywords'] == ['machine learning', 'GDP']
+
+
+def test_listing_keyword_facets(flask_app_client, regular_user, tagged_datasets):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/keywords/')
+    assert response.status_code == 200
+    facets = {facet['keyword']: facet['count'] for facet in response.json}
+    assert facets['GDP'] == 2
+    assert facets['machine learning'] == 1
+    assert response.json[0]['keyword'] == 'GDP'
+
+
+def test_patching_dataset_keywords(flask_app_client, admin_user, tagged_datasets, db):
+    from catalog.modules.datasets.models import DatasetKeyword
+
+    dataset = tagged_datasets[1]
+    with flask_app_client.login(admin_user, auth_scopes=('datasets:write',)):
+        response = flask_app_client.patch(
+            '/api/v1/datasets/%s' % dataset.id,
+            content_type='application/json',
+            data=json.dumps([
+                {'op': 'add', 'path': '/keywords', 'value': 'economy'},
+                {'op': 'remove', 'path': '/keywords', 'value': 'GDP'},
+            ])
+        )
+    assert response.status_code == 200
+    assert response.json['keywords'] == ['economy']
+    assert [
+        entry.keyword for entry in DatasetKeyword.query.filter_by(dataset_id=dataset.id)
+    ] == ['economy']
+
+    with flask_app_client.login(admin_user, auth_scopes=('datasets:write',)):
+        response = flask_app_client.patch(
+            '/api/v1/datasets/%s' % dataset.id,
+            content_type='application/json',
+            data=json.dumps([
+                {'op': 'replace', 'path': '/keywords', 'value': ['GDP', 'economy']},
+            ])
+        )
+    assert response.status_code == 200
+    assert response.json['keywords'] == ['GDP', 'economy']
+
+
+def test_keywords_differing_in_case_only_are_duplicates(flask_app_client, admin_user, tagged_datasets):
+    dataset = tagged_datasets[0]
+    with flask_app_client.login(admin_user, auth_scopes=('datasets:write',)):
+        response = flask_app_client.patch(
+            '/api/v1/datasets/%s' % dataset.id,
+            content_type='application/json',
+            data=json.dumps([
+                {'op': 'replace', 'path': '/keywords', 'value': ['gdp', 'GDP', 'Machine Learning']},
+            ])
+        )
+        assert response.status_code == 200
+        assert response.json['keywords'] == ['gdp', 'Machine Learning']
+
+        response = flask_app_client.patch(
+            '/api/v1/datasets/%s' % dataset.id,
+            content_type='application/json',
+            data=json.dumps([{'op': 'remove', 'path': '/keywords', 'value': 'GDP'}])
+        )
+        assert response.status_code == 200
+        assert response.json['keywords'] == ['Machine Learning']
+
+
+def test_too_long_keywords_must_fail(flask_app_client, admin_user, tagged_datasets):
+    dataset = tagged_datasets[0]
+    with flask_app_client.login(admin_user, auth_scopes=('datasets:write',)):
+        for operation in (
+                {'op': 'add', 'path': '/keywords', 'value': 'k' * 129},
+                {'op': 'replace', 'path': '/keywords', 'value': ['GDP', 'k' * 129]},
+        ):
+            response = flask_app_client.patch(
+                '/api/v1/datasets/%s' % dataset.id,
+                content_type='application/json',
+                data=json.dumps([operation])
+            )
+            assert response.status_code == 422, operation
+    assert dataset.keyword_list() == ['machine learning', 'GDP']
@@ -0,0 +1,114 @@
+# encoding: utf-8
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests import utils
+
+
+@pytest.yield_fixture()
+def star_users(regular_user, admin_user, readonly_user, internal_user):
+    yield [regular_user, admin_user, readonly_user, internal_user]
+
+
+@pytest.yield_fixture()
+def leaderboard(db, example_datasets):
+    from catalog.modules.comments.models import Comment
+    from catalog.modules.datasets.leaderboard import leaderboard as leaderboard_instance
+    from catalog.modules.datasets.models import DatasetRanking
+    from catalog.modules.users.models import UserStarDataset
+
+    yield leaderboard_instance
+
+    dataset_ids = [dataset.id for dataset in example_datasets]
+    with db.session.begin():
+        UserStarDataset.query \
+            .filter(UserStarDataset.dataset_id.in_(dataset_ids)) \
+            .delete(synchronize_session=False)
+        Comment.query.filter(Comment.target_id.in_(dataset_ids)).delete(synchronize_session=False)
+        DatasetRanking.query.delete()
+
+
+def star(db, users, dataset, stared_time=None):
+    from catalog.modules.users.models import UserStarDataset
+
+    with db.session.begin():
+        for user in users:
+            UserStarDataset.star(user.id, dataset.id)
+        if stared_time is not None:
+            UserStarDataset.query \
+                .filter_by(dataset_id=dataset.id) \
+                .update({'stared_time': stared_time}, synchronize_session=False)
+
+
+def test_top_datasets(flask_app_client, db, regular_user, example_datasets, star_users, leaderboard):
+    star(db, star_users[:3], example_datasets[2])
+    star(db, star_users[:1], example_datasets[0])
+    leaderboard.refresh()
+
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/top')
+        assert response.status_code == 200
+        assert [dataset['id'] for dataset in response.json] == [example_datasets[2].id, example_datasets[0].id]
+        assert [dataset['stars'] for dataset in response.json] == [3, 1]
+
+        response = flask_app_client.get('/api/v1/datasets/top', query_string={'offset': 1, 'limit': 1})
+        assert [dataset['id'] for dataset in response.json] == [example_datasets[0].id]
+
+
+def test_trending_datasets(flask_app_client, db, regular_user, example_datasets, star_users, leaderboard):
+    from catalog.modules.comments.models import Comment, CommentType
+
+    # Stars older than the trending window do not count
+    star(db, star_users, example_datasets[1], stared_time=datetime.utcnow() - timedelta(days=30))
+    star(db, star_users[:1], example_datasets[4])
+    with db.session.begin():
+        Comment.create(regular_user.id, example_datasets[3].id, CommentType.DATASET_COMMENT, 'Trending!')
+    leaderboard.refresh()
+
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/trending')
+        assert response.status_code == 200
+        assert [dataset['id'] for dataset in response.json] == [example_datasets[3].id, example_datasets[4].id]
+
+    assert [dataset_id for dataset_id, _ in leaderboard.ranking('top')][0] == example_datasets[1].id
+
+
+def test_trending_score_decays(db, example_datasets, star_users, leaderboard):
+    from catalog.modules.datasets.leaderboard import compute_trending
+
+    star(db, star_users[:2], example_datasets[0], stared_time=datetime.utcnow() - timedelta(days=6))
+    star(db, star_users[:1], example_datasets[1])
+
+    ranking = compute_trending(10, half_life_days=3, window_days=7)
+    assert ranking == [(example_datasets[1].id, 1.0), (example_datasets[0].id, 0.5)]
+
+
+def test_leaderboard_page_is_one_query(db, example_datasets, star_users, leaderboard):
+    star(db, star_users[:2], example_datasets[0])
+    leaderboard.refresh()
+    assert leaderboard.page('top') == [example_datasets[0]]
+
+    with utils.count_queries(db.engine) as statements:
+        assert leaderboard.page('top') == [example_datasets[0]]
+    assert len(statements) == 1
+
+
+def test_expired_leaderboard_is_reloaded_not_refreshed(db, example_datasets, star_users, leaderboard, monkeypatch):
+    star(db, star_users[:2], example_datasets[0])
+    leaderboard.refresh()
+    refreshes = leaderboard.stats['refreshes']
+    assert leaderboard.refresh_if_expired() > datetime.utcnow()
+    assert leaderboard.stats['refreshes'] == refreshes
+
+    monkeypatch.setattr(leaderboard, 'refresh_interval', 0)
+    star(db, star_users[2:3], example_datasets[1])
+    # Requests only reload the materialized boards
+    assert [dataset_id for dataset_id, _ in leaderboard.ranking('top')] == [example_datasets[0].id]
+    assert leaderboard.stats['refreshes'] == refreshes
+
+    leaderboard.refresh_if_expired()
+    assert leaderboard.stats['refreshes'] == refreshes + 1
+    assert [dataset_id for dataset_id, _ in leaderboard.ranking('top')] == [
+        example_datasets[0].id, example_datasets[1].id
+    ]
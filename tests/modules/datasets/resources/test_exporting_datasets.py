@@ -0,0 +1,116 @@
+# encoding: utf-8
+import csv
+import io
+import json
+
+from tests import utils
+
+
+def test_exporting_datasets_as_ndjson(flask_app_client, regular_user, example_datasets):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/export', query_string={'format': 'ndjson'})
+
+    assert response.status_code == 200
+    assert response.content_type == 'application/x-ndjson'
+    records = {
+        record['name']: record
+        for record in map(json.loads, response.get_data(as_text=True).splitlines())
+    }
+    record = records['example_dataset_0']
+    assert record['id'] == example_datasets[0].id
+    assert record['license.name'] == 'example_license'
+    assert record['organization.name'] == 'example_organization'
+    assert record['publisher.name'] == 'example_publisher'
+    assert record['keywords'] == ['Data']
+    assert sorted(source['title'] for source in record['sources']) == ['example_source_0_0', 'example_source_0_1']
+    assert [reference['title'] for reference in record['references']] == ['example_reference_0']
+
+
+def test_exporting_datasets_as_csv(flask_app_client, regular_user, example_datasets):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/export', query_string={'format': 'csv'})
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/csv')
+    rows = {row['name']: row for row in csv.DictReader(io.StringIO(response.get_data(as_text=True)))}
+    row = rows['example_dataset_1']
+    assert row['license.name'] == 'example_license'
+    assert row['keywords'] == 'Data'
+    assert sorted(row['sources.title'].split(';')) == ['example_source_1_0', 'example_source_1_1']
+    assert row['references.url'] == 'http://example.com/reference'
+
+
+def test_exporting_datasets_reads_related_rows_per_batch(db, example_datasets):
+    from catalog.modules.datasets import exporter
+
+    with utils.count_queries(db.engine) as statements:
+        records = list(exporter.iter_records(batch_size=2))
+
+    assert len(records) >= len(example_datasets)
+    batches = (len(records) + 1) // 2
+    # Datasets with their license, organization and publisher once, then
+    # keywords, sources and references per batch
+    assert len(statements) == 1 + 3 * batches
+
+
+def test_exported_datasets_can_be_imported(db, example_datasets):
+    from catalog.modules.datasets import exporter, importer
+    from catalog.modules.datasets.models import Dataset
+
+    for export_format, import_format in (('ndjson', 'json'), ('csv', 'csv')):
+        exported = ''.join(
+            exporter.export(export_format, query=Dataset.query.filter(Dataset.name.like('example_dataset_%')))
+        )
+        # Names and titles are unique
+        copied = exported
+        for prefix in ('dataset', 'source', 'reference'):
+            copied = copied.replace('example_%s_' % prefix, 'copied_%s_%s_' % (export_format, prefix))
+
+        report = importer.DatasetImporter().run(importer.read_records(io.StringIO(copied), import_format))
+        assert report == {'created': len(example_datasets), 'failed': 0, 'errors': []}
+
+        copy = Dataset.get(name='copied_%s_dataset_0' % export_format)[0]
+        assert copy.license.name == 'example_license'
+        assert copy.keyword_list() == ['Data']
+        assert sorted(source.title for source in copy.sources) == \
+            ['copied_%s_source_0_0' % export_format, 'copied_%s_source_0_1' % export_format]
+        assert [reference.url for reference in copy.references] == ['http://example.com/reference']
+
+    with db.session.begin():
+        for dataset in Dataset.query.filter(Dataset.name.like('copied_%')):
+            for source in dataset.sources:
+                db.session.delete(source)
+            for reference in dataset.references:
+                db.session.delete(reference)
+            db.session.delete(dataset)
+
+
+def test_exported_csv_list_values_with_separators_can_be_imported(db, example_datasets):
+    from catalog.modules.datasets import exporter, importer
+    from catalog.modules.datasets.models import Dataset
+
+    dataset = example_datasets[0]
+    with db.session.begin():
+        dataset.sources[0].title = 'example_source_0_0; GDP\\growth'
+        dataset.keywords = ['Data', 'GDP;growth']
+        db.session.merge(dataset)
+
+    exported = ''.join(exporter.export('csv', query=Dataset.query.filter_by(id=dataset.id)))
+    # Names and titles are unique
+    copied = exported
+    for prefix in ('dataset', 'source', 'reference'):
+        copied = copied.replace('example_%s_' % prefix, 'copied_%s_' % prefix)
+    report = importer.DatasetImporter().run(importer.read_records(io.StringIO(copied), 'csv'))
+    assert report == {'created': 1, 'failed': 0, 'errors': []}
+
+    copy = Dataset.get(name='copied_dataset_0')[0]
+    try:
+        assert copy.keyword_list() == ['Data', 'GDP;growth']
+        assert sorted(source.title for source in copy.sources) == ['copied_source_0_0; GDP\\growth', 'copied_source_0_1']
+    finally:
+        with db.session.begin():
+            for source in copy.sources:
+                db.session.delete(source)
+            for reference in copy.references:
+                db.session.delete(reference)
+            db.session.delete(copy)
@@ -0,0 +1,108 @@
+# encoding: utf-8
+import base64
+
+from tests import utils
+
+
+def test_getting_list_of_datasets(flask_app_client, regular_user, example_datasets):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/', query_string={'limit': 100})
+
+    assert response.status_code == 200
+    assert response.content_type == 'application/json'
+    assert isinstance(response.json, list)
+    dumped_datasets = {dataset['id']: dataset for dataset in response.json}
+    for dataset in example_datasets:
+        dumped_dataset = dumped_datasets[dataset.id]
+        assert dumped_dataset['license']['name'] == 'example_license'
+        assert dumped_dataset['organization']['name'] == 'example_organization'
+        assert dumped_dataset['publisher']['name'] == 'example_publisher'
+        assert dumped_dataset['contributor']['id'] == regular_user.id
+        assert len(dumped_dataset['sources']) == 2
+        assert len(dumped_dataset['references']) == 1
+        assert dumped_dataset['story_count'] == 0
+
+
+def test_getting_list_of_datasets_issues_constant_number_of_queries(
+        flask_app_client, regular_user, example_datasets, db
+):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        with utils.count_queries(db.engine) as single_dataset_statements:
+            response = flask_app_client.get('/api/v1/datasets/', query_string={'limit': 1})
+        assert response.status_code == 200
+        assert len(response.json) == 1
+
+        with utils.count_queries(db.engine) as many_datasets_statements:
+            response = flask_app_client.get('/api/v1/datasets/', query_string={'limit': 100})
+        assert response.status_code == 200
+        assert len(response.json) >= len(example_datasets)
+
+    assert len(many_datasets_statements) == len(single_dataset_statements)
+
+
+def test_getting_list_of_datasets_with_cursor(flask_app_client, regular_user, example_datasets):
+    from catalog.extensions.flask_restplus.parameters import PaginationParameters
+
+    dataset_ids = []
+    cursor = ''
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        while cursor is not None:
+            response = flask_app_client.get(
+                '/api/v1/datasets/',
+                query_string={'limit': 2, 'cursor': cursor}
+            )
+            assert response.status_code == 200
+            assert len(response.json) <= 2
+            dataset_ids.extend(dataset['id'] for dataset in response.json)
+            cursor = response.headers.get(PaginationParameters.NEXT_CURSOR_HEADER)
+
+    assert len(dataset_ids) == len(set(dataset_ids))
+    assert set(dataset_ids) >= {dataset.id for dataset in example_datasets}
+
+
+def test_getting_list_of_datasets_with_invalid_cursor_must_fail(flask_app_client, regular_user):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/', query_string={'cursor': 'invalid'})
+        assert response.status_code == 422
+
+        for payload in (
+                '["2018-01-01T00:00:00.000000", ["id"]]',
+                '["2018-01-01T00:00:00.000000", {"id": 1}]',
+                '["2018-01-01T00:00:00.000000", "id", "extra"]',
+                '{"2018-01-01T00:00:00.000000": "id"}',
+        ):
+            cursor = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+            response = flask_app_client.get('/api/v1/datasets/', query_string={'cursor': cursor})
+            assert response.status_code == 422, payload
+
+
+def test_getting_list_of_datasets_filtered_and_sorted(flask_app_client, regular_user, example_datasets, db):
+    with db.session.begin():
+        for stars, dataset in enumerate(example_datasets):
+            dataset.stars = stars
+            db.session.merge(dataset)
+
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get(
+            '/api/v1/datasets/',
+            query_string={'category': 'Awesome category', 'license_id': example_datasets[0].license_id,
+                          'sort': '-stars', 'limit': 3}
+        )
+    assert response.status_code == 200
+    assert [dataset['name'] for dataset in response.json] == [
+        dataset.name for dataset in reversed(example_datasets[-3:])
+    ]
+
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/', query_string={'category': 'Unknown category'})
+    assert response.status_code == 200
+    assert response.json == []
+
+
+def test_getting_list_of_datasets_with_invalid_sort_must_fail(flask_app_client, regular_user):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/', query_string={'sort': 'title'})
+        assert response.status_code == 422
+
+        response = flask_app_client.get('/api/v1/datasets/', query_string={'sort': 'stars', 'cursor': ''})
+        assert response.status_code == 422
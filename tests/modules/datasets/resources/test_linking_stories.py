@@ -0,0 +1,42 @@
+# encoding: utf-8
+import pytest
+
+
+@pytest.yield_fixture()
+def example_story(db, regular_user):
+    from catalog.modules.stories.models import Story
+
+    story = Story(
+        id=Story.story_id(),
+        title='Example story',
+        web='http://example.com/story',
+        contributor_id=regular_user.id
+    )
+    with db.session.begin():
+        db.session.add(story)
+
+    yield story
+
+    with db.session.begin():
+        db.session.delete(story)
+
+
+def test_linking_and_unlinking_story_maintains_counters(
+        flask_app_client, regular_user, example_dataset, example_story, db
+):
+    from catalog.modules.datasets.models import Dataset
+    from catalog.modules.stories.models import Story
+
+    links_url = '/api/v1/datasets/%s/stories/%s/links' % (example_dataset.id, example_story.id)
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read', 'stories:write')):
+        response = flask_app_client.patch(links_url)
+        assert response.status_code == 200
+        assert response.json == {'id': example_dataset.id, 'story_count': 1}
+        assert Story.get(story_id=example_story.id).dataset_count == 1
+
+        response = flask_app_client.delete(links_url)
+        assert response.status_code == 200
+        assert response.json == {'id': example_dataset.id, 'story_count': 0}
+        assert Story.get(story_id=example_story.id).dataset_count == 0
+
+    assert Dataset.get(id=example_dataset.id).associated_stories_num() == 0
@@ -0,0 +1,68 @@
+# encoding: utf-8
+import pytest
+
+
+@pytest.yield_fixture()
+def searchable_datasets(db, regular_user):
+    from catalog.modules.datasets.models import Dataset
+
+    def create_dataset(name, title, description):
+        return Dataset(
+            id=Dataset.dataset_id(),
+            contributor_id=regular_user.id,
+            name=name,
+            title=title,
+            description=description,
+            homepage='http://example.com/dataset',
+            keywords=['Data'],
+            access_level='PUBLIC',
+            data_quality=True,
+            category='Economics'
+        )
+
+    datasets = [
+        create_dataset('gdp_mention', 'World trade', 'Trade volumes with a note on gdp'),
+        create_dataset('gdp_title', 'World GDP', 'Gross domestic product by country'),
+        create_dataset('population', 'World population', 'Population by country'),
+    ]
+    with db.session.begin():
+        db.session.add_all(datasets)
+
+    yield datasets
+
+    with db.session.begin():
+        for dataset in datasets:
+            db.session.delete(dataset)
+
+
+def search(flask_app_client, user, q):
+    with flask_app_client.login(user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/search', query_string={'q': q})
+    assert response.status_code == 200
+    return [dataset['name'] for dataset in response.json]
+
+
+def test_searching_datasets_ranks_title_matches_first(flask_app_client, regular_user, searchable_datasets):
+    assert search(flask_app_client, regular_user, 'gdp') == ['gdp_title', 'gdp_mention']
+    assert search(flask_app_client, regular_user, 'world popul') == ['population']
+    assert search(flask_app_client, regular_user, 'nothing') == []
+
+
+def test_searching_datasets_follows_updates(flask_app_client, regular_user, searchable_datasets, db):
+    from catalog.modules.datasets.models import Dataset
+
+    population = searchable_datasets[2]
+    with db.session.begin():
+        Dataset.query.filter_by(id=population.id).update({'title': 'World census'})
+    assert search(flask_app_client, regular_user, 'census') == ['population']
+
+    with db.session.begin():
+        Dataset.delete(dataset=population)
+    searchable_datasets.remove(population)
+    assert search(flask_app_client, regular_user, 'census') == []
+
+
+def test_searching_datasets_requires_query(flask_app_client, regular_user):
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read',)):
+        response = flask_app_client.get('/api/v1/datasets/search')
+    assert response.status_code == 422
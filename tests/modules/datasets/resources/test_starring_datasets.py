@@ -0,0 +1,145 @@
+# encoding: utf-8
+import threading
+
+import pytest
+
+from tests import utils
+
+
+@pytest.yield_fixture()
+def star_users(db):
+    users = [utils.generate_user_instance(username='star_user_%d' % index) for index in range(20)]
+    with db.session.begin():
+        db.session.add_all(users)
+
+    yield users
+
+    from catalog.modules.users.models import UserStarDataset
+    with db.session.begin():
+        UserStarDataset.query \
+            .filter(UserStarDataset.user_id.in_([user.id for user in users])) \
+            .delete(synchronize_session=False)
+        for user in users:
+            db.session.delete(user)
+    UserStarDataset.counter.recount()
+
+
+def get_stars(db, dataset):
+    from catalog.modules.datasets.models import Dataset
+    return db.session.query(Dataset.stars).filter_by(id=dataset.id).scalar()
+
+
+def test_starring_dataset_is_idempotent(flask_app_client, db, regular_user, example_dataset):
+    stars_url = '/api/v1/datasets/%s/stars' % example_dataset.id
+    with flask_app_client.login(regular_user, auth_scopes=('datasets:read', 'datasets:write')):
+        for _ in range(2):
+            response = flask_app_client.patch(stars_url)
+            assert response.status_code == 200
+            assert response.json == {'id': example_dataset.id, 'stars': 1}
+        assert get_stars(db, example_dataset) == 1
+
+        for _ in range(2):
+            response = flask_app_client.delete(stars_url)
+            assert response.status_code == 200
+            assert response.json == {'id': example_dataset.id, 'stars': 0}
+        assert get_stars(db, example_dataset) == 0
+
+
+@pytest.yield_fixture()
+def file_db(db, tmpdir, monkeypatch):
+    """
+    The in-memory test database has a single connection shared by all the
+    threads, so concurrent transactions run against an SQLite file instead.
+    """
+    engine = db.create_engine('sqlite:///%s' % tmpdir.join('stars.db'), {})
+    db.Model.metadata.create_all(engine)
+    monkeypatch.setattr(db, 'session', db.create_scoped_session({'bind': engine, 'binds': {}, 'autocommit': True}))
+
+    yield db
+
+    db.session.remove()
+    engine.dispose()
+
+
+def test_concurrent_stars_are_not_lost(flask_app, file_db):
+    from catalog.modules.datasets.models import Dataset
+    from catalog.modules.users.models import UserStarDataset
+
+    with file_db.session.begin():
+        dataset = Dataset.create(
+            name='hot_dataset',
+            title='Hot dataset',
+            description='Description of dataset',
+            homepage='http://example.com/dataset',
+            keywords=['Data'],
+            access_level='PUBLIC',
+            data_quality=True,
+            category='Awesome category'
+        )
+    user_ids = range(1, 21)
+    barrier = threading.Barrier(len(user_ids))
+    errors = []
+
+    def hammer(user_id):
+        barrier.wait()
+        try:
+            with flask_app.app_context():
+                # Duplicate stars race with each other too
+                for _ in range(3):
+                    with file_db.session.begin():
+                        UserStarDataset.star(user_id, dataset.id)
+        except Exception as exception:  # pylint: disable=broad-except
+            errors.append(exception)
+
+    threads = [threading.Thread(target=hammer, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert get_stars(file_db, dataset) == len(user_ids)
+    assert UserStarDataset.query.filter_by(dataset_id=dataset.id).count() == len(user_ids)
+
+
+def test_write_behind_stars_are_coalesced(db, example_dataset, star_users):
+    from catalog.modules.users.models import UserStarDataset
+
+    counter = UserStarDataset.counter
+    counter.write_behind = True
+    try:
+        for user in star_users:
+            with db.session.begin():
+                assert UserStarDataset.star(user.id, example_dataset.id) == star_users.index(user) + 1
+        with db.session.begin():
+            assert UserStarDataset.unstar(star_users[0].id, example_dataset.id) == len(star_users) - 1
+
+        # Rolled back stars are not buffered
+        with pytest.raises(RuntimeError):
+            with db.session.begin():
+                UserStarDataset.unstar(star_users[1].id, example_dataset.id)
+                raise RuntimeError()
+
+        assert get_stars(db, example_dataset) == 0
+        assert counter.get(example_dataset.id) == len(star_users) - 1
+
+        with utils.count_queries(db.engine) as statements:
+            assert counter.flush() == 1
+        assert len(statements) == 1
+        assert get_stars(db, example_dataset) == len(star_users) - 1
+        assert counter.flush() == 0
+    finally:
+        counter.write_behind = False
+
+
+def test_recount_stars(db, example_dataset, star_users):
+    from catalog.modules.datasets.models import Dataset
+    from catalog.modules.users.models import UserStarDataset
+
+    with db.session.begin():
+        for user in star_users[:3]:
+            UserStarDataset.star(user.id, example_dataset.id)
+        Dataset.query.filter_by(id=example_dataset.id).update({'stars': 42})
+
+    UserStarDataset.counter.recount()
+    assert get_stars(db, example_dataset) == 3
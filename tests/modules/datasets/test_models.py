@@ -0,0 +1,110 @@
+# encoding: utf-8
+import pytest
+
+from tests import utils
+
+
+@pytest.yield_fixture()
+def resolved_licenses_cleanup(db):
+    from catalog.modules.datasets.models import License
+
+    yield
+
+    with db.session.begin():
+        License.query.filter(License.name.like('resolved_%')).delete(synchronize_session=False)
+
+
+def test_License_resolve_is_cached(db, resolved_licenses_cleanup):
+    from catalog.modules.datasets.models import License
+
+    with db.session.begin():
+        license_id = License.resolve('resolved_license', url='http://example.com/license')
+    assert License.get(license_id=license_id).url == 'http://example.com/license'
+    # The insert has invalidated the cached names
+    assert License.resolve('resolved_license') == license_id
+
+    with utils.count_queries(db.engine) as statements:
+        assert License.resolve('resolved_license') == license_id
+    assert statements == []
+
+
+def test_License_resolve_ignores_concurrently_created_names(db, resolved_licenses_cleanup):
+    from catalog.modules.datasets.models import License
+
+    with db.session.begin():
+        license_id = License.resolve('resolved_license')
+    # Another worker resolves the name before seeing the license
+    License.resolver.clear()
+    License.resolver._insert_ignore([{'name': 'resolved_license'}])
+
+    assert License.resolve('resolved_license') == license_id
+    assert License.query.filter_by(name='resolved_license').count() == 1
+
+
+def test_License_resolve_forgets_renamed_licenses(db, resolved_licenses_cleanup):
+    from catalog.modules.datasets.models import License
+
+    with db.session.begin():
+        license_id = License.resolve('resolved_license')
+    with db.session.begin():
+        License.query.filter_by(id=license_id).update({'name': 'resolved_renamed_license'})
+
+    with db.session.begin():
+        assert License.resolve('resolved_renamed_license') == license_id
+        assert License.resolve('resolved_license') != license_id
+
+
+@pytest.mark.parametrize('bulk', [True, False])
+def test_License_resolve_forgets_renamed_licenses_without_response_cache(
+        db, resolved_licenses_cleanup, monkeypatch, bulk
+):
+    from catalog.extensions import response_cache
+    from catalog.extensions.cache import NullBackend
+    from catalog.modules.datasets.models import License
+
+    monkeypatch.setattr(response_cache, 'backend', NullBackend())
+    with db.session.begin():
+        license_id = License.resolve('resolved_license')
+    with db.session.begin():
+        if bulk:
+            License.query.filter_by(id=license_id).update({'name': 'resolved_renamed_license'})
+        else:
+            License.get(license_id=license_id).name = 'resolved_renamed_license'
+
+    with db.session.begin():
+        assert License.resolve('resolved_license') != license_id
+
+
+def test_License_resolve_forgets_rolled_back_licenses(db, resolved_licenses_cleanup):
+    from catalog.modules.datasets.models import License
+
+    with pytest.raises(RuntimeError):
+        with db.session.begin():
+            License.resolve('resolved_license')
+            raise RuntimeError()
+
+    with db.session.begin():
+        license_id = License.resolve('resolved_license')
+    assert License.get(license_id=license_id).name == 'resolved_license'
+
+
+def test_License_resolve_is_not_cached_by_several_workers(db, resolved_licenses_cleanup, monkeypatch):
+    from catalog.extensions import server
+    from catalog.modules.datasets.models import License
+
+    with db.session.begin():
+        License.resolve('resolved_license')
+    # Renames by the other workers would not bump in-process versions
+    monkeypatch.setattr(server, 'workers', 3)
+    with utils.count_queries(db.engine) as statements:
+        License.resolve('resolved_license')
+    assert statements != []
+
+
+def test_every_dataset_filter_has_an_index():
+    from catalog.modules.datasets.models import Dataset
+    from catalog.modules.datasets.parameters import ListDatasetsParameters
+
+    indexed = {tuple(column.name for column in index.columns) for index in Dataset.__table__.indexes}
+    for field in ListDatasetsParameters.FILTER_FIELDS:
+        assert ('deleted', field, 'created') in indexed
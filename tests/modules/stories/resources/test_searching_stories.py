@@ -0,0 +1,62 @@
+# encoding: utf-8
+import pytest
+
+
+@pytest.yield_fixture()
+def searchable_stories(db, regular_user):
+    from catalog.modules.stories.models import Story
+
+    def create_story(title, description, keywords):
+        return Story(
+            id=Story.story_id(),
+            title=title,
+            description=description,
+            keywords=keywords,
+            web='http://example.com/story',
+            contributor_id=regular_user.id
+        )
+
+    stories = [
+        create_story('Shipping routes', 'Trade winds over the ocean', 'shipping'),
+        create_story('Trade wars', 'Tariffs between countries', 'economics'),
+        create_story('Ocean currents', 'Mapping the gulf stream', 'ocean, trade'),
+    ]
+    with db.session.begin():
+        db.session.add_all(stories)
+
+    yield stories
+
+    with db.session.begin():
+        for story in stories:
+            db.session.delete(story)
+
+
+def search(flask_app_client, user, q):
+    with flask_app_client.login(user, auth_scopes=('stories:read',)):
+        response = flask_app_client.get('/api/v1/stories/search', query_string={'q': q})
+    assert response.status_code == 200
+    return [story['title'] for story in response.json]
+
+
+def test_searching_stories_ranks_title_matches_first(flask_app_client, regular_user, searchable_stories):
+    assert search(flask_app_client, regular_user, 'trade') == ['Trade wars', 'Ocean currents', 'Shipping routes']
+    assert search(flask_app_client, regular_user, 'ocean gul') == ['Ocean currents']
+    assert search(flask_app_client, regular_user, 'nothing') == []
+
+
+def test_search_index_can_be_rebuilt(flask_app_client, regular_user, searchable_stories, db):
+    from catalog.modules.stories.models import search_index
+
+    with db.engine.connect() as connection:
+        # Lose the index like a VACUUM which renumbers the rows would
+        connection.execute("INSERT INTO story_fts(story_fts) VALUES ('delete-all')")
+        assert search(flask_app_client, regular_user, 'trade') == []
+
+        search_index.rebuild(connection)
+    assert search(flask_app_client, regular_user, 'trade') == ['Trade wars', 'Ocean currents', 'Shipping routes']
+
+
+def test_searching_stories_requires_query(flask_app_client, regular_user):
+    with flask_app_client.login(regular_user, auth_scopes=('stories:read',)):
+        response = flask_app_client.get('/api/v1/stories/search')
+    assert response.status_code == 422
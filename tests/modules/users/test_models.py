@@ -112,3 +112,36 @@ def test_User_find_with_password(patch_User_password_scheme, db):
     with db.session.begin():
         db.session.delete(user1)
         db.session.delete(user2)
+
+
+def test_User_find_with_password_rehashes_on_cost_change(db):
+    from catalog.extensions import password_hasher
+
+    user = models.User(
+        username="rehashed_user",
+        password="rehashed_password",
+        first_name="any",
+        middle_name="any",
+        last_name="any",
+        email="rehashed_user@email.com",
+    )
+    with db.session.begin():
+        db.session.add(user)
+    rounds = password_hasher.rounds
+    assert user.password.hash.startswith(b'$2b$%02d$' % rounds)
+
+    rehashed = password_hasher.stats['rehashed']
+    password_hasher.configure(rounds=rounds + 1)
+    try:
+        assert models.User.find_with_password("rehashed_user", "wrong_password") is None
+        assert password_hasher.stats['rehashed'] == rehashed
+
+        assert models.User.find_with_password("rehashed_user", "rehashed_password") == user
+        assert password_hasher.stats['rehashed'] == rehashed + 1
+        db.session.expire(user)
+        assert user.password.hash.startswith(b'$2b$%02d$' % (rounds + 1))
+        assert user.verify_password("rehashed_password")
+    finally:
+        password_hasher.configure(rounds=rounds)
+        with db.session.begin():
+            db.session.delete(user)
@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 
 from flask import Response
 from flask.testing import FlaskClient
+from sqlalchemy import event
 from werkzeug.utils import cached_property
 
 
@@ -73,6 +74,29 @@ class AutoAuthFlaskClient(FlaskClient):
         return response
 
 
+@contextmanager
+def count_queries(engine):
+    """
+    A helper context manager which collects all SQL statements emitted on
+    ``engine`` while it is active. Useful to catch N+1 query regressions.
+
+    Example:
+        >>> with count_queries(db.engine) as statements:
+        ...     flask_app_client.get('/api/v1/datasets/')
+        >>> len(statements)
+    """
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
+
+
 class JSONResponse(Response):
     """
     A Response class with extra useful helpers, i.e. ``.json`` property.